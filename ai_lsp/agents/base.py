@@ -18,6 +18,10 @@ class AgentDecision:
         self.stop_generation = stop_generation
 
 class CompletionAgent(ABC):
+    # Sequences that end generation as soon as they appear in the output,
+    # even when split across tokens.
+    stop_sequences: tuple[str, ...] = ()
+
     def before_generation(
         self,
         context: CompletionContext,
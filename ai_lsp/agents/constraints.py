@@ -1,5 +1,6 @@
 import re
 from ai_lsp.agents.base import CompletionAgent
+from ai_lsp.agents.lexical import lexical_features
 from ai_lsp.domain.completion import CompletionContext
 from ai_lsp.domain.constraints import SuffixConstraints
 
@@ -12,31 +13,17 @@ PAIRS = {
     "`": "`",
 }
 
-STRUCTURAL_CLOSERS = {")", "]", "}"}
-NON_REPEATABLE_TOKENS = {")", "]", "}", ";", ","}
-
-
-def _detect_closing_tokens(context: CompletionContext) -> list[str]:
-    return [ch for ch in context.suffix if ch in STRUCTURAL_CLOSERS]
-
-def _forbidden_newlines(context: CompletionContext) -> bool:
-    return any(ch in STRUCTURAL_CLOSERS for ch in context.suffix)
-
-def _extract_leading_tokens(context: CompletionContext) -> list[str]:
-    tokens = []
-    for ch in context.suffix:
-        if ch in NON_REPEATABLE_TOKENS:
-            tokens.append(ch)
-        else:
-            break  # stop at first non-token
-    return tokens
-
 
 class SuffixConstraintAgent(CompletionAgent):
     def analyze(self, context: CompletionContext) -> SuffixConstraints:
-        must_close = _detect_closing_tokens(context)
-        forbidden_newlines = _forbidden_newlines(context)
-        must_not_repeat = _extract_leading_tokens(context)
+        features = lexical_features(context)
+        must_close = list(features.closers)
+        forbidden_newlines = bool(features.closers)
+        syntax = context.syntax
+        if syntax is not None and syntax.in_comment and not syntax.multiline:
+            # A line comment ends at the end of the line.
+            forbidden_newlines = True
+        must_not_repeat = list(features.leading)
 
         stop_sequences = []
 
@@ -45,7 +32,7 @@ class SuffixConstraintAgent(CompletionAgent):
         if forbidden_newlines:
             stop_sequences.append("\n")
 
-        confidence = 0.9 if context.suffix.strip() else 0.5
+        confidence = 0.5 if features.suffix_blank else 0.9
 
         return SuffixConstraints(
             must_not_repeat=must_not_repeat,
@@ -53,4 +40,5 @@ class SuffixConstraintAgent(CompletionAgent):
             forbidden_newlines=forbidden_newlines,
             stop_sequences=stop_sequences,
             confidence=confidence,
+            open_brackets=syntax.brackets if syntax is not None else "",
         )
@@ -1,15 +1,25 @@
-from typing import Optional
-
 from ai_lsp.agents.base import AgentDecision, CompletionAgent
 from ai_lsp.domain.completion import CompletionContext
 
 
 class OutputGuardAgent(CompletionAgent):
+    # Markdown fences mean the model left code mode; the engine's stop
+    # matcher cuts the output where a fence starts.
+    stop_sequences = ("```",)
+
+
+class SyntaxGuardAgent(CompletionAgent):
+    """
+    Vetoes completions inside strings and block comments that span lines,
+    using the document's cached lexer state, so no backend call is made.
+    Docstrings are let through; the intent agent retargets them.
+    """
+
     def before_generation(self, context: CompletionContext) -> AgentDecision:
-        # This agent does not block or modify generation upfront.
-        return AgentDecision()
+        syntax = context.syntax
+        if syntax is None or not syntax.multiline or syntax.in_docstring:
+            return AgentDecision()
 
-    def on_token(self, token: str) -> Optional[AgentDecision]:
-        if "```" in token:
-            return AgentDecision(stop_generation=True)
-        return None
+        if syntax.in_comment:
+            return AgentDecision(allowed=False, reason="Cursor inside a block comment")
+        return AgentDecision(allowed=False, reason="Cursor inside a multi-line string")
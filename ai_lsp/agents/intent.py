@@ -1,6 +1,7 @@
 from ai_lsp.agents.base import AgentDecision, CompletionAgent
 
 from ai_lsp.agents.intent_types import EditIntent, EditIntentType
+from ai_lsp.agents.lexical import lexical_features
 from ai_lsp.domain.completion import CompletionContext
 
 
@@ -26,10 +27,9 @@ class CompletionIntentAgent(CompletionAgent):
 
 
 def is_argument_completion(context: CompletionContext) -> bool:
-    prefix = context.prefix
-    suffix = context.suffix
     # e.g., `foo(|bar)`
-    return "(" in prefix and ")" in suffix and prefix.rfind("(") > prefix.rfind(")")
+    features = lexical_features(context)
+    return features.paren_open and features.suffix_paren
 
 
 def _is_block_completion(context: CompletionContext) -> bool:
@@ -44,24 +44,25 @@ def _is_block_completion(context: CompletionContext) -> bool:
 
 
 def _is_docstring(context: CompletionContext) -> bool:
+    if context.syntax is not None:
+        return context.syntax.in_docstring
+
     if context.language == "python":
-        return (
-            '"""' in context.prefix
-            and '"""' in context.suffix
-            and context.prefix.count('"""') % 2 == 1
-        )
+        features = lexical_features(context)
+        return features.docstring_quotes % 2 == 1 and features.suffix_docstring
     elif (
         context.language == "php"
         or context.language == "javascript"
         or context.language == "typescript"
     ):
-        return "/**" in context.prefix and "*/" in context.suffix
+        features = lexical_features(context)
+        return features.doc_comment_open and features.suffix_doc_comment_end
     else:
         return False
 
 
 def _is_symbol_completion(context: CompletionContext) -> bool:
-    return context.prefix.rstrip().endswith((".", "->", "::", "$"))
+    return lexical_features(context).trigger is not None
 
 
 class CursorWindowIntentAgent(CompletionAgent):
@@ -0,0 +1,116 @@
+import re
+from typing import Optional
+
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.lexical import LexicalFeatures
+
+# Brackets and newlines are single tokens. Quotes, backslashes and "/**"
+# start a run that swallows the quotes, backslashes and stars after them, so
+# quote runs and escapes are never split across tokens.
+_PREFIX_TOKENS = r"""([()\[\]{}\n]|[\\"'`/][\\"'`*]*)"""
+
+# Identifier rules match the per-language variable patterns: php variables
+# are `$name`, python identifiers are whole ASCII words. Identifiers come
+# out of findall in the first group, everything else in the second.
+_PREFIX_RE = {
+    "php": re.compile(r"(\$[A-Za-z_][A-Za-z0-9_]*)|" + _PREFIX_TOKENS),
+    "python": re.compile(r"(\w+)|" + _PREFIX_TOKENS),
+}
+_DEFAULT_PREFIX_RE = re.compile(r"()" + _PREFIX_TOKENS)
+
+_SUFFIX_RE = re.compile(r'^[)\]};,]+|[)\]}]|"""|\*/')
+
+TRIGGERS = ("->", "::", ".", "$")
+
+
+def scan(prefix: str, suffix: str, language: str = "") -> LexicalFeatures:
+    depth = 0
+    paren_open = False
+    quote: Optional[str] = None
+    docstring_quotes = 0
+    doc_comment_open = False
+    identifiers: dict[str, None] = {}
+
+    for word, token in _PREFIX_RE.get(language, _DEFAULT_PREFIX_RE).findall(prefix):
+        if word:
+            if word[0] == "$" or word.isascii() and not word[0].isdigit():
+                identifiers[word] = None
+        elif token in "([{":
+            depth += 1
+            paren_open = token == "(" or paren_open
+        elif token in ")]}":
+            if depth:
+                depth -= 1
+            paren_open = token != ")" and paren_open
+        elif token == "\n":
+            quote = None
+        else:
+            if token.startswith("/**"):
+                doc_comment_open = True
+            run = 0
+            escaped = False
+            for ch in token:
+                if ch == '"':
+                    run += 1
+                    if run == 3:
+                        docstring_quotes += 1
+                        run = 0
+                else:
+                    run = 0
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = quote is not None
+                elif ch in "\"'`":
+                    if quote is None:
+                        quote = ch
+                    elif quote == ch:
+                        quote = None
+
+    stripped = prefix.rstrip()
+    trigger = None
+    if stripped.endswith(TRIGGERS):
+        trigger = next(t for t in TRIGGERS if stripped.endswith(t))
+
+    closers: list[str] = []
+    leading: tuple[str, ...] = ()
+    suffix_paren = suffix_docstring = suffix_doc_comment_end = False
+    for token in _SUFFIX_RE.findall(suffix):
+        first = token[0]
+        if first in ")]};,":
+            if not leading and suffix.startswith(token):
+                leading = tuple(token)
+            for ch in token:
+                if ch in ")]}":
+                    closers.append(ch)
+            suffix_paren = suffix_paren or ")" in token
+        elif first == '"':
+            suffix_docstring = True
+        else:
+            suffix_doc_comment_end = True
+
+    return LexicalFeatures(
+        depth,
+        paren_open,
+        quote,
+        trigger,
+        docstring_quotes,
+        doc_comment_open,
+        tuple(identifiers),
+        tuple(closers),
+        leading,
+        not suffix or suffix.isspace(),
+        suffix_paren,
+        suffix_docstring,
+        suffix_doc_comment_end,
+    )
+
+
+def lexical_features(context: CompletionContext) -> LexicalFeatures:
+    """
+    The context's lexical features, scanned on first use and shared by every
+    agent that reads them afterwards.
+    """
+    if context.lexical is None:
+        context.lexical = scan(context.prefix, context.suffix, context.language)
+    return context.lexical
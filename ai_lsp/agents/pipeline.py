@@ -0,0 +1,215 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from ai_lsp.agents.base import AgentDecision, CompletionAgent
+from ai_lsp.agents.intent import CursorWindowIntentAgent
+from ai_lsp.agents.semantics import PrefixSemanticAgent
+from ai_lsp.ai.constraints import merge_suffix_constraints
+from ai_lsp.ai.orchestrator import (
+    CompletionDecision,
+    CompletionDecisionInput,
+    CompletionOrchestrator,
+)
+from ai_lsp.ai.stop_matcher import StopSequenceMatcher, compile_stop_sequences
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from ai_lsp.observability.tracing import NULL_TRACE, NullTrace, Trace
+
+
+def _overrides(agent: CompletionAgent, hook: str) -> bool:
+    return getattr(type(agent), hook, None) is not getattr(CompletionAgent, hook)
+
+
+def _span_name(stage: str, hook: Callable) -> str:
+    owner = getattr(hook, "__self__", hook)
+    return f"{stage}:{type(owner).__name__}"
+
+
+@dataclass
+class PipelineTimings:
+    """
+    Wall time spent per pipeline stage for one request, in seconds. When a
+    trace is attached every stage is also recorded as a span.
+    """
+
+    stages: dict[str, float] = field(default_factory=dict)
+    trace: Trace | NullTrace = NULL_TRACE
+
+    def add(self, stage: str, started: float) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - started)
+        if self.trace:
+            self.trace.add_span(stage, started, now)
+
+
+@dataclass
+class PipelinePreparation:
+    allowed: bool
+    constraints: SuffixConstraints
+    reason: Optional[str] = None
+    decision: Optional[CompletionDecision] = None
+    input: Optional[CompletionDecisionInput] = None
+
+
+class AgentPipeline:
+    """
+    Agent hooks compiled into per-stage lists.
+
+    Agents are inspected once: only hooks an agent actually overrides are
+    dispatched, so the token loop never calls inherited no-ops.
+    """
+
+    def __init__(
+        self,
+        agents: list[CompletionAgent],
+        intent_agent: Optional[CursorWindowIntentAgent] = None,
+        semantic_agent: Optional[PrefixSemanticAgent] = None,
+        orchestrator: Optional[CompletionOrchestrator] = None,
+    ) -> None:
+        self.agents = list(agents)
+        self.intent_agent = intent_agent
+        self.semantic_agent = semantic_agent
+        self.orchestrator = orchestrator
+
+        self.analyzers: list[Callable[[CompletionContext], SuffixConstraints]] = [
+            agent.analyze  # pyright: ignore
+            for agent in self.agents
+            if callable(getattr(agent, "analyze", None))
+        ]
+        self.before_hooks: list[Callable[[CompletionContext], AgentDecision]] = [
+            agent.before_generation
+            for agent in self.agents
+            if _overrides(agent, "before_generation")
+        ]
+        self.token_hooks: list[Callable[[str], Optional[AgentDecision]]] = [
+            agent.on_token for agent in self.agents if _overrides(agent, "on_token")
+        ]
+        self.after_hooks: list[
+            Callable[[CompletionContext, str], Optional[str]]
+        ] = [
+            agent.after_generation
+            for agent in self.agents
+            if _overrides(agent, "after_generation")
+        ]
+        self.stop_sequences: tuple[str, ...] = tuple(
+            dict.fromkeys(seq for agent in self.agents for seq in agent.stop_sequences)
+        )
+
+    def prepare(
+        self,
+        context: CompletionContext,
+        timings: Optional[PipelineTimings] = None,
+    ) -> PipelinePreparation:
+        """
+        Run every analysis exactly once, then the before_generation hooks.
+        """
+        timings = timings or PipelineTimings()
+        trace = timings.trace
+
+        started = time.perf_counter()
+        if trace:
+            results = []
+            for analyze in self.analyzers:
+                with trace.span(_span_name("analyze", analyze)):
+                    results.append(analyze(context))
+        else:
+            results = [analyze(context) for analyze in self.analyzers]
+        constraints = merge_suffix_constraints(results)
+        timings.add("analyze", started)
+
+        if self.intent_agent:
+            started = time.perf_counter()
+            context.intent = self.intent_agent.detect_intent(context)
+            timings.add("intent", started)
+
+        if self.semantic_agent:
+            started = time.perf_counter()
+            context.semantics = self.semantic_agent.analyze(context)
+            timings.add("semantics", started)
+
+        decision = None
+        decision_input = None
+        if self.orchestrator and context.intent and context.semantics:
+            started = time.perf_counter()
+            decision_input = CompletionDecisionInput(
+                context=context,
+                intent=context.intent,
+                semantics=context.semantics,
+                constraints=constraints,
+            )
+            decision = self.orchestrator.decide(decision_input)
+            timings.add("decide", started)
+            if not decision.should_complete:
+                return PipelinePreparation(
+                    allowed=False,
+                    constraints=constraints,
+                    reason=decision.explanation,
+                    decision=decision,
+                    input=decision_input,
+                )
+
+        started = time.perf_counter()
+        try:
+            for hook in self.before_hooks:
+                if trace:
+                    with trace.span(_span_name("before_generation", hook)):
+                        result = hook(context)
+                else:
+                    result = hook(context)
+                if not result.allowed:
+                    return PipelinePreparation(
+                        allowed=False,
+                        constraints=constraints,
+                        reason=result.reason,
+                        decision=decision,
+                        input=decision_input,
+                    )
+        finally:
+            timings.add("before_generation", started)
+
+        return PipelinePreparation(
+            allowed=True, constraints=constraints, decision=decision, input=decision_input
+        )
+
+    def stop_matcher(self, constraints: SuffixConstraints) -> StopSequenceMatcher:
+        """
+        Streaming matcher over the agents' stop sequences plus the request's
+        suffix stop sequences, which the backend may not honour itself.
+        """
+        return compile_stop_sequences(
+            self.stop_sequences + tuple(constraints.stop_sequences)
+        ).matcher()
+
+    def on_token(self, token: str) -> bool:
+        """
+        Returns True when any agent asks to stop generation.
+        """
+        for hook in self.token_hooks:
+            decision = hook(token)
+            if decision and decision.stop_generation:
+                return True
+        return False
+
+    def after_generation(
+        self,
+        context: CompletionContext,
+        text: str,
+        timings: Optional[PipelineTimings] = None,
+    ) -> Optional[str]:
+        trace = timings.trace if timings is not None else NULL_TRACE
+        started = time.perf_counter()
+        try:
+            for hook in self.after_hooks:
+                if trace:
+                    with trace.span(_span_name("after_generation", hook)):
+                        result = hook(context, text)
+                else:
+                    result = hook(context, text)
+                if result is None:
+                    return None
+                text = result
+            return text
+        finally:
+            if timings is not None:
+                timings.add("after_generation", started)
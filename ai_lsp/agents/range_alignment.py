@@ -21,7 +21,7 @@ def _trim_leading_line_overlap(
     completion_lines: list[str],
     previous_lines: list[str],
 ) -> list[str]:
-    norm_prev = [l.strip() for l in previous_lines]
+    norm_prev = {l.strip() for l in previous_lines}
 
     result = []
     skipping = True
@@ -38,7 +38,7 @@ def _trim_trailing_line_overlap(
     completion_lines: list[str],
     next_lines: list[str],
 ) -> list[str]:
-    norm_next = [l.strip() for l in next_lines]
+    norm_next = {l.strip() for l in next_lines}
 
     result = []
     skipping = True
@@ -53,15 +53,73 @@ def _trim_trailing_line_overlap(
     return result
 
 
+def _prefix_function(pattern: str) -> list[int]:
+    """
+    KMP failure table: for each i, the length of the longest proper prefix
+    of pattern[: i + 1] that is also its suffix.
+    """
+    table = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        ch = pattern[i]
+        while k and pattern[k] != ch:
+            k = table[k - 1]
+        if pattern[k] == ch:
+            k += 1
+        table[i] = k
+    return table
+
+
+def _kmp_overlap(text: str, pattern: str) -> int:
+    table = _prefix_function(pattern)
+    n = len(pattern)
+    k = 0
+    for ch in text:
+        while k and (k == n or pattern[k] != ch):
+            k = table[k - 1]
+        if pattern[k] == ch:
+            k += 1
+    return k
+
+
+# Candidates checked with C string comparisons before switching to KMP.
+_MAX_CANDIDATES = 32
+
+
+def _overlap_length(text: str, pattern: str) -> int:
+    """
+    Length of the longest prefix of `pattern` that `text` ends with.
+
+    Only positions where the first character of `pattern` occurs can start
+    an overlap; those are found with `str.find` and checked longest first.
+    On repetitive input with many candidates this falls back to KMP, so the
+    whole thing stays O(len(text) + len(pattern)).
+    """
+    n = min(len(text), len(pattern))
+    if not n:
+        return 0
+    pattern = pattern[:n]
+    text = text[len(text) - n :]
+
+    first = pattern[0]
+    start = text.find(first)
+    for _ in range(_MAX_CANDIDATES):
+        if start < 0:
+            return 0
+        if text.startswith(pattern[: n - start], start):
+            return n - start
+        start = text.find(first, start + 1)
+
+    return _kmp_overlap(text, pattern)
+
+
 def _trim_suffix_overlap(completion: str, suffix: str) -> str:
     if not suffix or not completion:
         return completion
 
-    max_overlap = min(len(completion), len(suffix))
-
-    for i in range(max_overlap, 0, -1):
-        if completion.endswith(suffix[:i]):
-            return completion[:-i]
+    overlap = _overlap_length(completion, suffix)
+    if overlap:
+        return completion[:-overlap]
 
     return completion
 
@@ -1,22 +1,12 @@
 from sys import prefix
 from typing import Optional
 from ai_lsp.agents.base import CompletionAgent
+from ai_lsp.agents.lexical import lexical_features
 from ai_lsp.domain.completion import CompletionContext
 from ai_lsp.domain.semantics import PrefixSemantics, ScopeType
-import re
-
-_VAR_PATTERNS = {
-    "php": re.compile(r"\$[a-zA-Z_][a-zA-Z0-9_]*"),
-    "python": re.compile(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b"),
-}
 
 def _extract_variables(context: CompletionContext) -> list[str]:
-    pattern = _VAR_PATTERNS.get(context.language)
-    if not pattern:
-        return []
-
-    vars = pattern.findall(context.prefix)
-    return list(dict.fromkeys(vars)) # preserve order, remove duplication
+    return list(lexical_features(context).identifiers)
 
 def _detect_framework(context: CompletionContext) -> Optional[str]:
     if "\\Drupal::" in context.prefix or "use Drupal\\" in context.prefix:
@@ -27,6 +17,9 @@ def _detect_framework(context: CompletionContext) -> Optional[str]:
     return None
 
 def _detect_scope(context: CompletionContext) -> ScopeType:
+    if context.syntax is not None:
+        return context.syntax.scope
+
     if context.language == "python":
         if "def " in context.prefix:
             return ScopeType.FUNCTION
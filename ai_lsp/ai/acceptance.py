@@ -0,0 +1,239 @@
+"""
+Local acceptance predictor: a logistic regression over the signals the
+agents already compute, used to skip backend calls whose completion would
+most likely be ignored.
+
+Train it offline from the acceptance log:
+
+    python -m ai_lsp.ai.acceptance acceptance.jsonl -o acceptance-model.json
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from ai_lsp.agents.intent_types import EditIntentType
+from ai_lsp.agents.lexical import lexical_features
+from ai_lsp.ai.orchestrator.decision_input import CompletionDecisionInput
+from ai_lsp.domain.semantics import ScopeType
+from ai_lsp.observability.trace_view import rotated_files
+
+# Cadence values are capped so a long pause does not dominate the score.
+MAX_TYPING_SECONDS = 2.0
+
+ACCEPTED_OUTCOMES = ("accepted", "partial")
+
+
+def acceptance_features(input: CompletionDecisionInput) -> dict[str, float]:
+    """
+    Flat numeric features for one request. The same dict is written to the
+    acceptance log, so training and inference always agree on the schema.
+    """
+    context = input.context
+    lexical = lexical_features(context)
+    interval = context.typing_interval
+    pause = context.typing_pause
+
+    features = {
+        "intent_confidence": input.intent.confidence,
+        "suffix_confidence": input.constraints.confidence,
+        "forbidden_newlines": float(input.constraints.forbidden_newlines),
+        "must_close": float(min(len(input.constraints.must_close), 3)),
+        "open_brackets": float(min(len(input.constraints.open_brackets), 5)),
+        "in_function": float(
+            input.semantics.scope in (ScopeType.FUNCTION, ScopeType.METHOD)
+        ),
+        "framework": float(input.semantics.framework is not None),
+        "prefix_length": math.log1p(len(context.prefix.strip())),
+        "word_length": float(min(len(context.completion_prefix), 20)),
+        "suffix_blank": float(lexical.suffix_blank),
+        "trigger": float(lexical.trigger is not None),
+        "typing_interval": min(
+            interval if interval is not None else MAX_TYPING_SECONDS,
+            MAX_TYPING_SECONDS,
+        ),
+        "typing_pause": min(
+            pause if pause is not None else MAX_TYPING_SECONDS, MAX_TYPING_SECONDS
+        ),
+    }
+    for intent_type in EditIntentType:
+        features[f"intent_{intent_type.value}"] = float(input.intent.type is intent_type)
+    return features
+
+
+@dataclass
+class AcceptancePredictor:
+    """
+    Logistic regression: P(accepted) = sigmoid(bias + sum(w * x)).
+
+    Weights are stored in raw feature units (standardization is folded in
+    at training time), so inference is a single pass over a dozen floats.
+    Features missing from `weights` are ignored, which keeps old models
+    usable after new features are added.
+    """
+
+    weights: dict[str, float] = field(default_factory=dict)
+    bias: float = 0.0
+
+    def predict(self, features: dict[str, float]) -> float:
+        z = self.bias
+        for name, weight in self.weights.items():
+            z += weight * features.get(name, 0.0)
+        return _sigmoid(z)
+
+    @classmethod
+    def load(cls, path: str) -> "AcceptancePredictor":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(weights=dict(data["weights"]), bias=float(data["bias"]))
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"weights": self.weights, "bias": self.bias}, f, indent=2)
+            f.write("\n")
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30.0:
+        return 0.0
+    if z > 30.0:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def load_samples(paths: Iterable[str]) -> Iterator[tuple[dict[str, float], bool]]:
+    """
+    (features, accepted) pairs from acceptance log files. Records without
+    features or outcome, and lines that fail to parse, are skipped.
+    """
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                features = record.get("features")
+                outcome = record.get("outcome")
+                if isinstance(features, dict) and outcome:
+                    yield features, outcome in ACCEPTED_OUTCOMES
+
+
+def train(
+    samples: list[tuple[dict[str, float], bool]],
+    epochs: int = 200,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3,
+) -> AcceptancePredictor:
+    """
+    Full-batch gradient descent on standardized features with L2
+    regularization.
+    """
+    if not samples:
+        raise ValueError("No training samples")
+
+    names = sorted({name for features, _ in samples for name in features})
+    rows = [[float(features.get(name, 0.0)) for name in names] for features, _ in samples]
+    labels = [1.0 if accepted else 0.0 for _, accepted in samples]
+    count = len(rows)
+
+    means = [sum(column) / count for column in zip(*rows)]
+    scales = [
+        math.sqrt(sum((x - mean) ** 2 for x in column) / count) or 1.0
+        for column, mean in zip(zip(*rows), means)
+    ]
+    rows = [[(x - m) / s for x, m, s in zip(row, means, scales)] for row in rows]
+
+    weights = [0.0] * len(names)
+    positives = sum(labels)
+    bias = math.log((positives + 1) / (count - positives + 1))
+    for _ in range(epochs):
+        gradient = [0.0] * len(names)
+        bias_gradient = 0.0
+        for row, label in zip(rows, labels):
+            error = _sigmoid(bias + sum(w * x for w, x in zip(weights, row))) - label
+            bias_gradient += error
+            for i, x in enumerate(row):
+                gradient[i] += error * x
+        bias -= learning_rate * bias_gradient / count
+        weights = [
+            w - learning_rate * (g / count + l2 * w) for w, g in zip(weights, gradient)
+        ]
+
+    # Fold the standardization into the weights.
+    raw = {name: w / s for name, w, s in zip(names, weights, scales)}
+    bias -= sum(w * m / s for w, m, s in zip(weights, means, scales))
+    return AcceptancePredictor(weights=raw, bias=bias)
+
+
+def evaluate(
+    predictor: AcceptancePredictor,
+    samples: list[tuple[dict[str, float], bool]],
+    threshold: float,
+) -> dict[str, float]:
+    """
+    Accuracy and log loss, plus how many requests the threshold would skip
+    and how many accepted completions that would lose.
+    """
+    eps = 1e-9
+    correct = skipped = lost = 0
+    loss = 0.0
+    for features, accepted in samples:
+        p = predictor.predict(features)
+        correct += (p >= 0.5) == accepted
+        loss -= math.log(p + eps) if accepted else math.log(1 - p + eps)
+        if p < threshold:
+            skipped += 1
+            lost += accepted
+    count = max(1, len(samples))
+    return {
+        "samples": float(len(samples)),
+        "accuracy": correct / count,
+        "log_loss": loss / count,
+        "skipped": skipped / count,
+        "accepted_lost": lost / max(1, sum(a for _, a in samples)),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ai_lsp.ai.acceptance")
+    parser.add_argument("logs", nargs="+", help="acceptance logs (rotated backups are included)")
+    parser.add_argument("-o", "--output", default="acceptance-model.json")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction kept for evaluation")
+    args = parser.parse_args(argv)
+
+    paths = [p for log in args.logs for p in rotated_files(log)]
+    samples = list(load_samples(paths))
+    if not samples:
+        print("No labelled samples found")
+        return 1
+
+    random.Random(0).shuffle(samples)
+    split = int(len(samples) * (1 - args.holdout)) if len(samples) > 10 else len(samples)
+    predictor = train(samples[:split], args.epochs, args.learning_rate, args.l2)
+    predictor.save(args.output)
+
+    held_out = samples[split:] or samples
+    report = evaluate(predictor, held_out, args.threshold)
+    print(f"Model written to {args.output}")
+    print(
+        f"{int(report['samples'])} held-out samples: accuracy {report['accuracy']:.3f}, "
+        f"log loss {report['log_loss']:.3f}"
+    )
+    print(
+        f"threshold {args.threshold}: skips {report['skipped']:.1%} of requests, "
+        f"loses {report['accepted_lost']:.1%} of accepted completions"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used);
+"""
+
+
+def default_cache_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ai-lsp", "completions.sqlite3")
+
+
+class CompletionCache:
+    """
+    Raw backend output keyed by model, generation options and prompt.
+
+    Two layers: a small in-process LRU in front of a SQLite file that is
+    shared by every server process on the machine. The database runs in
+    WAL mode, so readers never block on a writer in another process, and
+    every thread gets its own connection.
+
+    Values are stored before the after_generation hooks run; those depend
+    on the suffix and are re-applied on every hit.
+
+    The cache is best effort: any SQLite error (locked, corrupt, read-only
+    file) is treated as a miss.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 20_000,
+        memory_entries: int = 512,
+        evict_every: int = 64,
+        metrics: Optional[CompletionMetrics] = None,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.evict_every = evict_every
+
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        # Disk hits are stamped in batches on the next write, keeping the
+        # lookup path read-only. Guarded by _memory_lock like the LRU.
+        self._touched: set[str] = set()
+        self._puts = 0
+
+        metrics = metrics or METRICS
+        registry = metrics.registry
+        self._memory_hits = registry.counter(
+            "ai_lsp_cache_hits_total", "Completion cache hits", layer="memory"
+        )
+        self._disk_hits = registry.counter(
+            "ai_lsp_cache_hits_total", "Completion cache hits", layer="disk"
+        )
+        self._misses = registry.counter(
+            "ai_lsp_cache_misses_total", "Completion cache misses"
+        )
+        self._errors = registry.counter(
+            "ai_lsp_cache_errors_total", "Completion cache SQLite errors"
+        )
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(model: str, options: dict, prompt: str) -> str:
+        payload = json.dumps([model, options, prompt], sort_keys=True, default=list)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._memory_lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+        if value is not None:
+            self._memory_hits.inc()
+            return value
+
+        try:
+            row = (
+                self._connection()
+                .execute("SELECT value FROM completions WHERE key = ?", (key,))
+                .fetchone()
+            )
+        except sqlite3.Error:
+            self._errors.inc()
+            row = None
+
+        if row is None:
+            self._misses.inc()
+            return None
+
+        self._disk_hits.inc()
+        with self._memory_lock:
+            self._touched.add(key)
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key: str, value: str, model: str = "") -> None:
+        self._remember(key, value)
+        now = time.time()
+        with self._memory_lock:
+            touched, self._touched = self._touched, set()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, model, value, created, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, model, value, now, now),
+                )
+                if touched:
+                    conn.executemany(
+                        "UPDATE completions SET last_used = ? WHERE key = ?",
+                        [(now, k) for k in touched],
+                    )
+                self._puts += 1
+                if self._puts % self.evict_every == 0:
+                    self._evict(conn)
+        except sqlite3.Error:
+            self._errors.inc()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM completions WHERE key IN ("
+            " SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,),
+        )
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._memory_lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def memory_layers(self) -> dict:
+        """
+        The in-process state, for profiler size reports: the memory LRU and
+        disk hits waiting to be stamped.
+        """
+        with self._memory_lock:
+            return {"memory": dict(self._memory), "touched": set(self._touched)}
+
+    def hot_keys(self) -> list[str]:
+        """
+        Keys in the memory layer, least recently used first.
+        """
+        with self._memory_lock:
+            return list(self._memory)
+
+    def preload(self, keys: list[str]) -> int:
+        """
+        Fill the memory layer from disk with `keys`, in order, skipping
+        entries evicted since. Returns how many were loaded.
+        """
+        keys = keys[-self.memory_entries :] if self.memory_entries else []
+        values: dict[str, str] = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                rows = conn.execute(
+                    "SELECT key, value FROM completions WHERE key IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    batch,
+                )
+                values.update(rows.fetchall())
+        except sqlite3.Error:
+            self._errors.inc()
+            return 0
+        for key in keys:
+            if key in values:
+                self._remember(key, values[key])
+        return len(values)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._memory_lock:
+            self._memory.clear()
+        with self._connection() as conn:
+            conn.execute("DELETE FROM completions")
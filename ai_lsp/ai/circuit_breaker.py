@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Optional
+
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+_STATE_VALUES = {
+    CircuitState.CLOSED: 0.0,
+    CircuitState.HALF_OPEN: 1.0,
+    CircuitState.OPEN: 2.0,
+}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a backend that is known to be unavailable.
+    """
+
+    def __init__(self, retry_in: float) -> None:
+        super().__init__(f"Backend unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker around the completion backend.
+
+    CLOSED: requests flow; outcomes go into a sliding window. Once the
+    window holds `min_requests` outcomes and the failure rate reaches
+    `failure_threshold`, the circuit opens.
+
+    OPEN: `allow()` rejects without any I/O until `cooldown` has passed.
+    Each time a probe fails the cooldown doubles, up to `max_cooldown`.
+
+    HALF_OPEN: up to `probes` requests go through. A success closes the
+    circuit and a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        min_requests: int = 5,
+        cooldown: float = 5.0,
+        max_cooldown: float = 60.0,
+        probes: int = 1,
+        metrics: Optional[CompletionMetrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probes = probes
+        self.clock = clock
+
+        self.state = CircuitState.CLOSED
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+        metrics = metrics or METRICS
+        registry = metrics.registry
+        self._state_gauge = registry.gauge(
+            "ai_lsp_circuit_state", "Backend circuit: 0 closed, 1 half-open, 2 open"
+        )
+        self._rejected = registry.counter(
+            "ai_lsp_circuit_rejected_total", "Requests rejected while the circuit was open"
+        )
+        self._opened = registry.counter(
+            "ai_lsp_circuit_opened_total", "Times the backend circuit opened"
+        )
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+    def allow(self) -> bool:
+        # Lock-free fast path for the common case.
+        if self.state is CircuitState.CLOSED:
+            return True
+        with self._lock:
+            if self.state is CircuitState.OPEN:
+                if self.clock() < self.opened_at + self.cooldown:
+                    self._rejected.inc()
+                    return False
+                self._set_state(CircuitState.HALF_OPEN)
+            if self.state is CircuitState.HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self._rejected.inc()
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def check(self) -> None:
+        """
+        `allow()` that raises CircuitOpenError on rejection.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.retry_in())
+
+    def release(self) -> None:
+        """
+        Give back an admitted request that never reached the backend (cache
+        hit, internal error) without judging the backend.
+        """
+        if self.state is CircuitState.HALF_OPEN:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._outcomes.clear()
+                self.cooldown = self.base_cooldown
+                self._set_state(CircuitState.CLOSED)
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open()
+                return
+            if self.state is CircuitState.OPEN:
+                return
+            self._outcomes.append(False)
+            if len(self._outcomes) < self.min_requests:
+                return
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.opened_at = self.clock()
+        self._outcomes.clear()
+        self._opened.inc()
+        self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self.state = state
+        self._state_gauge.set(_STATE_VALUES[state])
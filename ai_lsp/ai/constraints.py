@@ -11,6 +11,7 @@ def merge_suffix_constraints(constraints: list[SuffixConstraints]) -> SuffixCons
 
         merged.forbidden_newlines |= c.forbidden_newlines
         merged.confidence = max(merged.confidence, c.confidence)
+        merged.open_brackets = merged.open_brackets or c.open_brackets
 
     # de-dup while preserving order
     merged.stop_sequences = list(dict.fromkeys(merged.stop_sequences))
@@ -0,0 +1,155 @@
+import json
+import queue
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+import requests
+
+_DONE = object()
+
+
+def ndjson_messages(response: requests.Response) -> Iterator[Any]:
+    """
+    Decode a newline-delimited JSON stream, as Ollama sends it.
+    """
+    for line in response.iter_lines():
+        if line:
+            yield json.loads(line)
+
+
+class _Attempt:
+    __slots__ = ("node", "response", "cancelled", "thread")
+
+    def __init__(self, node: str) -> None:
+        self.node = node
+        self.response: Optional[requests.Response] = None
+        self.cancelled = False
+        self.thread: Optional[threading.Thread] = None
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        response = self.response
+        if response is not None:
+            # Closing the connection from here unblocks the reader thread.
+            response.close()
+
+
+class HedgedStream:
+    """
+    Streams messages from the first of several backend nodes to
+    produce a token.
+
+    The request goes to `nodes[0]`. If nothing has arrived after
+    `hedge_after` seconds, a duplicate goes to the next node, and so on.
+    The first attempt to deliver a message wins; the others are cancelled
+    by closing their connections. Errors only surface once every attempt
+    has failed.
+
+    `decode` turns a response into messages; NDJSON unless given.
+    """
+
+    def __init__(
+        self,
+        open_stream: Callable[[str], requests.Response],
+        nodes: list[str],
+        hedge_after: float,
+        timeout: float,
+        on_hedge: Optional[Callable[[str], None]] = None,
+        decode: Callable[[requests.Response], Iterator[Any]] = ndjson_messages,
+    ) -> None:
+        self.open_stream = open_stream
+        self.decode = decode
+        self.nodes = nodes
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.on_hedge = on_hedge
+        self.winner: Optional[str] = None
+
+        self._queue: queue.Queue[tuple[_Attempt, Any]] = queue.Queue()
+        self._attempts: list[_Attempt] = []
+
+    def _start(self, node: str) -> None:
+        attempt = _Attempt(node)
+        attempt.thread = threading.Thread(
+            target=self._run, args=(attempt,), name=f"ai-lsp-hedge-{node}", daemon=True
+        )
+        self._attempts.append(attempt)
+        attempt.thread.start()
+
+    def _run(self, attempt: _Attempt) -> None:
+        try:
+            response = self.open_stream(attempt.node)
+            attempt.response = response
+            if attempt.cancelled:
+                response.close()
+                return
+            response.raise_for_status()
+            for message in self.decode(response):
+                if attempt.cancelled:
+                    return
+                self._queue.put((attempt, message))
+            self._queue.put((attempt, _DONE))
+        except Exception as e:
+            if not attempt.cancelled:
+                self._queue.put((attempt, e))
+        finally:
+            if attempt.response is not None:
+                attempt.response.close()
+
+    def _first(self) -> tuple[_Attempt, Any]:
+        """
+        Wait for the first message from any attempt, hedging to further
+        nodes on the way.
+        """
+        pending = list(self.nodes[1:])
+        failed: list[Exception] = []
+        self._start(self.nodes[0])
+        while True:
+            wait = self.hedge_after if pending else self.timeout
+            try:
+                attempt, item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                if not pending:
+                    raise requests.Timeout(f"No response within {self.timeout}s")
+                node = pending.pop(0)
+                if self.on_hedge:
+                    self.on_hedge(node)
+                self._start(node)
+                continue
+
+            if isinstance(item, Exception):
+                failed.append(item)
+                running = len(self._attempts) - len(failed)
+                if pending:
+                    # Fail over immediately instead of waiting for the delay.
+                    self._start(pending.pop(0))
+                elif not running:
+                    raise failed[0]
+                continue
+            return attempt, item
+
+    def _next(self, winner: _Attempt) -> Any:
+        while True:
+            try:
+                attempt, item = self._queue.get(timeout=self.timeout)
+            except queue.Empty:
+                raise requests.Timeout(f"Stream stalled for {self.timeout}s")
+            if attempt is winner:
+                return item
+
+    def __iter__(self) -> Iterator[dict]:
+        try:
+            winner, item = self._first()
+            self.winner = winner.node
+            for attempt in self._attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+
+            while item is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                item = self._next(winner)
+        finally:
+            for attempt in self._attempts:
+                attempt.cancel()
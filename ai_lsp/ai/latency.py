@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+def _quantile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class LatencyTracker:
+    """
+    Sliding window of time-to-first-token and per-token decode intervals
+    observed for one model.
+    """
+
+    def __init__(self, window: int = 256, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._ttft: deque[float] = deque(maxlen=window)
+        self._interval: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # When this process last saw the backend generate, on the
+        # time.monotonic() clock; restored samples do not count.
+        self.last_observed: Optional[float] = None
+
+    def observe(
+        self, ttft: float, tokens: int, decode_seconds: float, cold: bool = False
+    ) -> None:
+        """
+        Record one generation. The TTFT of a `cold` one includes loading
+        the model and is left out of the window.
+        """
+        with self._lock:
+            self.last_observed = time.monotonic()
+            if not cold:
+                self._ttft.append(ttft)
+            if tokens > 1 and decode_seconds > 0:
+                self._interval.append(decode_seconds / (tokens - 1))
+
+    def samples(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {"ttft": list(self._ttft), "interval": list(self._interval)}
+
+    def restore(self, samples: dict[str, list[float]]) -> None:
+        """
+        Seed the window with samples from an earlier process; newer
+        observations push them out as usual.
+        """
+        with self._lock:
+            self._ttft.extend(float(v) for v in samples.get("ttft", ()))
+            self._interval.extend(float(v) for v in samples.get("interval", ()))
+
+    def ttft_quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._ttft)
+        if len(samples) < self.min_samples:
+            return None
+        return _quantile(samples, q)
+
+    def interval_quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._interval)
+        if len(samples) < self.min_samples:
+            return None
+        return _quantile(samples, q)
+
+
+class AdaptiveTimeouts:
+    """
+    Backend timeouts derived from observed latency. Until enough samples
+    exist every value falls back to the configured `ceiling`, which is the
+    old fixed timeout.
+
+    The samples describe a loaded model. The first request of the process,
+    and the first after `cold_after` idle seconds (when the backend may
+    have unloaded the model), waits up to the ceiling for its first token
+    instead, so a model load is not mistaken for a failing backend.
+    """
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        ceiling: float,
+        floor: float = 0.5,
+        factor: float = 3.0,
+        cold_after: Optional[float] = 300.0,
+    ) -> None:
+        self.tracker = tracker
+        self.ceiling = ceiling
+        self.floor = floor
+        self.factor = factor
+        # Ollama's default keep-alive; None when the model never unloads.
+        self.cold_after = cold_after
+
+    def cold(self) -> bool:
+        last = self.tracker.last_observed
+        if last is None:
+            return True
+        return self.cold_after is not None and time.monotonic() - last > self.cold_after
+
+    def first_token(self) -> float:
+        """
+        How long to wait for the first byte (and between bytes) before
+        giving up on a request.
+        """
+        if self.cold():
+            return self.ceiling
+        p99 = self.tracker.ttft_quantile(0.99)
+        if p99 is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, p99 * self.factor))
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        p95 TTFT: once a request has waited this long without a token, a
+        duplicate is sent to another node. None while cold: a model load
+        is not a slow node.
+        """
+        if self.cold():
+            return None
+        return self.tracker.ttft_quantile(0.95)
+
+    def deadline(self, max_tokens: int) -> Optional[float]:
+        """
+        Total time budget for a generation of up to `max_tokens` tokens,
+        measured from the request start.
+        """
+        interval = self.tracker.interval_quantile(0.99)
+        if interval is None:
+            return None
+        return self.first_token() + max_tokens * interval * self.factor
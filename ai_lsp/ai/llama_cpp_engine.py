@@ -0,0 +1,169 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from ai_lsp.ai.ollama_client import Handoff, OllamaCompletionEngine
+
+T = TypeVar("T")
+
+
+class Superseded(Exception):
+    """
+    A newer completion request was queued behind this one.
+    """
+
+
+class LlamaCppCompletionEngine(OllamaCompletionEngine):
+    """
+    Runs a GGUF model inside the server process with llama-cpp-python,
+    skipping the HTTP round trip and per-token JSON framing of a local
+    Ollama. Meant for single-developer machines without a GPU.
+
+    The model is loaded once and stays resident. Loading and every
+    generation happen on one dedicated inference thread: the event loop
+    stays free, and llama.cpp never sees two callers at once. While
+    typing only the newest request matters, so a generation stops as soon
+    as another request is queued behind it, and queued requests that were
+    overtaken never start.
+
+    llama.cpp keeps the KV cache of the previous prompt and only evaluates
+    the tokens after the common prefix. Consecutive keystrokes at one spot
+    therefore cost a few tokens of prompt processing each.
+    `state_cache_bytes` additionally keeps KV states of earlier prompts in
+    RAM, for hopping between files.
+
+    Tokens are streamed through the same loop as the HTTP engines, so
+    `on_token` agent hooks, stop sequences and the cache behave the same.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        model: Optional[str] = None,
+        n_ctx: int = 4096,
+        n_threads: Optional[int] = None,
+        state_cache_bytes: int = 0,
+        **kwargs,
+    ):
+        super().__init__(
+            model=model or os.path.basename(model_path),
+            base_url="in-process",
+            **kwargs,
+        )
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.state_cache_bytes = state_cache_bytes
+        self._llama: Any = None
+        self._inference = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ai-lsp-inference"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._superseded = self.metrics.registry.counter(
+            "ai_lsp_inference_superseded_total",
+            "In-process generations dropped for a newer request",
+        )
+
+    def load(self) -> "concurrent.futures.Future[Any]":
+        """
+        Start loading the model on the inference thread.
+        """
+        return self._inference.submit(self._model)
+
+    def close(self) -> None:
+        self._inference.shutdown(wait=False, cancel_futures=True)
+
+    def _model(self) -> Any:
+        if self._llama is None:
+            from llama_cpp import Llama
+
+            llama = Llama(
+                model_path=self.model_path,
+                n_ctx=self.n_ctx,
+                n_threads=self.n_threads,
+                verbose=False,
+            )
+            if self.state_cache_bytes:
+                from llama_cpp import LlamaRAMCache
+
+                llama.set_cache(LlamaRAMCache(capacity_bytes=self.state_cache_bytes))
+            self._llama = llama
+        return self._llama
+
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> Optional[T]:  # type: ignore[override]
+        handoff = Handoff()
+        with self._lock:
+            self._queued += 1
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        try:
+            return await loop.run_in_executor(
+                self._inference, functools.partial(context.run, self._run, handoff, fn, *args)
+            )
+        except Superseded:
+            return None
+        finally:
+            # Cancelled while still queued: `_run` never counts it off.
+            with self._lock:
+                if handoff.abandon():
+                    self._queued -= 1
+
+    def _run(self, handoff: Handoff, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if not handoff.start():
+                raise Superseded()
+            self._queued -= 1
+            overtaken = self._queued > 0
+        if overtaken:
+            # complete() gives back the breaker admission of requests that
+            # never reached the generation.
+            self._superseded.inc()
+            raise Superseded()
+        return fn(*args)
+
+    def _stream(self, prompt: str, options: dict) -> Iterator[dict]:
+        """
+        Yield llama.cpp's tokens as Ollama-shaped messages.
+        """
+        llama = self._model()
+        started = time.perf_counter_ns()
+        prompt_done: Optional[int] = None
+        count = 0
+        chunks = llama.create_completion(
+            prompt,
+            max_tokens=options.get("num_predict", 128),
+            temperature=options.get("temperature", 0),
+            seed=options.get("seed"),
+            stop=options.get("stop") or None,
+            stream=True,
+        )
+        try:
+            for chunk in chunks:
+                if self._queued:
+                    self._superseded.inc()
+                    raise Superseded()
+                if prompt_done is None:
+                    prompt_done = time.perf_counter_ns()
+                count += 1
+                text = chunk["choices"][0].get("text")
+                if text:
+                    yield {"response": text, "done": False}
+        finally:
+            # Stops decoding when the consumer breaks off at a stop sequence.
+            chunks.close()
+
+        finished = time.perf_counter_ns()
+        prompt_done = prompt_done or finished
+        yield {
+            "response": "",
+            "done": True,
+            "prompt_eval_duration": prompt_done - started,
+            "eval_count": count,
+            "eval_duration": finished - prompt_done,
+        }
@@ -1,20 +1,58 @@
 import asyncio
-import json
-from typing import Optional
+import itertools
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, TypeVar
 
 import requests
 
 from ai_lsp.agents.base import CompletionAgent
+from ai_lsp.agents.constraints import SuffixConstraintAgent
 from ai_lsp.agents.context import ContextPruningAgent
-from ai_lsp.agents.guard import OutputGuardAgent
+from ai_lsp.agents.guard import OutputGuardAgent, SyntaxGuardAgent
 from ai_lsp.agents.intent import CompletionIntentAgent, CursorWindowIntentAgent
+from ai_lsp.agents.pipeline import AgentPipeline, PipelineTimings
 from ai_lsp.agents.range_alignment import RangeAlignmentAgent
 from ai_lsp.agents.semantics import PrefixSemanticAgent
-from ai_lsp.ai.constraints import merge_suffix_constraints
+from ai_lsp.ai.cache import CompletionCache
+from ai_lsp.ai.circuit_breaker import CircuitBreaker
 from ai_lsp.ai.engine import CompletionEngine
+from ai_lsp.ai.hedging import HedgedStream, ndjson_messages
+from ai_lsp.ai.latency import AdaptiveTimeouts, LatencyTracker
+from ai_lsp.ai.orchestrator import CompletionOrchestrator
+from ai_lsp.ai.orchestrator.default_orchestrator import DefaultCompletionOrchestrator
 from ai_lsp.ai.sanitize import sanitize_completion
-from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.completion import CompletionContext, CompletionUsage
 from ai_lsp.domain.constraints import SuffixConstraints
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+from ai_lsp.observability.profiling import PROFILER, Profiler
+from ai_lsp.observability.tracing import current_trace
+
+T = TypeVar("T")
+
+
+class Handoff:
+    """
+    One request passed to a worker thread. Either the worker starts it or
+    the caller abandons it (cancelled while queued), never both.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = False
+        self.abandoned = False
+
+    def start(self) -> bool:
+        with self._lock:
+            if not self.abandoned:
+                self.started = True
+            return self.started
+
+    def abandon(self) -> bool:
+        with self._lock:
+            if not self.started:
+                self.abandoned = True
+            return self.abandoned
 
 
 class OllamaCompletionEngine(CompletionEngine):
@@ -24,12 +62,34 @@ class OllamaCompletionEngine(CompletionEngine):
         base_url: str = "http://localhost:11434",
         timeout: int = 10,
         agents: list[CompletionAgent] | None = None,
+        metrics: CompletionMetrics | None = None,
+        profiler: Profiler | None = None,
+        keep_alive: str | None = None,
+        cache: CompletionCache | None = None,
+        base_urls: list[str] | None = None,
+        breaker: CircuitBreaker | None = None,
+        orchestrator: CompletionOrchestrator | None = None,
     ):
         self.model = model
-        self.base_url = base_url
+        # Backend pool; requests are hedged across it when it has more
+        # than one node.
+        self.nodes = list(base_urls or [base_url])
+        self.base_url = self.nodes[0]
+        self._rotation = itertools.count()
         self.timeout = timeout
+        self.latency = LatencyTracker()
+        self.timeouts = AdaptiveTimeouts(self.latency, ceiling=timeout)
+        # Sent with every request so completions do not reset the model's
+        # keep-alive to Ollama's default.
+        self.keep_alive = keep_alive
+        self.cache = cache
+        self.metrics = metrics or METRICS
+        self.profiler = profiler or PROFILER
+        self.breaker = breaker or CircuitBreaker(metrics=self.metrics)
 
         self.agents = agents or [
+            SuffixConstraintAgent(),
+            SyntaxGuardAgent(),
             CompletionIntentAgent(),
             ContextPruningAgent(),
             RangeAlignmentAgent(),
@@ -39,33 +99,87 @@ class OllamaCompletionEngine(CompletionEngine):
         self.intent_agent = CursorWindowIntentAgent()
         self.prefix_semantic_agent = PrefixSemanticAgent()
 
+        self.pipeline = AgentPipeline(
+            self.agents,
+            intent_agent=self.intent_agent,
+            semantic_agent=self.prefix_semantic_agent,
+            orchestrator=orchestrator or DefaultCompletionOrchestrator(),
+        )
+        self.last_timings: Optional[PipelineTimings] = None
+
     async def complete(self, context: CompletionContext) -> Optional[str]:
-        constraints = []
+        trace = current_trace()
+        timings = PipelineTimings(trace=trace)
+        self.last_timings = timings
 
-        for agent in self.agents:
-            if hasattr(agent, "analyze"):
-                constraints.append(agent.analyze(context)) # pyright: ignore
+        preparation = self.pipeline.prepare(context, timings)
+        context.usage = CompletionUsage(
+            model=self.model,
+            strategy=preparation.decision and preparation.decision.strategy.value,
+            decision_input=preparation.input,
+        )
+        if trace:
+            trace.set(
+                intent=context.intent and context.intent.type.value,
+                strategy=preparation.decision and preparation.decision.strategy.value,
+                acceptance=preparation.decision and preparation.decision.acceptance,
+            )
+        if not preparation.allowed:
+            self.metrics.observe_stages(timings.stages)
+            return None
 
-            decision = agent.before_generation(context)
-            if not decision.allowed:
-                return None
+        # Fails fast, before any thread hop or I/O, while the backend is
+        # known to be down.
+        self.breaker.check()
 
-            context.intent = self.intent_agent.detect_intent(context)
-            context.semantics = self.prefix_semantic_agent.analyze(context)
+        handoff = Handoff()
+        try:
+            result = await self._submit(
+                self._handed_off,
+                handoff,
+                self.profiler.run,
+                self._blocking_complete,
+                context,
+                preparation.constraints,
+                timings,
+                time.perf_counter(),
+            )
+        finally:
+            # Cancelled (or dropped) before the worker picked it up: the
+            # admission was never judged, which would strand a half-open
+            # probe.
+            if handoff.abandon():
+                self.breaker.release()
+        self.metrics.observe_stages(timings.stages)
+        return result
 
-            decision = agent.before_generation(context)
-            if not decision.allowed:
-                return None
+    def close(self) -> None:
+        """
+        Release resources held by the engine; HTTP engines hold none.
+        """
 
-        merged_constraints = merge_suffix_constraints(constraints)
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run the blocking generation off the event loop.
+        """
+        return await asyncio.to_thread(fn, *args)
 
-        return await asyncio.to_thread(
-            self._blocking_complete,
-            context,
-            merged_constraints
-        )
+    @staticmethod
+    def _handed_off(handoff: Handoff, fn: Callable[..., T], *args: Any) -> Optional[T]:
+        if not handoff.start():
+            return None
+        return fn(*args)
 
-    def _blocking_complete(self, context: CompletionContext, constraints: SuffixConstraints) -> Optional[str]:
+    def _blocking_complete(
+        self,
+        context: CompletionContext,
+        constraints: SuffixConstraints,
+        timings: Optional[PipelineTimings] = None,
+        submitted: Optional[float] = None,
+    ) -> Optional[str]:
+        timings = timings or PipelineTimings()
+        if submitted is not None:
+            timings.add("queue_wait", submitted)
         prompt = self._build_prompt(context)
 
         options = {
@@ -77,50 +191,225 @@ class OllamaCompletionEngine(CompletionEngine):
         if constraints.stop_sequences:
             options["stop"] = constraints.stop_sequences
 
-        response = requests.post(
-            f"{self.base_url}/api/generate",
-            json={
-                "model": self.model,
-                "prompt": prompt,
-                "stream": True,
-                "options": options,
-            },
-            stream=True,
-            timeout=self.timeout,
-        )
+        cache_key = None
+        if self.cache is not None:
+            started = time.perf_counter()
+            cache_key = self.cache.key(
+                self.model,
+                dict(options, agent_stop=self.pipeline.stop_sequences),
+                prompt,
+            )
+            cached = self.cache.get(cache_key)
+            timings.add("cache_lookup", started)
+            if cached is not None:
+                self.breaker.release()
+                if context.usage is not None:
+                    context.usage.cache_hit = True
+                if timings.trace:
+                    timings.trace.set(cache_hit=True)
+                return self._finish(context, cached, timings)
+
+        try:
+            final, complete = self._generate(
+                prompt, options, constraints, timings, context.usage
+            )
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        if complete:
+            self.breaker.record_success()
+        else:
+            # Blowing the adaptive deadline means the backend is overloaded.
+            self.breaker.record_failure()
 
+        if cache_key is not None and final and complete:
+            self.cache.put(cache_key, final, self.model)  # pyright: ignore
+
+        return self._finish(context, final, timings)
+
+    def _generate(
+        self,
+        prompt: str,
+        options: dict,
+        constraints: SuffixConstraints,
+        timings: PipelineTimings,
+        usage: Optional[CompletionUsage] = None,
+    ) -> tuple[str, bool]:
+        """
+        Stream one generation and return the raw text, cut at the first
+        stop sequence, and whether it finished before the adaptive
+        deadline.
+        """
+        pipeline = self.pipeline
+        matcher = pipeline.stop_matcher(constraints)
         buffer: list[str] = []
-        for line in response.iter_lines():
-            if not line:
-                continue
-            data = json.loads(line)
+        cut: Optional[int] = None
+        started = request_started = time.perf_counter()
+        first_token_at = 0.0
+        first_token = True
+        cold = self.timeouts.cold()
+        deadline = self.timeouts.deadline(options.get("num_predict", 128))
+        complete = True
+        for data in self._messages(prompt, options):
+            if deadline is not None and time.perf_counter() - request_started > deadline:
+                self.metrics.deadlines.inc()
+                complete = False
+                break
+
+            if data.get("done"):
+                self.metrics.observe_backend(data)
+                if timings.trace:
+                    timings.trace.set(
+                        prompt_tokens=data.get("prompt_eval_count"),
+                        generated_tokens=data.get("eval_count"),
+                    )
+                if usage is not None:
+                    usage.prompt_tokens = data.get("prompt_eval_count")
+                    usage.generated_tokens = data.get("eval_count")
+
             token = data.get("response")
             if not token:
+                if data.get("done"):
+                    break
                 continue
 
-            for agent in self.agents:
-                decision = agent.on_token(token)
-                if decision and decision.stop_generation:
-                    final = "".join(buffer)
-                    return self._finalize(context, final)
+            if first_token:
+                timings.add("ttft", started)
+                started = first_token_at = time.perf_counter()
+                first_token = False
+
+            if pipeline.token_hooks and pipeline.on_token(token):
+                break
 
             buffer.append(token)
 
+            cut = matcher.feed(token)
+            if cut is not None:
+                break
+
             if data.get("done"):
                 break
+        finished = time.perf_counter()
+        timings.add("ttft" if first_token else "decode", started)
+
+        if complete and not first_token:
+            self.latency.observe(
+                first_token_at - request_started,
+                len(buffer),
+                finished - first_token_at,
+                cold=cold,
+            )
+            self.metrics.first_token_timeout.set(self.timeouts.first_token())
+
+        if timings.trace:
+            timings.trace.set(streamed_tokens=len(buffer))
+        if usage is not None and usage.generated_tokens is None:
+            usage.generated_tokens = len(buffer)
 
         final = "".join(buffer)
-        return self._finalize(context, final)
+        if cut is not None:
+            final = final[:cut]
+        return final, complete
+
+    def _finish(
+        self,
+        context: CompletionContext,
+        final: str,
+        timings: PipelineTimings,
+    ) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            return self._finalize(context, final, timings)
+        finally:
+            timings.add("finalize", started)
+
+    def _messages(self, prompt: str, options: dict) -> Iterator[dict]:
+        """
+        Stream from the single configured node, or hedge across the pool.
+        """
+        if len(self.nodes) < 2:
+            return self._stream(prompt, options)
+
+        first = next(self._rotation) % len(self.nodes)
+        nodes = self.nodes[first:] + self.nodes[:first]
+        timeout = self.timeouts.first_token()
+        hedge_after = self.timeouts.hedge_delay()
+        if hedge_after is None:
+            # A cold model is loading, not slow: another node would only
+            # load it too. Fail over once the whole first-token wait is up.
+            hedge_after = timeout if self.timeouts.cold() else timeout / 2
+        return iter(
+            HedgedStream(
+                lambda node: self._open(prompt, options, node, timeout),
+                nodes,
+                hedge_after=hedge_after,
+                timeout=timeout,
+                on_hedge=lambda node: self.metrics.hedges.inc(),
+                decode=self._decode,
+            )
+        )
 
-    def _finalize(self, context: CompletionContext, text: str) -> Optional[str]:
+    def _stream(self, prompt: str, options: dict) -> Iterator[dict]:
+        """
+        Yield the decoded messages of one streaming generate call.
+        """
+        response = self._open(
+            prompt, options, self.base_url, self.timeouts.first_token()
+        )
+
+        try:
+            response.raise_for_status()
+            yield from self._decode(response)
+        finally:
+            response.close()
+
+    def _decode(self, response: requests.Response) -> Iterator[dict]:
+        """
+        Messages in Ollama's /api/generate shape: `response` text chunks,
+        then a `done` message carrying the token counts.
+        """
+        return ndjson_messages(response)
+
+    def _open(
+        self,
+        prompt: str,
+        options: dict,
+        base_url: str,
+        timeout: float,
+    ) -> requests.Response:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options,
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        # The read timeout bounds the wait for the first token and any
+        # later stall; it adapts to the model's observed TTFT.
+        return requests.post(
+            f"{base_url}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=(min(self.timeout, 3.05), timeout),
+        )
+
+    def _finalize(
+        self,
+        context: CompletionContext,
+        text: str,
+        timings: Optional[PipelineTimings] = None,
+    ) -> Optional[str]:
         text = sanitize_completion(text).strip()
-        for agent in self.agents:
-            result = agent.after_generation(context, text)
-            if result is None:
-                return None
-            text = result
+        result = self.pipeline.after_generation(context, text, timings)
+        if result is None:
+            return None
 
-        return text.strip()
+        return result.strip()
 
     def _build_prompt(self, context: CompletionContext) -> str:
         previous = "\n".join(context.previous_lines)
@@ -0,0 +1,106 @@
+import json
+from typing import Iterator, Optional
+
+import requests
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+
+# The OpenAI API accepts at most four stop sequences. The agents' stop
+# sequences are enforced on the stream either way; the server-side ones
+# only save decoding past them.
+MAX_STOP_SEQUENCES = 4
+
+
+class OpenAICompletionEngine(OllamaCompletionEngine):
+    """
+    Completion engine for OpenAI-compatible servers such as llama.cpp's
+    server or vLLM, through the streaming `/v1/completions` endpoint.
+
+    Those servers batch concurrent requests into one decode loop instead
+    of queueing them per model, so many editors sharing one server get far
+    more aggregate throughput. The server-sent events are translated into
+    Ollama-shaped messages, which keeps everything else shared with the
+    Ollama engine: agents, stop sequences, cancellation by closing the
+    stream, hedging, the circuit breaker and the cache.
+
+    `base_url` includes the API prefix, e.g. "http://localhost:8080/v1".
+    """
+
+    def __init__(
+        self,
+        model: str = "codellama:7b",
+        base_url: str = "http://localhost:8080/v1",
+        api_key: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(model=model, base_url=base_url, **kwargs)
+        self.api_key = api_key
+
+    def _open(
+        self,
+        prompt: str,
+        options: dict,
+        base_url: str,
+        timeout: float,
+    ) -> requests.Response:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "max_tokens": options.get("num_predict", 128),
+            "temperature": options.get("temperature", 0),
+            # Token counts arrive in one last event before [DONE].
+            "stream_options": {"include_usage": True},
+        }
+        if options.get("seed") is not None:
+            payload["seed"] = options["seed"]
+        stop = options.get("stop")
+        if stop:
+            payload["stop"] = list(stop)[:MAX_STOP_SEQUENCES]
+
+        headers = {"Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        return requests.post(
+            f"{base_url}/completions",
+            json=payload,
+            headers=headers,
+            stream=True,
+            timeout=(min(self.timeout, 3.05), timeout),
+        )
+
+    def _decode(self, response: requests.Response) -> Iterator[dict]:
+        """
+        Translate `data:` events into Ollama-shaped messages: one per text
+        chunk, then a `done` message with the usage counts. A stream that
+        ends without [DONE] gets no `done` message, as a truncated Ollama
+        stream would not.
+        """
+        done: dict = {"response": "", "done": True}
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                # Blank separators, comments (": ping") and event names.
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                yield done
+                return
+
+            event = json.loads(data)
+            error = event.get("error")
+            if error:
+                message = error.get("message") if isinstance(error, dict) else error
+                raise requests.RequestException(f"Backend error: {message}")
+
+            usage = event.get("usage")
+            if usage:
+                done["prompt_eval_count"] = usage.get("prompt_tokens")
+                done["eval_count"] = usage.get("completion_tokens")
+
+            for choice in event.get("choices") or ():
+                text = choice.get("text")
+                if text:
+                    yield {"response": text, "done": False}
+                if choice.get("finish_reason"):
+                    done["done_reason"] = choice["finish_reason"]
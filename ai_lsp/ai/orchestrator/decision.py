@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from ai_lsp.ai.orchestrator.strategy import CompletionStrategy
 
@@ -14,6 +15,9 @@ class CompletionDecision:
     allow_multiline: bool
     require_rag: bool
     explanation: str
+    # Predicted probability that the completion gets used, when a predictor
+    # is configured.
+    acceptance: Optional[float] = None
     
 
 
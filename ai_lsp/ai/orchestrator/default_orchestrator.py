@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from ai_lsp.agents.intent_types import EditIntentType
+from ai_lsp.ai.acceptance import AcceptancePredictor, acceptance_features
 from ai_lsp.ai.orchestrator.decision import CompletionDecision
 from ai_lsp.ai.orchestrator.decision_input import CompletionDecisionInput
 from ai_lsp.ai.orchestrator.orchestrator import CompletionOrchestrator
@@ -22,6 +25,14 @@ class DefaultCompletionOrchestrator(CompletionOrchestrator):
     MIN_INTENT_CONFIDENCE: float = 0.35
     MIN_CONSTRAINT_CONFIDENCE: float = 0.30
 
+    def __init__(
+        self,
+        predictor: Optional[AcceptancePredictor] = None,
+        acceptance_threshold: float = 0.15,
+    ) -> None:
+        self.predictor = predictor
+        self.acceptance_threshold = acceptance_threshold
+
     def decide(self, input: CompletionDecisionInput) -> CompletionDecision:
         intent = input.intent
         semantics = input.semantics
@@ -38,6 +49,17 @@ class DefaultCompletionOrchestrator(CompletionOrchestrator):
                 constraints.confidence, "Suffix constraints confidence too low"
             )
 
+        # ----------------------------------------------------------------------
+        # 1b. Predicted acceptance: skip calls whose output would be ignored
+        # ----------------------------------------------------------------------
+        acceptance = None
+        if self.predictor is not None:
+            acceptance = self.predictor.predict(acceptance_features(input))
+            if acceptance < self.acceptance_threshold:
+                return self._no_completion(
+                    acceptance, "Predicted acceptance too low", acceptance
+                )
+
         # ----------------------------------------------------------------------
         # 2. Intent -> strategy
         # ----------------------------------------------------------------------
@@ -97,6 +119,7 @@ class DefaultCompletionOrchestrator(CompletionOrchestrator):
             allow_multiline=allow_multiline,
             require_rag=require_rag,
             explanation=self._explain(strategy, require_rag, intent.reason),
+            acceptance=acceptance,
         )
 
     # ----------------------------------------------------------------------
@@ -129,6 +152,7 @@ class DefaultCompletionOrchestrator(CompletionOrchestrator):
         self,
         confidence: float,
         reason: str,
+        acceptance: Optional[float] = None,
     ) -> CompletionDecision:
         return CompletionDecision(
             should_complete=False,
@@ -138,6 +162,7 @@ class DefaultCompletionOrchestrator(CompletionOrchestrator):
             allow_multiline=False,
             require_rag=False,
             explanation=reason,
+            acceptance=acceptance,
         )
 
     def _explain(
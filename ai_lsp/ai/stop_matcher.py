@@ -0,0 +1,102 @@
+from functools import lru_cache
+from typing import Iterable, Optional
+
+
+class StopAutomaton:
+    """
+    Aho-Corasick automaton over a set of stop sequences.
+
+    The automaton is immutable and shared; streaming state lives in the
+    StopSequenceMatcher instances it hands out.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = tuple(dict.fromkeys(p for p in patterns if p))
+
+        goto: list[dict[str, int]] = [{}]
+        # Length of the longest pattern ending at each node (0 = none).
+        out: list[int] = [0]
+
+        for pattern in self.patterns:
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(0)
+                node = nxt
+            out[node] = max(out[node], len(pattern))
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                out[nxt] = max(out[nxt], out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def matcher(self) -> "StopSequenceMatcher":
+        return StopSequenceMatcher(self)
+
+
+class StopSequenceMatcher:
+    """
+    Streaming matcher that carries its automaton state across tokens, so a
+    stop sequence split over several tokens is still found.
+    """
+
+    def __init__(self, automaton: StopAutomaton) -> None:
+        self._automaton = automaton
+        self._node = 0
+        self._offset = 0
+
+    def feed(self, text: str) -> Optional[int]:
+        """
+        Consume the next chunk of generated text.
+
+        Returns the offset, counted from the first character ever fed, where
+        the first completed stop sequence starts; output should be cut
+        there. Returns None while no stop sequence has completed.
+        """
+        automaton = self._automaton
+        if not automaton.patterns:
+            self._offset += len(text)
+            return None
+
+        goto, fail, out = automaton._goto, automaton._fail, automaton._out
+        node = self._node
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = self._offset + index + 1
+                self._node = node
+                self._offset += len(text)
+                return end - out[node]
+
+        self._node = node
+        self._offset += len(text)
+        return None
+
+
+@lru_cache(maxsize=256)
+def _compile(patterns: tuple[str, ...]) -> StopAutomaton:
+    return StopAutomaton(patterns)
+
+
+def compile_stop_sequences(patterns: Iterable[str]) -> StopAutomaton:
+    """
+    Build (or reuse) the automaton for a set of stop sequences.
+    """
+    return _compile(tuple(dict.fromkeys(patterns)))
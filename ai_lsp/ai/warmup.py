@@ -0,0 +1,176 @@
+import math
+import threading
+import time
+from typing import Optional
+
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+
+
+def keep_alive_value(seconds: float) -> str:
+    """
+    Ollama `keep_alive` duration. Never "0s", which means unload now.
+    """
+    return f"{max(1, math.ceil(seconds))}s"
+
+
+class ModelWarmup:
+    """
+    Keeps the configured Ollama models loaded while the editor is active.
+
+    Models are preloaded when `start()` is called (on `initialized` or the
+    first `didOpen`), then pinged every `ping_interval` seconds as long as
+    there was editor activity within `idle_timeout`. Every ping asks Ollama
+    to keep the model for `idle_timeout`, so once the editor goes quiet
+    the pings stop and Ollama unloads the model on its own.
+
+    `touch()` runs on every document event, so it only stores a timestamp
+    and, when a model is cold, wakes the background thread.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        base_url: str = "http://localhost:11434",
+        ping_interval: float = 60.0,
+        idle_timeout: float = 900.0,
+        load_timeout: float = 120.0,
+        metrics: Optional[CompletionMetrics] = None,
+    ) -> None:
+        self.models = list(dict.fromkeys(models))
+        self.base_url = base_url
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.load_timeout = load_timeout
+
+        metrics = metrics or METRICS
+        registry = metrics.registry
+        self._warm_gauges = {
+            model: registry.gauge(
+                "ai_lsp_model_warm", "1 while the model is believed loaded", model=model
+            )
+            for model in self.models
+        }
+        self._loads = registry.counter(
+            "ai_lsp_model_warmups_total", "Warm-up and keep-alive requests sent"
+        )
+        self._failures = registry.counter(
+            "ai_lsp_model_warmup_failures_total", "Warm-up requests that failed"
+        )
+        self._load_time = registry.histogram(
+            "ai_lsp_model_warmup_seconds", "Duration of warm-up requests"
+        )
+
+        self.last_activity = time.monotonic()
+        self.last_ping: dict[str, float] = {}
+        # After a failed ping, keystrokes must not trigger a retry storm.
+        self._retry_at: dict[str, float] = {}
+        self.warm: dict[str, bool] = {model: False for model in self.models}
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def keep_alive(self) -> str:
+        return keep_alive_value(self.idle_timeout)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="ai-lsp-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread and wait:
+            self._thread.join()
+            self._thread = None
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+        if not all(self.warm.values()):
+            self._wake.set()
+
+    def is_warm(self, model: str) -> bool:
+        return self.warm.get(model, False)
+
+    def state(self) -> dict[str, float]:
+        """
+        Seconds since the last successful ping of every warm model.
+        """
+        now = time.monotonic()
+        return {
+            model: now - self.last_ping[model]
+            for model in self.models
+            if self.warm[model] and model in self.last_ping
+        }
+
+    def restore(self, pinged_ago: dict[str, float]) -> None:
+        """
+        Take over warm models from an earlier process. A model pinged less
+        than `idle_timeout` ago is still held by Ollama, so it is not
+        preloaded again before its next regular ping.
+        """
+        now = time.monotonic()
+        for model, ago in pinged_ago.items():
+            if model in self.warm and 0 <= ago < self.idle_timeout:
+                self.last_ping[model] = now - ago
+                self._set_warm(model, True)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.tick()
+            self._wake.wait(self.ping_interval)
+            self._wake.clear()
+
+    def tick(self) -> None:
+        """
+        One round of the background loop: ping models that are due while
+        the editor is active, and mark models cold once their keep-alive
+        has run out.
+        """
+        now = time.monotonic()
+        active = now - self.last_activity < self.idle_timeout
+        for model in self.models:
+            last = self.last_ping.get(model)
+            if now < self._retry_at.get(model, 0.0):
+                continue
+            if active and (
+                not self.warm[model] or last is None or now - last >= self.ping_interval
+            ):
+                self._ping(model)
+            elif last is not None and now - last >= self.idle_timeout:
+                self._set_warm(model, False)
+
+    def _ping(self, model: str) -> None:
+        # Imported here so that creating the manager at startup stays cheap.
+        import requests
+
+        started = time.perf_counter()
+        self._loads.inc()
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "prompt": "", "keep_alive": self.keep_alive},
+                timeout=self.load_timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            self._failures.inc()
+            self._retry_at[model] = time.monotonic() + self.ping_interval
+            self._set_warm(model, False)
+            return
+        finally:
+            self._load_time.observe(time.perf_counter() - started)
+
+        self.last_ping[model] = time.monotonic()
+        self._set_warm(model, True)
+
+    def _set_warm(self, model: str, warm: bool) -> None:
+        self.warm[model] = warm
+        self._warm_gauges[model].set(1.0 if warm else 0.0)
@@ -0,0 +1,161 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Settings:
+    """
+    Server settings, read from AI_LSP_* environment variables.
+    """
+
+    # "ollama", "openai" for OpenAI-compatible /v1/completions servers
+    # (llama.cpp server, vLLM), or "llama_cpp" to run a GGUF model in
+    # process (needs llama-cpp-python).
+    backend: str = "ollama"
+    ollama_url: str = "http://localhost:11434"
+    # Optional backend pool; completions are hedged across its nodes.
+    ollama_urls: tuple[str, ...] = ()
+    openai_url: str = "http://localhost:8080/v1"
+    openai_urls: tuple[str, ...] = ()
+    openai_api_key: Optional[str] = None
+    llama_model_path: Optional[str] = None
+    llama_context: int = 4096
+    llama_threads: Optional[int] = None
+    # RAM for KV states of earlier prompts, beyond the current one.
+    llama_state_cache_mb: int = 0
+    model: str = "codellama:7b"
+    timeout: int = 10
+    # Prometheus text exports; both are off unless configured.
+    metrics_file: Optional[str] = None
+    metrics_port: Optional[int] = None
+    # Request traces as rotating JSONL; off unless a file is configured.
+    trace_file: Optional[str] = None
+    trace_sample: float = 1.0
+    trace_max_bytes: int = 10_000_000
+    # Circuit breaker: open at this failure rate, probe again after the
+    # cooldown (doubling while the backend stays down).
+    breaker_threshold: float = 0.5
+    breaker_cooldown: float = 5.0
+    # Model warm-up: preload on startup, ping while the editor is active and
+    # let Ollama unload the model after `idle_unload` seconds of inactivity.
+    warmup: bool = True
+    warmup_models: tuple[str, ...] = ()
+    keep_alive_interval: float = 60.0
+    idle_unload: float = 900.0
+    # Persistent completion cache shared by all server processes; None
+    # means the default location under $XDG_CACHE_HOME.
+    cache: bool = True
+    cache_file: Optional[str] = None
+    cache_max_entries: int = 20_000
+    # Latency samples, hot cache keys and warm models saved every
+    # `state_interval` seconds and on shutdown, and restored at startup;
+    # None means the default location under $XDG_STATE_HOME.
+    state: bool = True
+    state_file: Optional[str] = None
+    state_interval: float = 300.0
+    # Acceptance predictor trained with `python -m ai_lsp.ai.acceptance`;
+    # requests scoring below the threshold are not sent to the backend.
+    acceptance_model: Optional[str] = None
+    acceptance_threshold: float = 0.15
+    # Append-only log of what happened to each offered completion; off
+    # unless a file is configured.
+    acceptance_log: Optional[str] = None
+    # Analysis worker processes for large documents; 0 runs everything on
+    # the event loop. Budgets are "stage=seconds" overrides.
+    analysis_workers: int = 0
+    analysis_min_chars: int = 200_000
+    analysis_budgets: tuple[tuple[str, float], ...] = ()
+    # Event loop lag sampling; blocking the loop for longer than the
+    # threshold logs a warning with the stack.
+    loop_monitor: bool = True
+    slow_handler_threshold: float = 0.1
+    # Profile the first completions after startup, e.g. "cprofile:20".
+    profile: Optional[str] = None
+    profile_dir: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            backend=os.getenv("AI_LSP_BACKEND", cls.backend).lower(),
+            ollama_url=os.getenv("AI_LSP_OLLAMA_URL", cls.ollama_url),
+            ollama_urls=_csv(os.getenv("AI_LSP_OLLAMA_URLS")),
+            openai_url=os.getenv("AI_LSP_OPENAI_URL", cls.openai_url),
+            openai_urls=_csv(os.getenv("AI_LSP_OPENAI_URLS")),
+            openai_api_key=os.getenv("AI_LSP_OPENAI_API_KEY") or None,
+            llama_model_path=os.getenv("AI_LSP_LLAMA_MODEL_PATH") or None,
+            llama_context=int(os.getenv("AI_LSP_LLAMA_CONTEXT", cls.llama_context)),
+            llama_threads=_optional_int(os.getenv("AI_LSP_LLAMA_THREADS")),
+            llama_state_cache_mb=int(
+                os.getenv("AI_LSP_LLAMA_STATE_CACHE_MB", cls.llama_state_cache_mb)
+            ),
+            model=os.getenv("AI_LSP_MODEL", cls.model),
+            timeout=int(os.getenv("AI_LSP_TIMEOUT", cls.timeout)),
+            metrics_file=os.getenv("AI_LSP_METRICS_FILE") or None,
+            metrics_port=_optional_int(os.getenv("AI_LSP_METRICS_PORT")),
+            trace_file=os.getenv("AI_LSP_TRACE_FILE") or None,
+            trace_sample=float(os.getenv("AI_LSP_TRACE_SAMPLE", cls.trace_sample)),
+            trace_max_bytes=int(
+                os.getenv("AI_LSP_TRACE_MAX_BYTES", cls.trace_max_bytes)
+            ),
+            breaker_threshold=float(
+                os.getenv("AI_LSP_BREAKER_THRESHOLD", cls.breaker_threshold)
+            ),
+            breaker_cooldown=float(
+                os.getenv("AI_LSP_BREAKER_COOLDOWN", cls.breaker_cooldown)
+            ),
+            warmup=os.getenv("AI_LSP_WARMUP", "1").lower() not in ("0", "false", "no"),
+            warmup_models=_csv(os.getenv("AI_LSP_WARMUP_MODELS")),
+            keep_alive_interval=float(
+                os.getenv("AI_LSP_KEEP_ALIVE_INTERVAL", cls.keep_alive_interval)
+            ),
+            idle_unload=float(os.getenv("AI_LSP_IDLE_UNLOAD", cls.idle_unload)),
+            cache=os.getenv("AI_LSP_CACHE", "1").lower() not in ("0", "false", "no"),
+            cache_file=os.getenv("AI_LSP_CACHE_FILE") or None,
+            cache_max_entries=int(
+                os.getenv("AI_LSP_CACHE_MAX_ENTRIES", cls.cache_max_entries)
+            ),
+            state=os.getenv("AI_LSP_STATE", "1").lower() not in ("0", "false", "no"),
+            state_file=os.getenv("AI_LSP_STATE_FILE") or None,
+            state_interval=float(
+                os.getenv("AI_LSP_STATE_INTERVAL", cls.state_interval)
+            ),
+            acceptance_model=os.getenv("AI_LSP_ACCEPTANCE_MODEL") or None,
+            acceptance_threshold=float(
+                os.getenv("AI_LSP_ACCEPTANCE_THRESHOLD", cls.acceptance_threshold)
+            ),
+            acceptance_log=os.getenv("AI_LSP_ACCEPTANCE_LOG") or None,
+            analysis_workers=int(
+                os.getenv("AI_LSP_ANALYSIS_WORKERS", cls.analysis_workers)
+            ),
+            analysis_min_chars=int(
+                os.getenv("AI_LSP_ANALYSIS_MIN_CHARS", cls.analysis_min_chars)
+            ),
+            analysis_budgets=_budgets(os.getenv("AI_LSP_ANALYSIS_BUDGETS")),
+            loop_monitor=os.getenv("AI_LSP_LOOP_MONITOR", "1").lower()
+            not in ("0", "false", "no"),
+            slow_handler_threshold=float(
+                os.getenv("AI_LSP_SLOW_HANDLER_THRESHOLD", cls.slow_handler_threshold)
+            ),
+            profile=os.getenv("AI_LSP_PROFILE") or None,
+            profile_dir=os.getenv("AI_LSP_PROFILE_DIR") or None,
+        )
+
+
+def _csv(value: Optional[str]) -> tuple[str, ...]:
+    return tuple(item.strip() for item in (value or "").split(",") if item.strip())
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _budgets(value: Optional[str]) -> tuple[tuple[str, float], ...]:
+    """
+    "context_build=0.2,other=1" -> (("context_build", 0.2), ("other", 1.0))
+    """
+    budgets = []
+    for item in _csv(value):
+        stage, _, seconds = item.partition("=")
+        budgets.append((stage.strip(), float(seconds)))
+    return tuple(budgets)
@@ -1,8 +1,31 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
 from ai_lsp.agents.intent_types import EditIntent, EditIntentType
+from ai_lsp.domain.lexical import LexicalFeatures
 from ai_lsp.domain.semantics import PrefixSemantics
+from ai_lsp.domain.syntax import SyntaxInfo
+
+if TYPE_CHECKING:
+    from ai_lsp.ai.orchestrator.decision_input import CompletionDecisionInput
+
+
+@dataclass
+class CompletionUsage:
+    """
+    What the engine did for one request, filled in as it goes so the
+    server can log it next to the completion's fate.
+    """
+
+    model: str
+    strategy: Optional[str] = None
+    # Kept so acceptance features are only computed for completions that
+    # are actually logged.
+    decision_input: Optional["CompletionDecisionInput"] = None
+    prompt_tokens: Optional[int] = None
+    generated_tokens: Optional[int] = None
+    cache_hit: bool = False
+
 
 @dataclass
 class CompletionContext:
@@ -19,3 +42,10 @@ class CompletionContext:
     character: int
     intent: Optional[EditIntent] = None
     semantics: Optional[PrefixSemantics] = None
+    syntax: Optional[SyntaxInfo] = None
+    lexical: Optional[LexicalFeatures] = None
+    # Typing cadence: smoothed seconds between edits, and seconds since the
+    # last edit when the context was built.
+    typing_interval: Optional[float] = None
+    typing_pause: Optional[float] = None
+    usage: Optional[CompletionUsage] = None
@@ -8,3 +8,6 @@ class SuffixConstraints:
     forbidden_newlines: bool = False
     stop_sequences: List[str] = field(default_factory=list)
     confidence: float = 0.5
+    # Brackets still open at the cursor, outermost first, including those
+    # opened on earlier lines. Empty without a syntax tree.
+    open_brackets: str = ""
@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class LexicalFeatures:
+    """
+    Character-level facts about the text around the cursor, computed in one
+    pass over the prefix and one over the suffix.
+
+    These are purely lexical: brackets inside strings still count. The
+    syntax tree, when there is one, is the source of truth for structure.
+    """
+
+    # prefix
+    depth: int = 0
+    paren_open: bool = False  # the last paren before the cursor is "("
+    quote: Optional[str] = None  # string left open on the cursor line
+    trigger: Optional[str] = None  # ".", "->", "::" or "$" ending the prefix
+    docstring_quotes: int = 0  # non-overlapping '"""' in the prefix
+    doc_comment_open: bool = False  # "/**" in the prefix
+    identifiers: tuple[str, ...] = ()
+
+    # suffix
+    closers: tuple[str, ...] = ()  # every ")", "]" and "}" in the suffix
+    leading: tuple[str, ...] = ()  # closers, ";" and "," the suffix starts with
+    suffix_blank: bool = True
+    suffix_paren: bool = False  # ")" in the suffix
+    suffix_docstring: bool = False  # '"""' in the suffix
+    suffix_doc_comment_end: bool = False  # "*/" in the suffix
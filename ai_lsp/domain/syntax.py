@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from ai_lsp.domain.semantics import ScopeType
+
+
+@dataclass(frozen=True)
+class SyntaxInfo:
+    """
+    Structural facts about the cursor position, read from the document's
+    syntax tree.
+    """
+
+    scope: ScopeType
+    function: Optional[str] = None
+    class_name: Optional[str] = None
+    in_string: bool = False
+    in_comment: bool = False
+    in_docstring: bool = False
+    # The string or block comment around the cursor was opened on an
+    # earlier line, which the current-line agents cannot see.
+    multiline: bool = False
+    brackets: str = ""  # open at the cursor, outermost first
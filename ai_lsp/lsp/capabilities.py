@@ -1,5 +1,8 @@
 import asyncio
-from typing import Dict
+import atexit
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional
 
 from lsprotocol import types
 from lsprotocol.types import (
@@ -15,10 +18,36 @@ from lsprotocol.types import (
 )
 from pygls.lsp.server import LanguageServer
 
-from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.ai.circuit_breaker import CircuitBreaker, CircuitOpenError
+from ai_lsp.ai.warmup import ModelWarmup, keep_alive_value
+from ai_lsp.config import Settings
 from ai_lsp.domain.completion import CompletionContext
 from ai_lsp.lsp.context_builder import CompletionContextBuilder
 from ai_lsp.lsp.documents import DocumentStore
+from ai_lsp.lsp.lazy import LazyService
+from ai_lsp.lsp.offload import AnalysisPool, ScopedAnalysis
+from ai_lsp.lsp.status import BackendStatusNotifier
+from ai_lsp.lsp.telemetry import AcceptanceTracker
+from ai_lsp.lsp.warm_state import WarmState, default_state_path
+from ai_lsp.observability.loop_monitor import LoopMonitor
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+from ai_lsp.observability.profiling import PROFILER, Profiler, parse_profile_spec
+from ai_lsp.observability.tracing import (
+    JsonlTraceExporter,
+    NullTrace,
+    Trace,
+    Tracer,
+    reset_current_trace,
+    set_current_trace,
+)
+
+if TYPE_CHECKING:
+    from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+
+logger = logging.getLogger(__name__)
+
+METRICS_COMMAND = "ai-lsp.metrics"
+PROFILE_COMMAND = "ai-lsp.profile"
 
 
 def make_inline_edit(
@@ -49,32 +78,373 @@ def make_inline_edit(
     )
 
 
-def register_capabilities(server: LanguageServer):
+class SharedServices:
+    """
+    Process-wide services: the engine with its backend pool, breaker,
+    cache and scheduling, plus tracing, model warm-up, analysis workers,
+    the loop monitor, the acceptance log and the warm state snapshot.
+
+    A stdio server owns one set. In multi-client mode every connection
+    shares one, while documents, in-flight completions and status notices
+    stay per connection.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.state = make_warm_state(settings)
+        # The engine pulls in the HTTP client and every agent; keep that off
+        # the path to the initialize response.
+        self.engine = LazyService(self._make_engine, name="engine")
+        self.tracer = make_tracer(settings)
+        self.warmup = make_warmup(settings)
+        if self.state and self.warmup:
+            self.state.restore_warmup(self.warmup)
+        self.acceptance_log = make_acceptance_log(settings)
+        self.analysis = AnalysisPool(
+            workers=settings.analysis_workers,
+            budgets=dict(settings.analysis_budgets),
+            min_chars=settings.analysis_min_chars,
+            metrics=METRICS,
+        )
+        self.monitor = make_loop_monitor(settings, self.log_warning)
+        # Connected clients, for messages that concern all of them.
+        self.clients: list[LanguageServer] = []
+        self._started = False
+
+        start_metrics_exporters(METRICS, settings)
+        configure_profiler(PROFILER, settings)
+
+    def start(self) -> None:
+        """
+        Start background services. Must be called from the event loop;
+        later calls do nothing.
+        """
+        if self._started:
+            return
+        self._started = True
+        if self.monitor:
+            self.monitor.start()
+        self.engine.preload()
+        if self.warmup:
+            self.warmup.start()
+        self.analysis.start()
+        if self.state:
+            self.state.start(self.save_state)
+            # Editors often close stdin or terminate the server without a
+            # shutdown request.
+            atexit.register(self.save_state)
+
+    def stop(self) -> None:
+        if self.state:
+            self.state.stop()
+            self.save_state()
+        if self.engine.value is not None:
+            self.engine.value.close()
+        if self.warmup:
+            self.warmup.stop(wait=False)
+        self.analysis.shutdown()
+        if self.monitor:
+            self.monitor.stop()
+
+    def save_state(self) -> None:
+        if self.state:
+            self.state.save(self.engine.value, self.warmup)
+
+    def _make_engine(self) -> "OllamaCompletionEngine":
+        engine = make_engine(self.settings)
+        if self.state:
+            self.state.restore_engine(engine)
+        return engine
+
+    def log_warning(self, message: str) -> None:
+        for client in self.clients:
+            client.window_log_message(
+                LogMessageParams(type=MessageType.Warning, message=message)
+            )
+
+
+def register_capabilities(
+    server: LanguageServer,
+    services: Optional[SharedServices] = None,
+    scope: str = "",
+):
+    """
+    Register every feature on `server`. Without `services` the server
+    owns a fresh set and stops it on shutdown; with them, `scope` keeps
+    this connection's documents apart from other clients' in the shared
+    analysis workers.
+    """
+    owned = services is None
+    if services is None:
+        services = SharedServices(Settings.from_env())
+    services.clients.append(server)
+
     documents = DocumentStore()
     context_builder = CompletionContextBuilder()
-    engine = OllamaCompletionEngine()
+    # Outcomes are only tracked for the acceptance log.
+    telemetry = (
+        AcceptanceTracker(services.acceptance_log, metrics=METRICS)
+        if services.acceptance_log
+        else None
+    )
+    analysis = services.analysis.scoped(scope)
+
+    register_lifecycle(server, services, telemetry, owned)
+    register_documents(server, documents, services.warmup, telemetry, analysis)
+    register_completion(
+        server,
+        documents,
+        context_builder,
+        services.engine,
+        services.tracer,
+        telemetry=telemetry,
+        analysis=analysis,
+    )
+    register_metrics(server, METRICS)
+    register_profiling(
+        server,
+        PROFILER,
+        documents,
+        scope,
+        engine=services.engine if services.settings.cache else None,
+    )
+
+    if services.monitor:
+        services.monitor.instrument(server)
+
+
+def make_engine(settings: Settings) -> "OllamaCompletionEngine":
+    import sqlite3
+
+    from ai_lsp.ai.acceptance import AcceptancePredictor
+    from ai_lsp.ai.cache import CompletionCache, default_cache_path
+    from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+    from ai_lsp.ai.orchestrator.default_orchestrator import (
+        DefaultCompletionOrchestrator,
+    )
+
+    cache = None
+    if settings.cache:
+        try:
+            cache = CompletionCache(
+                settings.cache_file or default_cache_path(),
+                max_entries=settings.cache_max_entries,
+                metrics=METRICS,
+            )
+        except (OSError, sqlite3.Error):
+            cache = None
+
+    predictor = None
+    if settings.acceptance_model:
+        try:
+            predictor = AcceptancePredictor.load(settings.acceptance_model)
+        except (OSError, ValueError, KeyError):
+            predictor = None
+
+    options = dict(
+        model=settings.model,
+        timeout=settings.timeout,
+        metrics=METRICS,
+        profiler=PROFILER,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.breaker_threshold,
+            cooldown=settings.breaker_cooldown,
+            metrics=METRICS,
+        ),
+        cache=cache,
+        orchestrator=DefaultCompletionOrchestrator(
+            predictor=predictor,
+            acceptance_threshold=settings.acceptance_threshold,
+        ),
+    )
 
-    register_documents(server, documents)
-    register_completion(server, documents, context_builder, engine)
+    if settings.backend == "llama_cpp":
+        from ai_lsp.ai.llama_cpp_engine import LlamaCppCompletionEngine
+
+        if not settings.llama_model_path:
+            raise ValueError("AI_LSP_LLAMA_MODEL_PATH must point to a GGUF model")
+        options.pop("model")
+        engine = LlamaCppCompletionEngine(
+            settings.llama_model_path,
+            n_ctx=settings.llama_context,
+            n_threads=settings.llama_threads,
+            state_cache_bytes=settings.llama_state_cache_mb * 1024 * 1024,
+            **options,
+        )
+        # Loading takes seconds; start now rather than on the first request.
+        engine.load()
+        # The model stays resident once loaded.
+        engine.timeouts.cold_after = None
+        return engine
 
+    if settings.backend == "openai":
+        from ai_lsp.ai.openai_client import OpenAICompletionEngine
 
-def register_documents(server: LanguageServer, documents: DocumentStore):
+        engine = OpenAICompletionEngine(
+            base_url=settings.openai_url,
+            base_urls=list(settings.openai_urls) or None,
+            api_key=settings.openai_api_key,
+            **options,
+        )
+        engine.timeouts.cold_after = None
+        return engine
+
+    engine = OllamaCompletionEngine(
+        base_url=settings.ollama_url,
+        base_urls=list(settings.ollama_urls) or None,
+        keep_alive=keep_alive_value(settings.idle_unload) if settings.warmup else None,
+        **options,
+    )
+    if settings.warmup:
+        # Every request extends the keep-alive to `idle_unload`.
+        engine.timeouts.cold_after = settings.idle_unload
+    return engine
+
+
+def make_warmup(settings: Settings) -> Optional[ModelWarmup]:
+    # OpenAI-compatible servers load their model at startup and keep it.
+    if not settings.warmup or settings.backend != "ollama":
+        return None
+    return ModelWarmup(
+        list(settings.warmup_models or (settings.model,)),
+        base_url=settings.ollama_url,
+        ping_interval=settings.keep_alive_interval,
+        idle_timeout=settings.idle_unload,
+        metrics=METRICS,
+    )
+
+
+def make_warm_state(settings: Settings) -> Optional[WarmState]:
+    if not settings.state:
+        return None
+    return WarmState(
+        settings.state_file or default_state_path(),
+        interval=settings.state_interval,
+        metrics=METRICS,
+    )
+
+
+def make_tracer(settings: Settings) -> Tracer:
+    if not settings.trace_file:
+        return Tracer()
+    return Tracer(
+        JsonlTraceExporter(settings.trace_file, max_bytes=settings.trace_max_bytes),
+        sample_rate=settings.trace_sample,
+    )
+
+
+def make_loop_monitor(
+    settings: Settings, on_stall: Callable[[str], None]
+) -> Optional[LoopMonitor]:
+    if not settings.loop_monitor:
+        return None
+    return LoopMonitor(
+        threshold=settings.slow_handler_threshold,
+        metrics=METRICS,
+        on_stall=on_stall,
+    )
+
+
+def make_acceptance_log(settings: Settings) -> Optional[JsonlTraceExporter]:
+    if not settings.acceptance_log:
+        return None
+    return JsonlTraceExporter(
+        settings.acceptance_log, max_bytes=settings.trace_max_bytes
+    )
+
+
+def start_metrics_exporters(metrics: CompletionMetrics, settings: Settings) -> None:
+    if settings.metrics_file or settings.metrics_port is not None:
+        # http.server is only needed when an exporter is configured.
+        from ai_lsp.observability.export import PrometheusFileWriter, serve_prometheus
+
+        if settings.metrics_file:
+            PrometheusFileWriter(metrics.registry, settings.metrics_file).start()
+        if settings.metrics_port is not None:
+            try:
+                serve_prometheus(metrics.registry, port=settings.metrics_port)
+            except OSError as e:
+                # Typically a second editor window with the same port.
+                logger.warning(
+                    "Not serving metrics on port %s: %s", settings.metrics_port, e
+                )
+
+
+def configure_profiler(profiler: Profiler, settings: Settings) -> None:
+    if settings.profile_dir:
+        profiler.directory = settings.profile_dir
+    if settings.profile:
+        mode, completions = parse_profile_spec(settings.profile)
+        profiler.start(completions=completions, mode=mode)
+
+
+def register_lifecycle(
+    server: LanguageServer,
+    services: SharedServices,
+    telemetry: Optional[AcceptanceTracker] = None,
+    owned: bool = True,
+):
+    @server.feature(types.INITIALIZED)
+    def initialized(ls: LanguageServer, params: types.InitializedParams):
+        services.start()
+
+    @server.feature(types.SHUTDOWN)
+    def shutdown(ls: LanguageServer, params: None):
+        if telemetry:
+            telemetry.flush()
+        if owned:
+            services.stop()
+
+
+def register_documents(
+    server: LanguageServer,
+    documents: DocumentStore,
+    warmup: Optional[ModelWarmup] = None,
+    telemetry: Optional[AcceptanceTracker] = None,
+    analysis: Optional[ScopedAnalysis] = None,
+):
     @server.feature(types.TEXT_DOCUMENT_DID_OPEN)
     def did_open(ls: LanguageServer, params: types.DidOpenTextDocumentParams):
         documents.open(params)
+        if analysis:
+            analysis.release(params.text_document.uri)
+        if warmup:
+            # Clients that skip `initialized` still get a warm model.
+            warmup.start()
+            warmup.touch()
 
     @server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
     def did_change(ls: LanguageServer, params: types.DidChangeTextDocumentParams):
-        documents.update(params, ls)
+        first_line = documents.update(params, ls)
+        if warmup:
+            warmup.touch()
+        if telemetry:
+            document = documents.get(params.text_document.uri)
+            if document:
+                telemetry.changed(document, first_line)
+
+    @server.feature(types.TEXT_DOCUMENT_DID_CLOSE)
+    def did_close(ls: LanguageServer, params: types.DidCloseTextDocumentParams):
+        if telemetry:
+            telemetry.close(params.text_document.uri)
+        if analysis:
+            analysis.release(params.text_document.uri)
 
 
 def register_completion(
     server: LanguageServer,
     documents: DocumentStore,
     context_builder: CompletionContextBuilder,
-    engine: OllamaCompletionEngine,
+    engine: "LazyService[OllamaCompletionEngine]",
+    tracer: Optional[Tracer] = None,
+    metrics: CompletionMetrics = METRICS,
+    profiler: Profiler = PROFILER,
+    telemetry: Optional[AcceptanceTracker] = None,
+    analysis: Optional[ScopedAnalysis] = None,
 ):
     active_tasks: Dict[str, asyncio.Task] = {}
+    tracer = tracer or Tracer()
+    status = BackendStatusNotifier()
 
     @server.feature(
         types.TEXT_DOCUMENT_COMPLETION,
@@ -83,16 +453,58 @@ def register_completion(
         ),
     )
     async def on_completion(ls: LanguageServer, params: types.CompletionParams):
+        metrics.requests.inc()
+        started = time.perf_counter()
+        trace = tracer.start("completion", uri=params.text_document.uri)
+        token = set_current_trace(trace)
+        try:
+            return await complete(ls, params, metrics, trace)
+        finally:
+            reset_current_trace(token)
+            metrics.latency.observe(time.perf_counter() - started)
+            trace.finish()
+            if profiler.active:
+                artifacts = profiler.completion_finished()
+                if artifacts:
+                    ls.window_log_message(
+                        LogMessageParams(
+                            type=MessageType.Info,
+                            message=f"Profile written to {artifacts['directory']}",
+                        )
+                    )
+
+    async def complete(
+        ls: LanguageServer,
+        params: types.CompletionParams,
+        metrics: CompletionMetrics,
+        trace: Trace | NullTrace,
+    ) -> CompletionList:
+        received = time.perf_counter()
         uri = params.text_document.uri
         document = documents.get(uri)
 
         if not document:
+            metrics.empty.inc()
+            trace.set(outcome="unknown_document")
             return CompletionList(is_incomplete=False, items=[])
 
-        context = context_builder.build(document, params.position)
+        started = time.perf_counter()
+        if analysis:
+            context = await analysis.build_context(
+                context_builder, document, params.position
+            )
+        else:
+            context = context_builder.build(document, params.position)
+        finished = time.perf_counter()
+        metrics.stage("context_build").observe(finished - started)
+        if trace:
+            trace.set(version=document.version)
+            trace.add_span("context_build", started, finished)
 
         # Guard: avoid LLM spam
         if len(context.prefix.strip()) < 2:
+            metrics.empty.inc()
+            trace.set(outcome="short_prefix")
             return CompletionList(is_incomplete=True, items=[])
 
         # Cancel previous task for this document.
@@ -101,7 +513,7 @@ def register_completion(
             previsous_task.cancel()
 
         async def run_completion():
-            return await engine.complete(context)
+            return await (await engine.aget()).complete(context)
 
         task = asyncio.create_task(run_completion())
         active_tasks[uri] = task
@@ -109,19 +521,39 @@ def register_completion(
         try:
             completion = await task
         except asyncio.CancelledError:
+            metrics.cancelled.inc()
+            trace.set(outcome="cancelled")
             return CompletionList(is_incomplete=True, items=[])
+        except CircuitOpenError:
+            metrics.empty.inc()
+            trace.set(outcome="circuit_open")
+            return CompletionList(is_incomplete=False, items=[])
         except Exception as e:
-            message = LogMessageParams(
-                type=MessageType.Error, message=f"Ollama error: {e}"
-            )
-
-            ls.window_log_message(message)
+            metrics.errors.inc()
+            trace.set(outcome="error", error=str(e))
+            status.error(ls, e)
             return CompletionList(is_incomplete=False, items=[])
+        finally:
+            if engine.value is not None:
+                status.update(ls, engine.value.breaker)
 
         if not completion:
+            metrics.empty.inc()
+            trace.set(outcome="empty")
             return CompletionList(is_incomplete=False, items=[])
 
+        metrics.completions.inc()
+        trace.set(outcome="completion", completion_chars=len(completion))
+
         edit = make_inline_edit(context, completion)
+        if telemetry:
+            telemetry.offer(
+                document,
+                context,
+                completion,
+                edit.range.start.character,
+                time.perf_counter() - received,
+            )
 
         item = CompletionItem(
             label=completion.strip().splitlines()[0][:80],
@@ -134,3 +566,67 @@ def register_completion(
         )
 
         return CompletionList(is_incomplete=False, items=[item])
+
+
+def register_metrics(
+    server: LanguageServer,
+    metrics: CompletionMetrics,
+):
+    registry = metrics.registry
+
+    @server.command(METRICS_COMMAND)
+    def metrics_command(ls: LanguageServer, *args):
+        """
+        Returns a JSON snapshot of all metrics, or the Prometheus text
+        format when called with the argument "prometheus".
+        """
+        if args and args[0] == "prometheus":
+            return registry.render_prometheus()
+        return registry.snapshot()
+
+
+def documents_profile_name(scope: str = "") -> str:
+    """
+    Name of a connection's DocumentStore in profiler memory reports.
+    """
+    return f"documents:{scope.rstrip(':')}" if scope else "documents"
+
+
+def register_profiling(
+    server: LanguageServer,
+    profiler: Profiler,
+    documents: DocumentStore,
+    scope: str = "",
+    engine: "Optional[LazyService[OllamaCompletionEngine]]" = None,
+):
+    profiler.track(documents_profile_name(scope), lambda: documents)
+    if engine is not None:
+        # Measured once the engine exists; until then there is no cache.
+        profiler.track(
+            "cache",
+            lambda: engine.value.cache.memory_layers()
+            if engine.value is not None and engine.value.cache is not None
+            else None,
+        )
+
+    @server.command(PROFILE_COMMAND)
+    def profile_command(ls: LanguageServer, *args):
+        """
+        Control profiling without restarting the server:
+
+            ["start", {"completions": 20, "mode": "cprofile", "memory": true}]
+            ["stop"]     write the artifacts now
+            ["status"]
+        """
+        action = args[0] if args else "status"
+        if action == "start":
+            options = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+            return profiler.start(
+                completions=int(options.get("completions", 10)),
+                mode=options.get("mode", "cprofile"),
+                memory=bool(options.get("memory", True)),
+                directory=options.get("directory"),
+            )
+        if action == "stop":
+            return profiler.stop()
+        return profiler.status()
@@ -1,25 +1,62 @@
+from typing import Optional
+
 from ai_lsp.domain.completion import CompletionContext
 from ai_lsp.lsp.documents import Document
+from ai_lsp.syntax.tree import SyntaxTree
 from lsprotocol import types
+from pygls.workspace.position_codec import PositionCodec
 import os
 import re
+import time
 
 
 class CompletionContextBuilder:
     def __init__(self, max_lines: int = 10) -> None:
         self.max_lines = max_lines
+        # Positions arrive in UTF-16 code units, like pygls' text documents.
+        self.codec = PositionCodec()
 
     def build(
         self,
         document: Document,
         position: types.Position,
     ) -> CompletionContext:
-        lines = document.text.splitlines()
+        return self.build_text(
+            document.text,
+            document.uri,
+            document.language_id,
+            position.line,
+            position.character,
+            syntax=document.syntax,
+            typing_interval=document.typing_interval,
+            typing_pause=(
+                time.monotonic() - document.last_change
+                if document.last_change is not None
+                else None
+            ),
+        )
+
+    def build_text(
+        self,
+        text: str,
+        uri: str,
+        language_id: str,
+        line: int,
+        character: int,
+        syntax: Optional[SyntaxTree] = None,
+        typing_interval: Optional[float] = None,
+        typing_pause: Optional[float] = None,
+    ) -> CompletionContext:
+        """
+        `build` on a bare text snapshot, so analysis workers can run it
+        without a Document.
+        """
+        lines = text.splitlines()
 
-        line_index = min(position.line, len(lines) - 1)
+        line_index = min(line, len(lines) - 1)
         full_line = lines[line_index]
 
-        char_index = min(position.character, len(full_line))
+        char_index = self._char_index(full_line, character)
         prefix = full_line[:char_index]
         suffix = full_line[char_index:]
 
@@ -29,8 +66,8 @@ class CompletionContextBuilder:
         next_lines = lines[line_index + 1 : line_index + 1 + self.max_lines]
 
         return CompletionContext(
-            language=document.language_id,
-            file_path=self._uri_to_path(document.uri),
+            language=language_id,
+            file_path=self._uri_to_path(uri),
             prefix=prefix,
             suffix=suffix,
             completion_prefix=self._extract_completion_prefix(prefix),
@@ -38,10 +75,24 @@ class CompletionContextBuilder:
             previous_lines=previous_lines,
             next_lines=next_lines,
             indentation=indentation,
-            line=position.line,
-            character=position.character,
+            line=line,
+            character=character,
+            syntax=syntax.info_at(line_index, char_index) if syntax else None,
+            typing_interval=typing_interval,
+            typing_pause=typing_pause,
         )
 
+    def _char_index(self, line: str, character: int) -> int:
+        """
+        str index of the LSP `character` offset on `line`.
+        """
+        if line.isascii():
+            return min(character, len(line))
+        character = min(character, self.codec.client_num_units(line))
+        return self.codec.position_from_client_units(
+            [line], types.Position(line=0, character=character)
+        ).character
+
     def _extract_indentation(self, line: str) -> str:
         match = re.match(r"^\s*", line)
         return match.group(0) if match else ""
@@ -1,8 +1,14 @@
+import time
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 from lsprotocol import types
 from pygls.lsp.server import LanguageServer
 
+from ai_lsp.syntax.tree import SyntaxTree
+
+
+TYPING_GAP = 2.0
+
 
 @dataclass
 class Document:
@@ -10,6 +16,27 @@ class Document:
     language_id: str
     version: int
     text: str
+    syntax: Optional[SyntaxTree] = None
+    # Typing cadence, from the timing of didChange notifications.
+    last_change: Optional[float] = None
+    typing_interval: Optional[float] = None
+    # First line edited since the text was last shipped to analysis workers.
+    changed_from: Optional[int] = None
+
+    def touch(self, now: float) -> None:
+        """
+        Record an edit. Gaps longer than TYPING_GAP are pauses, not typing,
+        and leave the smoothed interval alone.
+        """
+        if self.last_change is not None:
+            gap = now - self.last_change
+            if gap < TYPING_GAP:
+                self.typing_interval = (
+                    gap
+                    if self.typing_interval is None
+                    else self.typing_interval + 0.3 * (gap - self.typing_interval)
+                )
+        self.last_change = now
 
 
 class DocumentStore:
@@ -23,20 +50,50 @@ class DocumentStore:
             language_id=doc.language_id,
             version=doc.version,
             text=doc.text,
+            syntax=SyntaxTree.for_language(doc.language_id, doc.text),
         )
 
     def update(
         self, params: types.DidChangeTextDocumentParams, ls: LanguageServer
-    ) -> None:
+    ) -> Optional[int]:
+        """
+        Apply a didChange and return the first line it touched.
+        """
         uri = params.text_document.uri
         text_doc = ls.workspace.get_text_document(uri)
         document = self._documents.get(uri)
 
         if not document:
-            return
+            return None
 
         document.text = text_doc.source
         document.version = params.text_document.version
+        document.touch(time.monotonic())
+
+        first_line = _first_changed_line(params.content_changes)
+        if document.changed_from is None or first_line < document.changed_from:
+            document.changed_from = first_line
+
+        if document.syntax:
+            document.syntax.update(document.text, first_line)
+        return first_line
 
     def get(self, uri: str) -> Document | None:
         return self._documents.get(uri)
+
+
+def _first_changed_line(
+    changes: list[types.TextDocumentContentChangeEvent],
+) -> int:
+    """
+    First line touched by a batch of content changes. Full document
+    replacements invalidate everything.
+    """
+    first: Optional[int] = None
+    for change in changes:
+        if not isinstance(change, types.TextDocumentContentChangePartial):
+            return 0
+        line = change.range.start.line
+        first = line if first is None else min(first, line)
+
+    return first or 0
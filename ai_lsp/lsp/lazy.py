@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """
+    A service built on first use instead of at import time.
+
+    Startup only has to register handlers; expensive imports (HTTP client,
+    agents) happen in `preload()` on a background thread once the
+    initialize handshake is done, or on the first request that needs them.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str = "service") -> None:
+        self.factory = factory
+        self.name = name
+        self.value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.value is not None
+
+    def get(self) -> T:
+        value = self.value
+        if value is None:
+            with self._lock:
+                value = self.value
+                if value is None:
+                    value = self.factory()
+                    self.value = value
+        return value
+
+    async def aget(self) -> T:
+        """
+        Like `get`, but builds the service off the event loop.
+        """
+        value = self.value
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get)
+
+    def preload(self) -> Optional[threading.Thread]:
+        if self.value is not None:
+            return None
+        thread = threading.Thread(
+            target=self.get, name=f"ai-lsp-preload-{self.name}", daemon=True
+        )
+        thread.start()
+        return thread
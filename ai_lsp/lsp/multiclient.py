@@ -0,0 +1,154 @@
+"""
+One long-lived server process for many editor connections.
+
+pygls' own TCP and WebSocket modes drive a single protocol instance, so a
+second connection would take over the first one's writer, and the first
+`exit` ends the process. Here every connection gets its own
+LanguageServer, with its own documents, workspace and in-flight
+completions, on top of one SharedServices: the completion cache, backend
+pool and breaker, the inference scheduler and the analysis workers are
+built once. Their warm state outlives editor restarts and is not
+duplicated per window.
+
+    ai-lsp --tcp --port 2087            # the shared server
+    ai-lsp --connect --port 2087        # stdio shim for editors
+"""
+
+import asyncio
+import inspect
+import itertools
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Generator, Optional
+
+from lsprotocol import types
+from pygls.io_ import run_async, run_websocket
+from pygls.lsp.server import LanguageServer
+from pygls.protocol import LanguageServerProtocol
+from pygls.protocol.language_server import lsp_method
+
+from ai_lsp.config import Settings
+from ai_lsp.lsp.capabilities import SharedServices, documents_profile_name
+from ai_lsp.lsp.server import create_server
+from ai_lsp.observability.profiling import PROFILER
+
+if TYPE_CHECKING:
+    from websockets.asyncio.server import ServerConnection
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionProtocol(LanguageServerProtocol):
+    """
+    LSP protocol for one connection of a shared server: `exit` closes the
+    connection instead of exiting the process.
+    """
+
+    @lsp_method(types.EXIT)
+    def lsp_exit(self, *args) -> Generator[Any, Any, None]:
+        if (user_handler := self.fm.features.get(types.EXIT)) is not None:
+            yield user_handler, args, None
+
+        if self.writer is not None:
+            closed = self.writer.close()
+            if inspect.isawaitable(closed):
+                asyncio.ensure_future(closed)
+
+
+class MultiClientServer:
+    """
+    Accepts LSP clients over TCP or WebSocket, one LanguageServer per
+    connection, all on one event loop and one SharedServices.
+    """
+
+    def __init__(self, services: Optional[SharedServices] = None) -> None:
+        self.services = services or SharedServices(Settings.from_env())
+        self._serials = itertools.count(1)
+        self._scopes: Dict[LanguageServer, str] = {}
+
+    @property
+    def connections(self) -> int:
+        return len(self._scopes)
+
+    def connect(self) -> LanguageServer:
+        scope = f"client-{next(self._serials)}:"
+        server = create_server(self.services, scope)
+        self._scopes[server] = scope
+        return server
+
+    def disconnect(self, server: LanguageServer) -> None:
+        scope = self._scopes.pop(server, None)
+        if server in self.services.clients:
+            self.services.clients.remove(server)
+        if scope is not None:
+            self.services.analysis.release_scope(scope)
+            PROFILER.untrack(documents_profile_name(scope))
+        server.shutdown()
+
+    async def handle_tcp(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        server = self.connect()
+        server.protocol.set_writer(writer)  # type: ignore[arg-type]
+        try:
+            await run_async(
+                stop_event=threading.Event(),
+                reader=reader,  # type: ignore[arg-type]
+                protocol=server.protocol,
+                logger=logger,
+                error_handler=server.report_server_error,
+            )
+        finally:
+            self.disconnect(server)
+            writer.close()
+
+    async def handle_ws(self, websocket: "ServerConnection") -> None:
+        server = self.connect()
+        try:
+            await run_websocket(
+                stop_event=threading.Event(),
+                websocket=websocket,
+                protocol=server.protocol,
+                logger=logger,
+                error_handler=server.report_server_error,
+            )
+        finally:
+            self.disconnect(server)
+
+    async def serve_tcp(self, host: str, port: int) -> asyncio.Server:
+        """
+        Listen for TCP clients; the services start right away so the first
+        client already finds a warm engine.
+        """
+        self.services.start()
+        return await asyncio.start_server(self.handle_tcp, host, port)
+
+    async def serve_ws(self, host: str, port: int) -> Any:
+        try:
+            from websockets.asyncio.server import serve
+        except ImportError:
+            raise ImportError(
+                "WebSocket mode needs the websockets package: pip install 'pygls[ws]'"
+            ) from None
+
+        self.services.start()
+        return await serve(self.handle_ws, host, port)
+
+    def start_tcp(self, host: str, port: int) -> None:
+        self._run(self.serve_tcp(host, port))
+
+    def start_ws(self, host: str, port: int) -> None:
+        self._run(self.serve_ws(host, port))
+
+    def _run(self, serving) -> None:
+        async def main() -> None:
+            server = await serving
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        finally:
+            self.services.stop()
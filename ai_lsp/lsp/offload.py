@@ -0,0 +1,443 @@
+"""
+Process-pool execution for CPU-bound analysis stages.
+
+Document text is shipped to workers through one shared-memory segment per
+document instead of being pickled with every job: the job carries only
+the segment name, and workers keep their own incrementally updated
+syntax trees, so a keystroke in a large file re-lexes a few lines on the
+worker instead of the whole file on the event loop.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Optional, TypeVar
+
+from lsprotocol import types
+
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.lsp.documents import Document
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+from ai_lsp.syntax.tree import SyntaxTree
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+T = TypeVar("T")
+
+# (version, payload bytes) in front of the UTF-8 text. The version is
+# cleared while the text is rewritten so readers can detect torn copies.
+HEADER = struct.Struct("<qq")
+MIN_SEGMENT_BYTES = 64 * 1024
+
+DEFAULT_BUDGETS = {"context_build": 0.25}
+
+# Syntax trees each worker keeps, least recently used first out.
+WORKER_DOCUMENTS = 32
+
+
+class StaleSnapshot(Exception):
+    """
+    The snapshot was rewritten for a newer version while a worker read it.
+    """
+
+
+@dataclass(frozen=True)
+class SnapshotRef:
+    segment: str
+    # Identifies one open document; reopening a URI starts a new series.
+    serial: int
+    version: int
+    # Version the worker's cached tree may be updated from, and the first
+    # line edited since then.
+    base_version: Optional[int]
+    first_line: int
+
+
+@dataclass(frozen=True)
+class ContextJob:
+    snapshot: SnapshotRef
+    # Identifies the document in worker caches: its uri, prefixed with a
+    # client scope when several clients share the pool.
+    key: str
+    uri: str
+    language_id: str
+    line: int
+    character: int
+    max_lines: int
+    typing_interval: Optional[float]
+    typing_pause: Optional[float]
+
+
+@dataclass
+class _Snapshot:
+    segment: "SharedMemory"
+    serial: int
+    version: int
+
+
+class DocumentSnapshots:
+    """
+    Shared-memory copies of document texts, written on demand when a job
+    needs a newer version than the one already published.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._serials = itertools.count(1)
+
+    def publish(self, document: Document, key: Optional[str] = None) -> SnapshotRef:
+        from multiprocessing.shared_memory import SharedMemory
+
+        key = key or document.uri
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == document.version:
+            return SnapshotRef(
+                snapshot.segment.name,
+                snapshot.serial,
+                snapshot.version,
+                snapshot.version,
+                0,
+            )
+
+        data = document.text.encode("utf-8", "surrogatepass")
+        needed = HEADER.size + len(data)
+        base_version = snapshot.version if snapshot is not None else None
+        if snapshot is None or snapshot.segment.size < needed:
+            segment = SharedMemory(
+                create=True, size=max(MIN_SEGMENT_BYTES, needed + needed // 2)
+            )
+            if snapshot is not None:
+                _unlink(snapshot.segment)
+                snapshot.segment = segment
+            else:
+                snapshot = _Snapshot(segment, next(self._serials), document.version)
+                self._snapshots[key] = snapshot
+
+        buf = snapshot.segment.buf
+        HEADER.pack_into(buf, 0, -1, 0)
+        buf[HEADER.size : needed] = data
+        HEADER.pack_into(buf, 0, document.version, len(data))
+        snapshot.version = document.version
+
+        first_line = document.changed_from or 0
+        document.changed_from = None
+        return SnapshotRef(
+            snapshot.segment.name,
+            snapshot.serial,
+            document.version,
+            base_version,
+            first_line,
+        )
+
+    def release(self, key: str) -> None:
+        snapshot = self._snapshots.pop(key, None)
+        if snapshot is not None:
+            _unlink(snapshot.segment)
+
+    def release_scope(self, scope: str) -> None:
+        for key in list(self._snapshots):
+            if key.startswith(scope):
+                self.release(key)
+
+    def close(self) -> None:
+        self.release_scope("")
+
+
+def _unlink(segment: "SharedMemory") -> None:
+    try:
+        segment.close()
+        segment.unlink()
+    except (OSError, BufferError):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+_attached: Dict[str, "SharedMemory"] = {}
+_trees: Dict[str, tuple[int, int, Optional[SyntaxTree]]] = {}
+
+
+def _attach(key: str, name: str) -> "SharedMemory":
+    from multiprocessing.shared_memory import SharedMemory
+
+    segment = _attached.get(key)
+    if segment is not None and segment.name == name:
+        return segment
+    if segment is not None:
+        segment.close()
+    try:
+        # The server owns the segment; the worker must not unlink it on exit.
+        segment = SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        segment = SharedMemory(name=name)
+    _attached[key] = segment
+    return segment
+
+
+def read_snapshot(key: str, ref: SnapshotRef) -> str:
+    buf = _attach(key, ref.segment).buf
+    header = HEADER.unpack_from(buf, 0)
+    version, size = header
+    data = bytes(buf[HEADER.size : HEADER.size + max(0, size)])
+    if version != ref.version or HEADER.unpack_from(buf, 0) != header:
+        raise StaleSnapshot(f"{key}: expected v{ref.version}, found v{version}")
+    return data.decode("utf-8", "surrogatepass")
+
+
+def _tree(job: ContextJob, text: str) -> Optional[SyntaxTree]:
+    ref = job.snapshot
+    cached = _trees.pop(job.key, None)
+    if cached is not None and cached[0] == ref.serial and cached[1] == ref.version:
+        tree = cached[2]
+    elif (
+        cached is not None
+        and cached[2] is not None
+        and cached[0] == ref.serial
+        and cached[1] == ref.base_version
+    ):
+        tree = cached[2]
+        tree.update(text, ref.first_line)
+    else:
+        tree = SyntaxTree.for_language(job.language_id, text)
+
+    _trees[job.key] = (ref.serial, ref.version, tree)
+    while len(_trees) > WORKER_DOCUMENTS:
+        stale = next(iter(_trees))
+        del _trees[stale]
+        segment = _attached.pop(stale, None)
+        if segment is not None:
+            segment.close()
+    return tree
+
+
+def build_context_job(job: ContextJob) -> CompletionContext:
+    text = read_snapshot(job.key, job.snapshot)
+    return CompletionContextBuilder(job.max_lines).build_text(
+        text,
+        job.uri,
+        job.language_id,
+        job.line,
+        job.character,
+        syntax=_tree(job, text),
+        typing_interval=job.typing_interval,
+        typing_pause=job.typing_pause,
+    )
+
+
+def _ready() -> bool:
+    return True
+
+
+# ----------------------------------------------------------------------
+# Server side
+# ----------------------------------------------------------------------
+class AnalysisPool:
+    """
+    Runs CPU-bound analysis stages for large documents in worker processes
+    so the event loop keeps handling didChange and cancellation.
+
+    Each worker is its own single-process executor and a document always
+    goes to the same one, which keeps that worker's syntax tree warm.
+    Offloaded stages get a time budget: past it the job is cancelled if it
+    has not started, and otherwise left to finish with its result dropped.
+    Until it does, that worker's documents are built inline rather than
+    queued behind it. Anything that stops a job from running (shared
+    memory unavailable, a torn snapshot, a crashed worker, a blown budget)
+    falls back to running the stage inline.
+
+    With `workers=0`, or for documents under `min_chars`, every stage runs
+    inline; a process hop only pays off once the work outweighs it.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        budgets: Optional[Dict[str, float]] = None,
+        min_chars: int = 200_000,
+        metrics: Optional[CompletionMetrics] = None,
+    ) -> None:
+        self.workers = workers
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.min_chars = min_chars
+        self.metrics = metrics or METRICS
+        self.snapshots = DocumentSnapshots()
+        self._executors: list[Optional[concurrent.futures.Executor]] = [None] * workers
+        # Jobs that ran over their budget, per worker, until they finish.
+        self._overrun: list[Optional[concurrent.futures.Future]] = [None] * workers
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self) -> None:
+        """
+        Spawn the workers now rather than on the first large document.
+        """
+        for index in range(self.workers):
+            self._executor(index).submit(_ready)
+
+    def shutdown(self) -> None:
+        for executor in self._executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = [None] * self.workers
+        self._overrun = [None] * self.workers
+        self.snapshots.close()
+
+    def release(self, uri: str, scope: str = "") -> None:
+        self.snapshots.release(scope + uri)
+
+    def release_scope(self, scope: str) -> None:
+        self.snapshots.release_scope(scope)
+
+    def scoped(self, scope: str) -> "ScopedAnalysis":
+        return ScopedAnalysis(self, scope)
+
+    def _executor(self, index: int) -> concurrent.futures.Executor:
+        executor = self._executors[index]
+        if executor is None:
+            import multiprocessing
+
+            # Spawned rather than forked: the server runs helper threads.
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._executors[index] = executor
+        return executor
+
+    async def build_context(
+        self,
+        builder: CompletionContextBuilder,
+        document: Document,
+        position: types.Position,
+        scope: str = "",
+    ) -> CompletionContext:
+        """
+        The completion context for `position`.
+        """
+        if not self.enabled or len(document.text) < self.min_chars:
+            return builder.build(document, position)
+
+        stage = "context_build"
+        key = scope + document.uri
+        try:
+            ref = self.snapshots.publish(document, key)
+        except (OSError, ValueError):
+            self._fallback(stage, "snapshot")
+            return builder.build(document, position)
+
+        job = ContextJob(
+            snapshot=ref,
+            key=key,
+            uri=document.uri,
+            language_id=document.language_id,
+            line=position.line,
+            character=position.character,
+            max_lines=builder.max_lines,
+            typing_interval=document.typing_interval,
+            typing_pause=(
+                time.monotonic() - document.last_change
+                if document.last_change is not None
+                else None
+            ),
+        )
+        return await self._run(
+            stage,
+            zlib.crc32(key.encode()) % self.workers,
+            build_context_job,
+            job,
+            lambda: builder.build(document, position),
+        )
+
+    async def _run(
+        self,
+        stage: str,
+        index: int,
+        fn: Callable[[ContextJob], T],
+        job: ContextJob,
+        inline: Callable[[], T],
+    ) -> T:
+        registry = self.metrics.registry
+        overrun = self._overrun[index]
+        if overrun is not None:
+            if not overrun.done():
+                # Queued behind it, this job would blow its budget too.
+                self._fallback(stage, "busy")
+                return inline()
+            self._overrun[index] = None
+
+        try:
+            future = self._executor(index).submit(fn, job)
+            # Timing out cancels the job unless the worker already runs it.
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), self.budgets.get(stage)
+            )
+        except asyncio.TimeoutError:
+            registry.counter(
+                "ai_lsp_analysis_over_budget_total",
+                "Offloaded analysis stages that ran over their budget",
+                stage=stage,
+            ).inc()
+            if not future.done():
+                self._overrun[index] = future
+            return inline()
+        except concurrent.futures.BrokenExecutor:
+            # A worker died; start a fresh one on the next job.
+            broken = self._executors[index]
+            self._executors[index] = None
+            self._overrun[index] = None
+            if broken is not None:
+                broken.shutdown(wait=False)
+            self._fallback(stage, "broken")
+            return inline()
+        except StaleSnapshot:
+            self._fallback(stage, "stale")
+            return inline()
+        except Exception:
+            self._fallback(stage, "error")
+            return inline()
+
+        registry.counter(
+            "ai_lsp_analysis_offloaded_total",
+            "Analysis stages run in worker processes",
+            stage=stage,
+        ).inc()
+        return result
+
+    def _fallback(self, stage: str, reason: str) -> None:
+        self.metrics.registry.counter(
+            "ai_lsp_analysis_fallbacks_total",
+            "Offloaded analysis stages run inline instead",
+            stage=stage,
+            reason=reason,
+        ).inc()
+
+
+class ScopedAnalysis:
+    """
+    One client's view of a shared AnalysisPool. Documents are keyed by
+    `scope` plus uri, so two clients with the same file open never share
+    a snapshot or a worker tree.
+    """
+
+    def __init__(self, pool: AnalysisPool, scope: str) -> None:
+        self.pool = pool
+        self.scope = scope
+
+    async def build_context(
+        self,
+        builder: CompletionContextBuilder,
+        document: Document,
+        position: types.Position,
+    ) -> CompletionContext:
+        return await self.pool.build_context(builder, document, position, self.scope)
+
+    def release(self, uri: str) -> None:
+        self.pool.release(uri, self.scope)
@@ -1,9 +1,26 @@
+from typing import TYPE_CHECKING, Optional
+
 from pygls.lsp.server import LanguageServer
 
+if TYPE_CHECKING:
+    from ai_lsp.lsp.capabilities import SharedServices
+
+
+def create_server(
+    services: Optional["SharedServices"] = None, scope: str = ""
+) -> LanguageServer:
+    """
+    A server for one client. Pass `services` to share them with other
+    connections in the same process; `exit` then only ends this
+    connection instead of the process.
+    """
+    if services is None:
+        server = LanguageServer("ai-lsp", "0.1.0")
+    else:
+        from ai_lsp.lsp.multiclient import ConnectionProtocol
 
-def create_server() -> LanguageServer:
-    server = LanguageServer("ai-lsp", "0.1.0")
+        server = LanguageServer("ai-lsp", "0.1.0", protocol_cls=ConnectionProtocol)
     from ai_lsp.lsp.capabilities import register_capabilities
 
-    register_capabilities(server)
+    register_capabilities(server, services, scope)
     return server
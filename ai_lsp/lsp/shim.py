@@ -0,0 +1,103 @@
+"""
+stdio-to-TCP bridge that attaches an editor to the shared server.
+
+Editors launch language servers as subprocesses speaking stdio; this shim
+is that subprocess and relays bytes both ways to `ai-lsp --tcp`. With
+`spawn`, a shared server is started in the background when none is
+listening yet, so the first editor window brings it up and later ones
+join it.
+"""
+
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import BinaryIO, Optional
+
+CHUNK = 64 * 1024
+
+
+def connect(
+    host: str,
+    port: int,
+    spawn: bool = False,
+    timeout: float = 10.0,
+) -> socket.socket:
+    """
+    Connect to the shared server, starting it first if allowed.
+    """
+    try:
+        return socket.create_connection((host, port))
+    except ConnectionRefusedError:
+        if not spawn:
+            raise
+
+    subprocess.Popen(
+        [sys.executable, "-m", "ai_lsp.main", "--tcp", "--host", host, "--port", str(port)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # Outlives this editor window.
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def relay(
+    sock: socket.socket,
+    stdin: Optional[BinaryIO] = None,
+    stdout: Optional[BinaryIO] = None,
+) -> None:
+    """
+    Copy stdin to the socket and the socket to stdout until the server
+    closes the connection.
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+
+    def upstream() -> None:
+        try:
+            while True:
+                data = stdin.read1(CHUNK)  # type: ignore[attr-defined]
+                if not data:
+                    break
+                sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    threading.Thread(target=upstream, name="ai-lsp-shim-stdin", daemon=True).start()
+    try:
+        while True:
+            data = sock.recv(CHUNK)
+            if not data:
+                break
+            stdout.write(data)
+            stdout.flush()
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def main(host: str, port: int, spawn: bool = False) -> int:
+    try:
+        sock = connect(host, port, spawn=spawn)
+    except OSError as e:
+        print(f"ai-lsp: cannot reach the shared server on {host}:{port}: {e}", file=sys.stderr)
+        return 1
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    relay(sock)
+    return 0
@@ -0,0 +1,72 @@
+import time
+from typing import Callable
+
+from lsprotocol.types import LogMessageParams, MessageType, ShowMessageParams
+from pygls.lsp.server import LanguageServer
+
+from ai_lsp.ai.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class BackendStatusNotifier:
+    """
+    Reports backend trouble to the client without flooding it.
+
+    Request errors are logged at most once per `min_interval`, with a count
+    of the ones suppressed in between. Circuit breaker transitions are
+    shown to the user: once when completions pause, once when they
+    resume.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_interval = min_interval
+        self.clock = clock
+        self.suppressed = 0
+        self._last_error = float("-inf")
+        self._last_open_message = float("-inf")
+        self._state = CircuitState.CLOSED
+
+    def error(self, ls: LanguageServer, error: Exception) -> None:
+        now = self.clock()
+        if now - self._last_error < self.min_interval:
+            self.suppressed += 1
+            return
+        message = f"Backend error: {error}"
+        if self.suppressed:
+            message += f" ({self.suppressed} similar errors suppressed)"
+        self._last_error = now
+        self.suppressed = 0
+        ls.window_log_message(LogMessageParams(type=MessageType.Error, message=message))
+
+    def update(self, ls: LanguageServer, breaker: CircuitBreaker) -> None:
+        state = breaker.state
+        if state is self._state or state is CircuitState.HALF_OPEN:
+            return
+        previous, self._state = self._state, state
+
+        if state is CircuitState.OPEN:
+            now = self.clock()
+            # A flapping backend re-opens the circuit repeatedly; tell the
+            # user once per interval.
+            if now - self._last_open_message < self.min_interval:
+                return
+            self._last_open_message = now
+            ls.window_show_message(
+                ShowMessageParams(
+                    type=MessageType.Warning,
+                    message=(
+                        "AI LSP: completion backend unavailable, pausing requests "
+                        f"(retrying in {breaker.retry_in():.0f}s)"
+                    ),
+                )
+            )
+        elif previous is CircuitState.OPEN:
+            ls.window_show_message(
+                ShowMessageParams(
+                    type=MessageType.Info,
+                    message="AI LSP: completion backend is available again",
+                )
+            )
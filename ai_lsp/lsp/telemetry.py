@@ -0,0 +1,227 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from ai_lsp.ai.acceptance import acceptance_features
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.documents import Document
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+from ai_lsp.observability.tracing import JsonlTraceExporter
+
+OUTCOMES = ("accepted", "partial", "ignored")
+
+
+@dataclass
+class Offer:
+    """
+    A completion shown to the user, waiting for the edits that reveal its
+    fate.
+    """
+
+    uri: str
+    line: int
+    line_offset: int  # where `line` starts in the document text
+    start: int  # column where the TextEdit starts
+    text: str
+    baseline: int  # characters of `text` already in the document when offered
+    offered_at: float
+    record: dict
+    matched: int = 0  # most characters of `text` seen in the document since
+
+
+class AcceptanceTracker:
+    """
+    Correlates offered TextEdits with later didChange content.
+
+    After every change the document text at the edit's start is compared
+    with the completion. The offer resolves as
+
+        accepted  the whole completion is in the document
+        partial   at least `partial_chars` characters beyond what was typed
+                  when it was offered (accept-word, or typing through it)
+        ignored   anything else
+
+    once it is fully matched, the matched run shrinks (the user edited it
+    away or lines moved above it), a newer completion is offered for the
+    document, the document closes, or `timeout` seconds pass.
+
+    Resolved offers are appended to the acceptance log with the request's
+    acceptance features, so the log doubles as training data for
+    `python -m ai_lsp.ai.acceptance`.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[JsonlTraceExporter] = None,
+        timeout: float = 30.0,
+        partial_chars: int = 3,
+        metrics: Optional[CompletionMetrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.exporter = exporter
+        self.timeout = timeout
+        self.partial_chars = partial_chars
+        self.clock = clock
+        self._pending: Dict[str, Offer] = {}
+
+        registry = (metrics or METRICS).registry
+        self._outcomes = {
+            outcome: registry.counter(
+                "ai_lsp_completion_outcomes_total",
+                "Offered completions by what the user did with them",
+                outcome=outcome,
+            )
+            for outcome in OUTCOMES
+        }
+
+    def offer(
+        self,
+        document: Document,
+        context: CompletionContext,
+        text: str,
+        start: int,
+        latency: float,
+    ) -> None:
+        self.close(document.uri)
+        self.expire()
+        line_offset = _line_offset(document.text, context.line)
+        if line_offset is None:
+            return
+
+        usage = context.usage
+        record = {
+            "time": round(time.time(), 3),
+            "language": context.language,
+            "intent": context.intent and context.intent.type.value,
+            "latency_ms": round(latency * 1000, 1),
+            "completion_chars": len(text),
+        }
+        if usage is not None:
+            record.update(
+                strategy=usage.strategy,
+                model=usage.model,
+                prompt_tokens=usage.prompt_tokens,
+                generated_tokens=usage.generated_tokens,
+                cache_hit=usage.cache_hit,
+            )
+            if self.exporter is not None and usage.decision_input is not None:
+                record["features"] = {
+                    name: round(value, 4)
+                    for name, value in acceptance_features(usage.decision_input).items()
+                }
+
+        baseline = _matched(document.text, line_offset, start, text)
+        self._pending[document.uri] = Offer(
+            uri=document.uri,
+            line=context.line,
+            line_offset=line_offset,
+            start=start,
+            text=text,
+            baseline=baseline,
+            offered_at=self.clock(),
+            record=record,
+            matched=baseline,
+        )
+
+    def changed(self, document: Document, first_line: Optional[int] = None) -> None:
+        """
+        Re-check the pending offer after an edit starting at `first_line`
+        (None when unknown). The offer line's start offset only moves when
+        lines above it change, so typing at or below it never rescans the
+        document.
+        """
+        offer = self._pending.get(document.uri)
+        if offer is None:
+            return
+        if first_line is None or first_line < offer.line:
+            line_offset = _line_offset(document.text, offer.line)
+            if line_offset is None:
+                self._resolve(offer)
+                return
+            offer.line_offset = line_offset
+        matched = _matched(document.text, offer.line_offset, offer.start, offer.text)
+        if matched >= len(offer.text):
+            offer.matched = matched
+            self._resolve(offer)
+        elif matched < offer.matched:
+            self._resolve(offer)
+        else:
+            offer.matched = matched
+            if self.clock() - offer.offered_at > self.timeout:
+                self._resolve(offer)
+
+    def close(self, uri: str) -> None:
+        offer = self._pending.get(uri)
+        if offer is not None:
+            self._resolve(offer)
+
+    def expire(self) -> None:
+        """
+        Resolve offers older than the timeout, e.g. in documents that were
+        not edited again.
+        """
+        cutoff = self.clock() - self.timeout
+        for offer in [o for o in self._pending.values() if o.offered_at < cutoff]:
+            self._resolve(offer)
+
+    def flush(self) -> None:
+        for offer in list(self._pending.values()):
+            self._resolve(offer)
+
+    def classify(self, offer: Offer) -> str:
+        if offer.matched >= len(offer.text):
+            return "accepted"
+        if offer.matched - offer.baseline >= self.partial_chars:
+            return "partial"
+        return "ignored"
+
+    def _resolve(self, offer: Offer) -> None:
+        del self._pending[offer.uri]
+        outcome = self.classify(offer)
+        self._outcomes[outcome].inc()
+        if self.exporter is None:
+            return
+        record = dict(
+            offer.record,
+            outcome=outcome,
+            accepted_chars=max(0, offer.matched - offer.baseline),
+            resolved_ms=round((self.clock() - offer.offered_at) * 1000),
+        )
+        try:
+            self.exporter.write(record)
+        except OSError:
+            pass
+
+
+def _line_offset(text: str, line: int) -> Optional[int]:
+    """
+    Offset where `line` starts, or None when the document is shorter.
+    """
+    offset = 0
+    for _ in range(line):
+        offset = text.find("\n", offset) + 1
+        if not offset:
+            return None
+    return offset
+
+
+def _matched(text: str, line_offset: int, start: int, completion: str) -> int:
+    """
+    How many leading characters of `completion` the document holds at
+    column `start` of the line beginning at `line_offset`. Only the slice
+    the completion could cover is read.
+    """
+    line_end = text.find("\n", line_offset)
+    if line_end == -1:
+        line_end = len(text)
+    if text[line_end - 1 : line_end] == "\r":
+        line_end -= 1
+    offset = line_offset + start
+    if offset > line_end:
+        return 0
+
+    segment = text[offset : offset + len(completion) + completion.count("\n")]
+    if "\r" in segment:
+        segment = segment.replace("\r\n", "\n")
+    return len(os.path.commonprefix([segment, completion]))
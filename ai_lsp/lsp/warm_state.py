@@ -0,0 +1,213 @@
+"""
+Warm state carried across server restarts.
+
+A restarted server starts with an empty memory cache, no latency samples
+(so every adaptive timeout falls back to the fixed ceiling and nothing is
+hedged) and no idea that Ollama still has the model loaded. A small JSON
+snapshot of that state is written periodically and on shutdown, and read
+back at startup.
+
+Every part is checked against the running configuration before it is
+used: latency samples only for the same engine, model and backend nodes,
+cache keys only for the same cache file, warm models only for the same
+Ollama and only while their keep-alive can still be running. A snapshot
+from another format version is ignored as a whole.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from ai_lsp.ai.warmup import ModelWarmup
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+
+if TYPE_CHECKING:
+    from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+def default_state_path() -> str:
+    base = os.getenv("XDG_STATE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "state"
+    )
+    return os.path.join(base, "ai-lsp", "warm-state.json")
+
+
+def engine_fingerprint(engine: "OllamaCompletionEngine") -> dict[str, Any]:
+    return {
+        "engine": type(engine).__name__,
+        "model": engine.model,
+        "nodes": list(engine.nodes),
+    }
+
+
+class WarmState:
+    """
+    Snapshot file of the engine's latency window, the memory cache's keys
+    and the warm-up manager's warm models.
+
+    The file is read once, when this object is created; `save` replaces it
+    atomically, so a crash mid-write leaves the previous snapshot. Several
+    stdio servers sharing the file simply take turns; the last one to save
+    wins.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 300.0,
+        max_age: float = 86_400.0,
+        metrics: Optional[CompletionMetrics] = None,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        # Latency samples older than this no longer describe the backend.
+        self.max_age = max_age
+
+        metrics = metrics or METRICS
+        registry = metrics.registry
+        self._restored = {
+            part: registry.counter(
+                "ai_lsp_warm_state_restored_total",
+                "Snapshot parts restored at startup",
+                part=part,
+            )
+            for part in ("latency", "cache", "warmup")
+        }
+        self._save_errors = registry.counter(
+            "ai_lsp_warm_state_save_errors_total", "Failed warm state snapshots"
+        )
+
+        self.saved: dict[str, Any] = self.load()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> dict[str, Any]:
+        """
+        The snapshot on disk, or an empty dict when there is none or it
+        cannot be used.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable warm state %s: %s", self.path, e)
+            return {}
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            logger.info("Ignoring warm state %s from another version", self.path)
+            return {}
+        return state
+
+    @staticmethod
+    def _age(part: dict[str, Any]) -> Optional[float]:
+        saved_at = part.get("saved_at")
+        if not isinstance(saved_at, (int, float)):
+            return None
+        return max(0.0, time.time() - saved_at)
+
+    def restore_engine(self, engine: "OllamaCompletionEngine") -> None:
+        part = self.saved.get("engine")
+        if not isinstance(part, dict) or (age := self._age(part)) is None:
+            return
+        try:
+            if age < self.max_age and part.get("fingerprint") == engine_fingerprint(engine):
+                engine.latency.restore(part.get("latency") or {})
+                self._restored["latency"].inc()
+
+            cache = part.get("cache")
+            if engine.cache is not None and isinstance(cache, dict):
+                if cache.get("path") == engine.cache.path:
+                    engine.cache.preload(list(cache.get("keys") or []))
+                    self._restored["cache"].inc()
+        except (TypeError, ValueError) as e:
+            logger.warning("Ignoring malformed warm state %s: %s", self.path, e)
+
+    def restore_warmup(self, warmup: ModelWarmup) -> None:
+        part = self.saved.get("warmup")
+        if not isinstance(part, dict) or (age := self._age(self.saved)) is None:
+            return
+        if part.get("base_url") != warmup.base_url:
+            return
+        try:
+            warmup.restore(
+                {model: float(ago) + age for model, ago in (part.get("models") or {}).items()}
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning("Ignoring malformed warm state %s: %s", self.path, e)
+            return
+        self._restored["warmup"].inc()
+
+    def snapshot(
+        self,
+        engine: Optional["OllamaCompletionEngine"],
+        warmup: Optional[ModelWarmup],
+    ) -> dict[str, Any]:
+        """
+        Current state, keeping parts of the previous snapshot for services
+        that have not started yet.
+        """
+        now = time.time()
+        state: dict[str, Any] = {"version": STATE_VERSION, "saved_at": now}
+        if engine is not None:
+            part: dict[str, Any] = {
+                "saved_at": now,
+                "fingerprint": engine_fingerprint(engine),
+                "latency": engine.latency.samples(),
+            }
+            if engine.cache is not None:
+                part["cache"] = {"path": engine.cache.path, "keys": engine.cache.hot_keys()}
+            state["engine"] = part
+        elif "engine" in self.saved:
+            state["engine"] = self.saved["engine"]
+        if warmup is not None:
+            state["warmup"] = {"base_url": warmup.base_url, "models": warmup.state()}
+        return state
+
+    def save(
+        self,
+        engine: Optional["OllamaCompletionEngine"],
+        warmup: Optional[ModelWarmup],
+    ) -> bool:
+        state = self.snapshot(engine, warmup)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self._save_errors.inc()
+            logger.warning("Cannot write warm state %s: %s", self.path, e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def start(self, save: Callable[[], Any]) -> None:
+        """
+        Call `save` every `interval` seconds on a background thread.
+        """
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        def run() -> None:
+            while not self._stopped.wait(self.interval):
+                save()
+
+        self._thread = threading.Thread(target=run, name="ai-lsp-warm-state", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
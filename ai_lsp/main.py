@@ -1,9 +1,43 @@
+import argparse
 import os
+import signal
 import sys
 from ai_lsp.lsp.server import create_server
 
+DEFAULT_PORT = 2087
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="ai-lsp")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--tcp", action="store_true", help="serve many clients over TCP"
+    )
+    mode.add_argument(
+        "--ws", action="store_true", help="serve many clients over WebSocket"
+    )
+    mode.add_argument(
+        "--connect",
+        action="store_true",
+        help="relay stdio to a shared --tcp server",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="with --connect, start the shared server if none is running",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    if args.connect:
+        from ai_lsp.lsp.shim import main as shim
+
+        sys.exit(shim(args.host, args.port, spawn=args.spawn))
 
-def main():
     # Check if we're in debug mode
     if os.getenv("DEBUG_AI_LSP"):
         print("🔧 AI LSP Server starting in DEBUG mode")
@@ -17,6 +51,19 @@ def main():
         except ImportError:
             print("❌ debugpy not available - install with: poetry install --with dev")
 
+    # Unwind on SIGTERM as on Ctrl-C, so shutdown and exit hooks run.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if args.tcp or args.ws:
+        from ai_lsp.lsp.multiclient import MultiClientServer
+
+        shared = MultiClientServer()
+        if args.tcp:
+            shared.start_tcp(args.host, args.port)
+        else:
+            shared.start_ws(args.host, args.port)
+        return
+
     server = create_server()
     server.start_io()
 
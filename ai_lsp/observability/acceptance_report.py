@@ -0,0 +1,116 @@
+"""
+Summarize the acceptance log per intent, strategy and model.
+
+    python -m ai_lsp.observability.acceptance_report acceptance.jsonl
+    python -m ai_lsp.observability.acceptance_report acceptance.jsonl --by model,intent
+"""
+
+import argparse
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from ai_lsp.observability.trace_view import load_traces, rotated_files
+
+DEFAULT_GROUPS = ("intent", "strategy", "model")
+
+
+def _quantile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(records: Iterable[dict], by: tuple[str, ...]) -> list[dict]:
+    """
+    One row per distinct value of the `by` fields, busiest first.
+    """
+    groups: dict[tuple, list[dict]] = defaultdict(list)
+    for record in records:
+        if record.get("outcome"):
+            groups[tuple(record.get(key) for key in by)].append(record)
+
+    rows = []
+    for key, members in groups.items():
+        count = len(members)
+        outcomes = [r["outcome"] for r in members]
+        latencies = [r["latency_ms"] for r in members if r.get("latency_ms") is not None]
+        tokens = [
+            r["generated_tokens"] for r in members if r.get("generated_tokens") is not None
+        ]
+        offered = sum(r.get("completion_chars") or 0 for r in members)
+        kept = sum(r.get("accepted_chars") or 0 for r in members)
+        rows.append(
+            {
+                **dict(zip(by, key)),
+                "count": count,
+                "accepted": outcomes.count("accepted") / count,
+                "partial": outcomes.count("partial") / count,
+                "ignored": outcomes.count("ignored") / count,
+                "kept_chars": kept / offered if offered else 0.0,
+                "latency_p50_ms": _quantile(latencies, 0.5),
+                "latency_p90_ms": _quantile(latencies, 0.9),
+                "mean_tokens": sum(tokens) / len(tokens) if tokens else None,
+            }
+        )
+    return sorted(rows, key=lambda row: row["count"], reverse=True)
+
+
+def render(rows: list[dict], by: tuple[str, ...]) -> str:
+    header = [*by, "count", "accepted", "partial", "ignored", "kept", "p50 ms", "p90 ms", "tokens"]
+    table = [header]
+    for row in rows:
+        table.append(
+            [
+                *(str(row[key]) for key in by),
+                str(row["count"]),
+                f"{row['accepted']:.1%}",
+                f"{row['partial']:.1%}",
+                f"{row['ignored']:.1%}",
+                f"{row['kept_chars']:.1%}",
+                _number(row["latency_p50_ms"]),
+                _number(row["latency_p90_ms"]),
+                _number(row["mean_tokens"]),
+            ]
+        )
+    widths = [max(len(line[i]) for line in table) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if i < len(by) else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(line, widths))
+        )
+        for line in table
+    )
+
+
+def _number(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m ai_lsp.observability.acceptance_report")
+    parser.add_argument("path", help="log written via AI_LSP_ACCEPTANCE_LOG")
+    parser.add_argument(
+        "--by",
+        help="comma-separated fields to group by together "
+        "(default: one table each for intent, strategy and model)",
+    )
+    parser.add_argument(
+        "--no-rotated", action="store_true", help="ignore rotated backups of the file"
+    )
+    args = parser.parse_args(argv)
+
+    paths = [args.path] if args.no_rotated else rotated_files(args.path)
+    records = list(load_traces(paths))
+    groupings = (
+        [tuple(field.strip() for field in args.by.split(","))]
+        if args.by
+        else [(field,) for field in DEFAULT_GROUPS]
+    )
+    for by in groupings:
+        print(render(summarize(records, by), by))
+        print()
+
+
+if __name__ == "__main__":
+    main()
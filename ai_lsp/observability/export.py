@@ -0,0 +1,74 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_lsp.observability.metrics import MetricsRegistry
+
+
+class PrometheusFileWriter:
+    """
+    Periodically writes the registry in Prometheus text format, e.g. for a
+    node_exporter textfile collector. Writes are atomic (temp file +
+    rename).
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="ai-lsp-metrics-file", daemon=True
+        )
+
+    def start(self) -> "PrometheusFileWriter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.write()
+
+    def write(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.registry.render_prometheus())
+        os.replace(tmp, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+def serve_prometheus(
+    registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics from a daemon thread. Returns the running server;
+    call `shutdown()` to stop it.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(
+        target=httpd.serve_forever, name="ai-lsp-metrics-http", daemon=True
+    ).start()
+    return httpd
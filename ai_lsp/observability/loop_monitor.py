@@ -0,0 +1,204 @@
+import asyncio
+import functools
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from ai_lsp.observability.metrics import METRICS, CompletionMetrics
+
+# Frames shown in a stall report, innermost last.
+STACK_LIMIT = 20
+
+
+class LoopMonitor:
+    """
+    Watches the event loop the LSP handlers run on.
+
+    A sampler task sleeps for `interval` and records how late it wakes up
+    as loop lag (ten wake-ups a second at the default). A watchdog thread
+    checks the sampler's heartbeat; when the loop has not come back for
+    `threshold` seconds it grabs the loop thread's stack right then, while
+    the culprit is still running, and attributes the stall to the
+    instrumented handler on that stack. The report is handed to `on_stall`
+    from the loop once it is responsive again, at most one per
+    `report_interval` seconds; stalls in between are only counted.
+
+    `instrument()` wraps every registered feature and command to record
+    its wall time; for async handlers that includes time spent awaiting.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        metrics: Optional[CompletionMetrics] = None,
+        on_stall: Optional[Callable[[str], None]] = None,
+        report_interval: float = 10.0,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.metrics = metrics or METRICS
+        self.on_stall = on_stall
+
+        registry = self.metrics.registry
+        self._lag = registry.histogram(
+            "ai_lsp_event_loop_lag_seconds", "How late the event loop runs a timer"
+        )
+        self._stalls = registry.counter(
+            "ai_lsp_event_loop_stalls_total",
+            "Times the event loop was blocked for longer than the threshold",
+        )
+
+        self.heartbeat = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self._reported = 0.0
+        self._reports: list[str] = []
+        self._last_report = float("-inf")
+        self._suppressed = 0
+        # Keyed by code object, not handler: every connection of a shared
+        # server registers fresh closures, and those must not be kept alive.
+        self._names: dict[Any, str] = {}
+
+    # ------------------------------------------------------------------
+    # Handler accounting
+    # ------------------------------------------------------------------
+    def instrument(self, server: Any) -> None:
+        """
+        Wrap the handlers registered on a pygls server so far.
+        """
+        manager = server.protocol.fm
+        for handlers in (manager.features, manager.commands):
+            for name, handler in list(handlers.items()):
+                handlers[name] = self.wrap(name, handler)
+
+    def wrap(self, name: str, handler: Callable) -> Callable:
+        histogram = self.metrics.registry.histogram(
+            "ai_lsp_handler_seconds", "Wall time per LSP handler call", handler=name
+        )
+
+        if asyncio.iscoroutinefunction(handler):
+
+            @functools.wraps(handler)
+            async def instrumented_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await handler(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+
+            self._names[_code(handler)] = name
+            return instrumented_async
+
+        @functools.wraps(handler)
+        def instrumented(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        self._names[_code(handler)] = name
+        return instrumented
+
+    # ------------------------------------------------------------------
+    # Lag sampling
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """
+        Start sampling the running loop. Must be called from the loop.
+        """
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self.heartbeat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="ai-lsp-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self) -> None:
+        interval = self.interval
+        expected = time.perf_counter() + interval
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            self._lag.observe(max(0.0, now - expected))
+            self.heartbeat = now
+            expected = now + interval
+            if self._reports:
+                self._flush()
+
+    def _flush(self) -> None:
+        reports, self._reports = self._reports, []
+        if self.on_stall is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_report < self.report_interval:
+            self._suppressed += len(reports)
+            return
+        report = reports[-1]
+        suppressed = self._suppressed + len(reports) - 1
+        if suppressed:
+            report += f"({suppressed} other stalls not shown)\n"
+        self._last_report = now
+        self._suppressed = 0
+        self.on_stall(report)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            blocked = time.perf_counter() - heartbeat - self.interval
+            if blocked < self.threshold or heartbeat == self._reported:
+                continue
+            # One report per stall, taken while the loop is still stuck.
+            self._reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            if frame is None:
+                continue
+            self._stalls.inc()
+            handler = self.handler_on_stack(frame)
+            if handler is not None:
+                self.metrics.registry.counter(
+                    "ai_lsp_slow_handlers_total",
+                    "Handlers that blocked the event loop past the threshold",
+                    handler=handler,
+                ).inc()
+            self._reports.append(
+                f"Event loop blocked for {blocked * 1000:.0f}ms+"
+                f" in {handler or 'unknown code'}:\n"
+                + "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            )
+
+    def handler_on_stack(self, frame: Optional[FrameType]) -> Optional[str]:
+        """
+        Name of the innermost instrumented handler among `frame`'s callers.
+        """
+        while frame is not None:
+            if frame.f_code.co_name in ("instrumented", "instrumented_async"):
+                name = self._names.get(_code(frame.f_locals.get("handler")))
+                if name is not None:
+                    return name
+            frame = frame.f_back
+        return None
+
+
+def _code(handler: Any) -> Any:
+    # pygls registers handlers as partials bound to their server.
+    while isinstance(handler, functools.partial):
+        handler = handler.func
+    return getattr(handler, "__code__", handler)
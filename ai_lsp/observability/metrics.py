@@ -0,0 +1,291 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Optional
+
+# Latency buckets in seconds, roughly x2 apart: 50us .. ~50s.
+LATENCY_BUCKETS: tuple[float, ...] = tuple(0.00005 * 2**i for i in range(21))
+# Token count buckets.
+COUNT_BUCKETS: tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Counter:
+    __slots__ = ("name", "labels", "value")
+
+    def __init__(self, name: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("name", "labels", "value")
+
+    def __init__(self, name: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. `observe` is a bisect plus three additions, so
+    it stays well under a microsecond and needs no lock: a lost update under
+    a rare thread race only skews a counter by one.
+    """
+
+    __slots__ = ("name", "labels", "bounds", "counts", "sum", "count")
+
+    def __init__(
+        self,
+        name: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.labels = labels
+        self.bounds = buckets
+        # One slot per bound plus the +Inf overflow slot.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-quantile (0 < q <= 1).
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else math.inf
+        return math.inf
+
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    # Quantiles past the last bucket are +Inf, which JSON cannot carry.
+    return None if value is None or math.isinf(value) else value
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[tuple[str, Labels], Counter | Gauge | Histogram] = {}
+        self._help: dict[str, str] = {}
+
+    def _get(self, factory, name: str, help: str, labels: dict[str, str], **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = factory(name, key[1], **kwargs)
+                    self._metrics[key] = metric
+                    if help:
+                        self._help.setdefault(name, help)
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def _collect(self) -> tuple[list[Counter | Gauge | Histogram], dict[str, str]]:
+        # Other threads register metrics while these are read.
+        with self._lock:
+            return list(self._metrics.values()), dict(self._help)
+
+    def snapshot(self) -> dict:
+        """
+        JSON-friendly view of every metric, with estimated percentiles for
+        histograms.
+        """
+        result: dict[str, list[dict]] = {}
+        metrics, _ = self._collect()
+        for metric in metrics:
+            entry: dict = {"labels": dict(metric.labels)}
+            if isinstance(metric, Histogram):
+                entry.update(
+                    count=metric.count,
+                    sum=metric.sum,
+                    p50=_finite(metric.quantile(0.5)),
+                    p95=_finite(metric.quantile(0.95)),
+                    p99=_finite(metric.quantile(0.99)),
+                )
+            else:
+                entry["value"] = metric.value
+            result.setdefault(metric.name, []).append(entry)
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus text exposition format.
+        """
+        lines: list[str] = []
+        typed: set[str] = set()
+        metrics, help = self._collect()
+        for metric in sorted(metrics, key=lambda m: (m.name, m.labels)):
+            name = metric.name
+            if name not in typed:
+                typed.add(name)
+                if name in help:
+                    lines.append(f"# HELP {name} {help[name]}")
+                kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+                lines.append(f"# TYPE {name} {kind[type(metric)]}")
+
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.bounds + (math.inf,), metric.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(
+                        f"{name}_bucket{_labels(metric.labels, le=le)} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_labels(metric.labels)} {metric.sum}")
+                lines.append(f"{name}_count{_labels(metric.labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_labels(metric.labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CompletionMetrics:
+    """
+    The server's completion metrics, resolved once so the hot path only
+    touches pre-bound Counter/Histogram objects.
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+        self.requests = registry.counter(
+            "ai_lsp_completion_requests_total", "Completion requests received"
+        )
+        self.completions = registry.counter(
+            "ai_lsp_completions_total", "Completions returned to the client"
+        )
+        self.empty = registry.counter(
+            "ai_lsp_completion_empty_total", "Requests answered without a completion"
+        )
+        self.cancelled = registry.counter(
+            "ai_lsp_completion_cancelled_total", "Requests cancelled or superseded"
+        )
+        self.errors = registry.counter(
+            "ai_lsp_completion_errors_total", "Requests that failed with an error"
+        )
+        self.latency = registry.histogram(
+            "ai_lsp_completion_seconds", "End-to-end completion request latency"
+        )
+
+        self.prompt_tokens = registry.counter(
+            "ai_lsp_backend_prompt_tokens_total", "Prompt tokens evaluated by the backend"
+        )
+        self.generated_tokens = registry.counter(
+            "ai_lsp_backend_generated_tokens_total", "Tokens generated by the backend"
+        )
+        self.prompt_eval = registry.histogram(
+            "ai_lsp_backend_prompt_eval_seconds", "Backend-reported prompt evaluation time"
+        )
+        self.eval = registry.histogram(
+            "ai_lsp_backend_eval_seconds", "Backend-reported generation time"
+        )
+        self.eval_tokens = registry.histogram(
+            "ai_lsp_backend_eval_tokens",
+            "Tokens generated per request",
+            buckets=COUNT_BUCKETS,
+        )
+        self.decode_rate = registry.histogram(
+            "ai_lsp_backend_tokens_per_second",
+            "Backend-reported decode rate",
+            buckets=COUNT_BUCKETS,
+        )
+
+        self.hedges = registry.counter(
+            "ai_lsp_backend_hedges_total", "Duplicate requests sent to another node"
+        )
+        self.deadlines = registry.counter(
+            "ai_lsp_backend_deadline_exceeded_total",
+            "Generations cut short by the adaptive deadline",
+        )
+        self.first_token_timeout = registry.gauge(
+            "ai_lsp_backend_first_token_timeout_seconds",
+            "Current adaptive first-token timeout",
+        )
+
+        self._stages: dict[str, Histogram] = {}
+
+    def stage(self, name: str) -> Histogram:
+        histogram = self._stages.get(name)
+        if histogram is None:
+            histogram = self.registry.histogram(
+                "ai_lsp_stage_seconds", "Time spent per completion stage", stage=name
+            )
+            self._stages[name] = histogram
+        return histogram
+
+    def observe_stages(self, stages: dict[str, float]) -> None:
+        for name, seconds in stages.items():
+            self.stage(name).observe(seconds)
+
+    def observe_backend(self, message: dict) -> None:
+        """
+        Harvest Ollama's counters from the final (`done`) stream message.
+        Durations are reported in nanoseconds.
+        """
+        prompt_count = message.get("prompt_eval_count")
+        if prompt_count:
+            self.prompt_tokens.inc(prompt_count)
+        prompt_duration = message.get("prompt_eval_duration")
+        if prompt_duration:
+            self.prompt_eval.observe(prompt_duration / 1e9)
+
+        eval_count = message.get("eval_count")
+        eval_duration = message.get("eval_duration")
+        if eval_count:
+            self.generated_tokens.inc(eval_count)
+            self.eval_tokens.observe(eval_count)
+        if eval_duration:
+            self.eval.observe(eval_duration / 1e9)
+            if eval_count:
+                self.decode_rate.observe(eval_count / (eval_duration / 1e9))
+
+
+REGISTRY = MetricsRegistry()
+METRICS = CompletionMetrics(REGISTRY)
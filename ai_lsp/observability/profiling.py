@@ -0,0 +1,336 @@
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+# cProfile, pstats and tracemalloc are imported when a session runs: this
+# module is loaded at server startup and profiling is rarely used.
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+PROFILE_MODES = ("cprofile", "sampling")
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "ai-lsp-profiles")
+# Before 3.12 cProfile installs a per-thread hook, so calls made on worker
+# threads need their own profiler; since 3.12 it uses sys.monitoring,
+# which covers every thread and allows only one active profiler.
+_PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+_NOT_FOLLOWED = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+@dataclass
+class ProfileSession:
+    mode: str
+    remaining: int
+    directory: str
+    memory: bool
+    started: float = field(default_factory=time.time)
+    profiles: list["cProfile.Profile"] = field(default_factory=list)
+    stacks: Counter = field(default_factory=Counter)
+    memory_before: Optional["tracemalloc.Snapshot"] = None
+    sizes_before: dict[str, int] = field(default_factory=dict)
+    # Whether the session turned tracemalloc on and must turn it off.
+    owns_tracemalloc: bool = False
+
+
+class Profiler:
+    """
+    On-demand CPU and memory profiling over the next N completion requests.
+
+    In "cprofile" mode the event-loop thread is profiled for the whole
+    session and every blocking backend call gets its own profile, merged
+    at the end. "sampling" mode instead walks every thread's stack at a
+    fixed interval and writes collapsed stacks (flamegraph input).
+
+    With `memory` enabled, tracemalloc snapshots are taken at start and
+    end, together with the approximate size of every tracked object
+    (documents, caches).
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_PROFILE_DIR,
+        sample_interval: float = 0.005,
+    ) -> None:
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.tracked: dict[str, Callable[[], Any]] = {}
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._sampling = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def track(self, name: str, getter: Callable[[], Any]) -> None:
+        """
+        Include the object returned by `getter` in memory size reports.
+        """
+        self.tracked[name] = getter
+
+    def untrack(self, name: str) -> None:
+        self.tracked.pop(name, None)
+
+    def start(
+        self,
+        completions: int = 10,
+        mode: str = "cprofile",
+        memory: bool = True,
+        directory: Optional[str] = None,
+    ) -> dict:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+        import cProfile
+        import tracemalloc
+
+        with self._lock:
+            if self.session is not None:
+                return self.status()
+
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            session = ProfileSession(
+                mode=mode,
+                remaining=max(1, completions),
+                directory=os.path.join(directory or self.directory, f"profile-{stamp}"),
+                memory=memory,
+            )
+
+            if memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(10)
+                    session.owns_tracemalloc = True
+                session.memory_before = tracemalloc.take_snapshot()
+                session.sizes_before = self._tracked_sizes()
+
+            if mode == "cprofile":
+                profile = cProfile.Profile()
+                session.profiles.append(profile)
+                profile.enable()
+            else:
+                self._sampling.clear()
+                self._sampler = threading.Thread(
+                    target=self._sample, args=(session,), name="ai-lsp-sampler", daemon=True
+                )
+                self._sampler.start()
+
+            self.session = session
+            return self.status()
+
+    def status(self) -> dict:
+        session = self.session
+        if session is None:
+            return {"active": False}
+        return {
+            "active": True,
+            "mode": session.mode,
+            "remaining": session.remaining,
+            "memory": session.memory,
+            "directory": session.directory,
+        }
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Run a blocking call, profiling it when a cProfile session is active.
+        Meant for work that runs outside the event-loop thread.
+        """
+        session = self.session
+        if session is None or session.mode != "cprofile" or not _PER_THREAD_CPROFILE:
+            return fn(*args)
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self._lock:
+            session.profiles.append(profile)
+        return profile.runcall(fn, *args)
+
+    def completion_finished(self) -> Optional[dict]:
+        """
+        Count one completion against the session. Returns the written
+        artifacts when this completion ended the session.
+        """
+        session = self.session
+        if session is None:
+            return None
+        session.remaining -= 1
+        if session.remaining > 0:
+            return None
+        return self.stop()
+
+    def stop(self) -> dict:
+        with self._lock:
+            session = self.session
+            if session is None:
+                return {"active": False}
+            self.session = None
+
+            if session.mode == "cprofile":
+                session.profiles[0].disable()
+            else:
+                self._sampling.set()
+                if self._sampler:
+                    self._sampler.join()
+                    self._sampler = None
+
+        os.makedirs(session.directory, exist_ok=True)
+        artifacts: dict[str, Any] = {"directory": session.directory}
+        if session.mode == "cprofile":
+            artifacts.update(self._write_cprofile(session))
+        else:
+            artifacts.update(self._write_samples(session))
+        if session.memory:
+            artifacts.update(self._write_memory(session))
+            if session.owns_tracemalloc:
+                import tracemalloc
+
+                tracemalloc.stop()
+
+        with open(os.path.join(session.directory, "session.json"), "w") as f:
+            json.dump(
+                {
+                    "mode": session.mode,
+                    "started": session.started,
+                    "duration": time.time() - session.started,
+                    "artifacts": artifacts,
+                },
+                f,
+                indent=2,
+            )
+        return artifacts
+
+    # ------------------------------------------------------------------
+    # CPU
+    # ------------------------------------------------------------------
+    def _write_cprofile(self, session: ProfileSession) -> dict:
+        import pstats
+
+        path = os.path.join(session.directory, "cpu.prof")
+        stats = None
+        for profile in session.profiles:
+            profile.create_stats()
+            if not profile.stats:  # pyright: ignore
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            return {}
+        stats.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(path, stream=summary).sort_stats("cumulative").print_stats(60)
+        summary_path = os.path.join(session.directory, "cpu.txt")
+        with open(summary_path, "w") as f:
+            f.write(summary.getvalue())
+        return {"cpu_profile": path, "cpu_summary": summary_path}
+
+    def _sample(self, session: ProfileSession) -> None:
+        own = threading.get_ident()
+        while not self._sampling.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                session.stacks[";".join(reversed(stack))] += 1
+
+    def _write_samples(self, session: ProfileSession) -> dict:
+        path = os.path.join(session.directory, "cpu.folded")
+        with open(path, "w") as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return {"cpu_samples": path, "samples": sum(session.stacks.values())}
+
+    # ------------------------------------------------------------------
+    # Memory
+    # ------------------------------------------------------------------
+    def _tracked_sizes(self) -> dict[str, int]:
+        sizes = {}
+        for name, getter in self.tracked.items():
+            try:
+                sizes[name] = deep_sizeof(getter())
+            except Exception:
+                continue
+        return sizes
+
+    def _write_memory(self, session: ProfileSession) -> dict:
+        import tracemalloc
+
+        after = tracemalloc.take_snapshot()
+        after.dump(os.path.join(session.directory, "memory.snapshot"))
+
+        lines = []
+        if session.memory_before is not None:
+            for stat in after.compare_to(session.memory_before, "lineno")[:50]:
+                lines.append(str(stat))
+        diff_path = os.path.join(session.directory, "memory-diff.txt")
+        with open(diff_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        sizes_after = self._tracked_sizes()
+        tracked = {
+            name: {
+                "before": session.sizes_before.get(name),
+                "after": size,
+                "delta": size - session.sizes_before.get(name, 0),
+            }
+            for name, size in sizes_after.items()
+        }
+        tracked_path = os.path.join(session.directory, "memory-tracked.json")
+        with open(tracked_path, "w") as f:
+            json.dump(tracked, f, indent=2)
+
+        return {
+            "memory_snapshot": os.path.join(session.directory, "memory.snapshot"),
+            "memory_diff": diff_path,
+            "memory_tracked": tracked_path,
+        }
+
+
+def deep_sizeof(obj: Any, limit: int = 1_000_000) -> int:
+    """
+    Approximate retained size of `obj`: sys.getsizeof over everything
+    reachable through gc referents, counting each object once. Classes,
+    modules and functions are not followed.
+    """
+    seen: set[int] = set()
+    pending = [obj]
+    total = 0
+    while pending and len(seen) < limit:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, _NOT_FOLLOWED):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        pending.extend(gc.get_referents(item))
+    return total
+
+
+def parse_profile_spec(spec: str) -> tuple[str, int]:
+    """
+    Parse AI_LSP_PROFILE values: "20", "cprofile:20" or "sampling:50".
+    """
+    mode, _, count = spec.rpartition(":")
+    return (mode or "cprofile", int(count))
+
+
+PROFILER = Profiler()
@@ -0,0 +1,90 @@
+"""
+Render the slowest request traces from a JSONL trace file as waterfalls.
+
+    python -m ai_lsp.observability.trace_view traces.jsonl --top 5
+"""
+
+import argparse
+import json
+import os
+from typing import Iterable, Iterator
+
+BAR_WIDTH = 48
+ROOT_ATTRIBUTES = ("outcome", "intent", "strategy", "prompt_tokens", "generated_tokens")
+
+
+def load_traces(paths: Iterable[str]) -> Iterator[dict]:
+    """
+    Read traces from the given files, skipping lines that fail to parse
+    (e.g. a record cut off by a crash).
+    """
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def rotated_files(path: str) -> list[str]:
+    """
+    `path` plus its rotated backups, oldest first.
+    """
+    files = [path]
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.insert(0, f"{path}.{index}")
+        index += 1
+    return [f for f in files if os.path.exists(f)]
+
+
+def slowest(traces: Iterable[dict], count: int) -> list[dict]:
+    return sorted(traces, key=lambda t: t.get("duration_ms", 0.0), reverse=True)[:count]
+
+
+def render_waterfall(trace: dict, width: int = BAR_WIDTH) -> str:
+    total = trace.get("duration_ms") or 0.0
+    attributes = trace.get("attributes", {})
+
+    header = f"{trace.get('name', 'trace')} {trace.get('trace_id', '')} {total:.1f}ms"
+    details = [f"{key}={attributes[key]}" for key in ROOT_ATTRIBUTES if attributes.get(key) is not None]
+    lines = [header, f"  {attributes.get('uri', '')} v{attributes.get('version', '?')}"]
+    if details:
+        lines.append("  " + " ".join(details))
+
+    spans = sorted(
+        trace.get("spans", []),
+        key=lambda s: (s["offset_ms"], -s["duration_ms"]),
+    )
+    label_width = max((len(s["name"]) for s in spans), default=0)
+    scale = width / total if total else 0.0
+    for span in spans:
+        start = min(width - 1, int(span["offset_ms"] * scale))
+        length = max(1, round(span["duration_ms"] * scale))
+        length = min(length, width - start)
+        bar = " " * start + "#" * length + " " * (width - start - length)
+        lines.append(
+            f"  {span['name']:<{label_width}} |{bar}| {span['duration_ms']:8.2f}ms"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m ai_lsp.observability.trace_view")
+    parser.add_argument("path", help="trace file written via AI_LSP_TRACE_FILE")
+    parser.add_argument("--top", type=int, default=5, help="number of traces to show")
+    parser.add_argument(
+        "--no-rotated", action="store_true", help="ignore rotated backups of the file"
+    )
+    parser.add_argument("--width", type=int, default=BAR_WIDTH)
+    args = parser.parse_args(argv)
+
+    paths = [args.path] if args.no_rotated else rotated_files(args.path)
+    for trace in slowest(load_traces(paths), args.top):
+        print(render_waterfall(trace, args.width))
+        print()
+
+
+if __name__ == "__main__":
+    main()
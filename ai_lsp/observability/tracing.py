@@ -0,0 +1,228 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Optional
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "parent", "attributes")
+
+    def __init__(
+        self,
+        name: str,
+        start: float,
+        end: Optional[float] = None,
+        parent: Optional[int] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.start = start
+        self.end = end
+        self.parent = parent
+        self.attributes = attributes or {}
+
+
+class _SpanScope:
+    __slots__ = ("trace", "index")
+
+    def __init__(self, trace: "Trace", index: int) -> None:
+        self.trace = trace
+        self.index = index
+
+    def __enter__(self) -> Span:
+        return self.trace.spans[self.index]
+
+    def __exit__(self, *exc) -> None:
+        self.trace.spans[self.index].end = time.perf_counter()
+        self.trace._stack.pop()
+
+
+class Trace:
+    """
+    One sampled completion request. Spans are recorded with perf_counter
+    timestamps; the root span is index 0.
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.wall_start = time.time()
+        self.spans = [Span(name, time.perf_counter(), attributes=attributes)]
+        self._stack = [0]
+
+    def __bool__(self) -> bool:
+        return True
+
+    def set(self, **attributes: Any) -> None:
+        self.spans[0].attributes.update(attributes)
+
+    def span(self, name: str, **attributes: Any) -> _SpanScope:
+        self.spans.append(
+            Span(name, time.perf_counter(), parent=self._stack[-1], attributes=attributes)
+        )
+        index = len(self.spans) - 1
+        self._stack.append(index)
+        return _SpanScope(self, index)
+
+    def add_span(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        """
+        Record a span that was timed elsewhere, under the current span.
+        """
+        self.spans.append(Span(name, start, end, self._stack[-1], attributes))
+
+    def finish(self) -> None:
+        self.spans[0].end = time.perf_counter()
+        self.tracer.export(self)
+
+    def to_dict(self) -> dict:
+        root = self.spans[0]
+        origin = root.start
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "start": self.wall_start,
+            "duration_ms": _ms((root.end or origin) - origin),
+            "attributes": root.attributes,
+            "spans": [
+                {
+                    "id": index,
+                    "name": span.name,
+                    "parent": span.parent,
+                    "offset_ms": _ms(span.start - origin),
+                    "duration_ms": _ms((span.end or span.start) - span.start),
+                    "attributes": span.attributes,
+                }
+                for index, span in enumerate(self.spans)
+                if index
+            ],
+        }
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class NullTrace:
+    """
+    Stand-in used when tracing is disabled or the request is not sampled.
+    It is falsy, so callers can skip building span data with `if trace:`.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def span(self, name: str, **attributes: Any) -> _NullScope:
+        return _NULL_SCOPE
+
+    def add_span(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+_current_trace: ContextVar[Trace | NullTrace] = ContextVar(
+    "ai_lsp_trace", default=NULL_TRACE
+)
+
+
+def current_trace() -> Trace | NullTrace:
+    """
+    The trace of the completion request being handled. Propagates into
+    tasks and `asyncio.to_thread` calls through contextvars.
+    """
+    return _current_trace.get()
+
+
+def set_current_trace(trace: Trace | NullTrace):
+    return _current_trace.set(trace)
+
+
+def reset_current_trace(token) -> None:
+    _current_trace.reset(token)
+
+
+class JsonlTraceExporter:
+    """
+    Appends one JSON line per trace (or any record), rotating `path` to `path.1` ..
+    `path.<backups>` once it exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000, backups: int = 3) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        self.write(trace.to_dict())
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Tracer:
+    def __init__(
+        self,
+        exporter: Optional[JsonlTraceExporter] = None,
+        sample_rate: float = 1.0,
+    ) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = exporter is not None and sample_rate > 0
+
+    def start(self, name: str, **attributes: Any) -> Trace | NullTrace:
+        if not self.enabled:
+            return NULL_TRACE
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return NULL_TRACE
+        return Trace(self, name, attributes)
+
+    def export(self, trace: Trace) -> None:
+        if self.exporter is not None:
+            try:
+                self.exporter.export(trace)
+            except OSError:
+                pass
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
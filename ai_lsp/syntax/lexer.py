@@ -0,0 +1,312 @@
+import re
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from ai_lsp.domain.semantics import ScopeType
+
+
+@dataclass(frozen=True, slots=True)
+class ScopeFrame:
+    """
+    One open function/class scope. Frames form a linked stack through
+    `parent`, so line states can share their tails.
+    """
+
+    kind: ScopeType
+    name: str
+    line: int
+    level: int  # python: header indent, brace languages: depth before "{"
+    parent: Optional["ScopeFrame"] = None
+
+
+@dataclass(frozen=True, slots=True)
+class LineState:
+    """
+    Lexer state at a line boundary.
+
+    Only things that survive a newline live here: open strings, open block
+    comments, open brackets and the scope stack.
+    """
+
+    string: Optional[str] = None
+    comment: bool = False
+    doc: bool = False
+    brackets: str = ""  # open brackets, outermost first
+    scope: Optional[ScopeFrame] = None
+    pending: Optional[ScopeFrame] = None
+    after_header: bool = False
+    seen_code: bool = False
+
+    @property
+    def depth(self) -> int:
+        return len(self.brackets)
+
+
+INITIAL_STATE = LineState()
+
+_OPENERS = "([{"
+_CLOSERS = ")]}"
+
+_PY_HEADER_RE = re.compile(r"(?:async\s+)?(def|class)\s+([A-Za-z_][A-Za-z0-9_]*)")
+_BRACE_HEADER_RE = re.compile(
+    r"(function|class|interface|trait)\b\s*&?\s*([A-Za-z_$][A-Za-z0-9_$]*)?"
+)
+
+
+def _push(kind: str, name: str, line: int, level: int, parent: Optional[ScopeFrame]) -> ScopeFrame:
+    if kind in ("def", "function"):
+        scope_type = (
+            ScopeType.METHOD
+            if parent is not None and parent.kind is ScopeType.CLASS
+            else ScopeType.FUNCTION
+        )
+    else:
+        scope_type = ScopeType.CLASS
+
+    return ScopeFrame(scope_type, name, line, level, parent)
+
+
+def _scan_string(text: str, i: int, delim: str) -> int:
+    """
+    Returns the index just past the closing delimiter, or -1 when the string
+    stays open at the end of `text`.
+    """
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if text.startswith(delim, i):
+            return i + len(delim)
+        i += 1
+    return -1
+
+
+def lex_python(
+    text: str,
+    state: LineState,
+    line: int,
+    stop: int = -1,
+) -> tuple[LineState, bool]:
+    """
+    Lex one python line starting from `state`.
+
+    Returns the state at the end of the line (or at column `stop`) and
+    whether that position is inside a `#` comment.
+    """
+    string, doc, brackets = state.string, state.doc, state.brackets
+    scope, after_header, seen_code = state.scope, state.after_header, state.seen_code
+    end = len(text) if stop < 0 else min(stop, len(text))
+
+    first = 0
+    is_code_line = False
+    if string is None and not brackets:
+        stripped = text.lstrip()
+        first = len(text) - len(stripped)
+        if stripped and not stripped.startswith("#"):
+            is_code_line = True
+            while scope is not None and scope.level >= first:
+                scope = scope.parent
+
+            match = _PY_HEADER_RE.match(text, first)
+            if match and first <= end:
+                scope = _push(match.group(1), match.group(2), line, first, scope)
+                after_header = True
+            elif not stripped.startswith(("'", '"')):
+                after_header = False
+    elif string is None and text.strip():
+        # Continuation line inside brackets.
+        is_code_line = True
+
+    head = text[:end]
+    i = first
+    in_comment = False
+    while i < end:
+        if string is not None:
+            close = _scan_string(head, i, string)
+            if close < 0:
+                i = end
+                break
+            string, doc = None, False
+            i = close
+            continue
+
+        ch = text[i]
+        if ch == "#":
+            in_comment = True
+            break
+        if ch in "'\"":
+            delim = ch * 3 if text.startswith(ch * 3, i) else ch
+            doc = i == first and is_code_line and (after_header or not seen_code)
+            if doc:
+                after_header = False
+            string = delim
+            i += len(delim)
+            continue
+        if ch in _OPENERS:
+            brackets += ch
+        elif ch in _CLOSERS:
+            brackets = brackets[:-1]
+        i += 1
+
+    if stop < 0:
+        # Single quoted strings never span lines.
+        if string is not None and len(string) == 1 and not text.endswith("\\"):
+            string, doc = None, False
+        in_comment = False
+
+    if is_code_line:
+        seen_code = True
+
+    if (
+        string == state.string
+        and doc == state.doc
+        and brackets == state.brackets
+        and scope is state.scope
+        and after_header == state.after_header
+        and seen_code == state.seen_code
+    ):
+        return state, in_comment
+
+    return (
+        LineState(
+            string=string,
+            doc=doc,
+            brackets=brackets,
+            scope=scope,
+            after_header=after_header,
+            seen_code=seen_code,
+        ),
+        in_comment,
+    )
+
+
+def lex_brace(
+    text: str,
+    state: LineState,
+    line: int,
+    stop: int = -1,
+    *,
+    hash_comments: bool = False,
+    multiline_quotes: str = "`",
+) -> tuple[LineState, bool]:
+    """
+    Lex one line of a brace-delimited language (PHP, JavaScript,
+    TypeScript).
+    """
+    string, comment, doc = state.string, state.comment, state.doc
+    brackets = state.brackets
+    scope, pending = state.scope, state.pending
+    end = len(text) if stop < 0 else min(stop, len(text))
+
+    head = text[:end]
+    i = 0
+    in_comment = False
+    while i < end:
+        if comment:
+            close = text.find("*/", i, end)
+            if close < 0:
+                i = end
+                break
+            comment, doc = False, False
+            i = close + 2
+            continue
+
+        if string is not None:
+            close = _scan_string(head, i, string)
+            if close < 0:
+                i = end
+                break
+            string = None
+            i = close
+            continue
+
+        ch = text[i]
+        if ch == "/" and text.startswith("//", i):
+            in_comment = True
+            break
+        if ch == "#" and hash_comments and not text.startswith("#[", i):
+            in_comment = True
+            break
+        if ch == "/" and text.startswith("/*", i):
+            comment = True
+            doc = text.startswith("/**", i) and not text.startswith("/**/", i)
+            i += 3 if doc else 2
+            continue
+        if ch in "'\"`":
+            string = ch
+            i += 1
+            continue
+
+        if ch == "{":
+            if pending is not None:
+                scope = _push(
+                    "function" if pending.kind is not ScopeType.CLASS else "class",
+                    pending.name,
+                    pending.line,
+                    len(brackets),
+                    scope,
+                )
+                pending = None
+            brackets += ch
+        elif ch == "}":
+            brackets = brackets[:-1]
+            while scope is not None and scope.level >= len(brackets):
+                scope = scope.parent
+        elif ch in "([":
+            brackets += ch
+        elif ch in ")]":
+            brackets = brackets[:-1]
+        elif ch == ";":
+            pending = None
+        elif ch.isalpha() and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] in "_$")):
+            match = _BRACE_HEADER_RE.match(text, i)
+            if match:
+                kind = ScopeType.FUNCTION if match.group(1) == "function" else ScopeType.CLASS
+                pending = ScopeFrame(kind, match.group(2) or "", line, len(brackets))
+                i = match.end()
+                continue
+        i += 1
+
+    if stop < 0:
+        if string is not None and string not in multiline_quotes and not text.endswith("\\"):
+            string = None
+        in_comment = False
+
+    if (
+        string == state.string
+        and comment == state.comment
+        and doc == state.doc
+        and brackets == state.brackets
+        and scope is state.scope
+        and pending is state.pending
+    ):
+        return state, in_comment
+
+    return (
+        replace(
+            state,
+            string=string,
+            comment=comment,
+            doc=doc,
+            brackets=brackets,
+            scope=scope,
+            pending=pending,
+        ),
+        in_comment,
+    )
+
+
+def _lex_php(text: str, state: LineState, line: int, stop: int = -1) -> tuple[LineState, bool]:
+    return lex_brace(text, state, line, stop, hash_comments=True, multiline_quotes="'\"`")
+
+
+LEXERS = {
+    "python": lex_python,
+    "php": _lex_php,
+    "javascript": lex_brace,
+    "javascriptreact": lex_brace,
+    "typescript": lex_brace,
+    "typescriptreact": lex_brace,
+}
@@ -0,0 +1,97 @@
+from typing import Callable, Optional
+
+from ai_lsp.domain.semantics import ScopeType
+from ai_lsp.domain.syntax import SyntaxInfo
+from ai_lsp.syntax.lexer import INITIAL_STATE, LEXERS, LineState
+
+Lexer = Callable[..., tuple[LineState, bool]]
+
+
+class SyntaxTree:
+    """
+    Incrementally maintained structure of one document.
+
+    Keeps the lexer state at the start of every line. States are computed
+    lazily up to the line being queried, and an edit only drops the states
+    after the first edited line, so typing re-lexes a handful of lines
+    instead of the whole file.
+
+    A query costs one lexed line per line between the last cached state
+    and the cursor: nothing for lines already lexed, the whole distance
+    from the edit otherwise (or from the top, for the first query). It is
+    not logarithmic in the document size.
+    """
+
+    def __init__(self, lexer: Lexer, text: str) -> None:
+        self._lexer = lexer
+        self._lines = text.splitlines()
+        self._states: list[LineState] = [INITIAL_STATE]
+
+    @classmethod
+    def for_language(cls, language_id: str, text: str) -> Optional["SyntaxTree"]:
+        lexer = LEXERS.get(language_id)
+        if lexer is None:
+            return None
+        return cls(lexer, text)
+
+    @property
+    def valid_lines(self) -> int:
+        """
+        Number of line start states currently cached.
+        """
+        return len(self._states)
+
+    def update(self, text: str, first_line: int = 0) -> None:
+        """
+        Replace the document text. States up to and including `first_line`
+        (the first line touched by the edit) stay valid.
+        """
+        self._lines = text.splitlines()
+        del self._states[max(0, first_line) + 1 :]
+
+    def state_at(self, line: int) -> LineState:
+        """
+        Lexer state at the start of `line`.
+        """
+        line = max(0, min(line, len(self._lines)))
+        states = self._states
+        lines = self._lines
+        lexer = self._lexer
+        for index in range(len(states) - 1, line):
+            states.append(lexer(lines[index], states[index], index)[0])
+        return states[line]
+
+    def info_at(self, line: int, character: int) -> SyntaxInfo:
+        """
+        Syntax at `character`, a str index into `line` (not the LSP UTF-16
+        offset; see CompletionContextBuilder).
+        """
+        start = self.state_at(line)
+        text = self._lines[line] if line < len(self._lines) else ""
+        state, in_line_comment = self._lexer(text, start, line, character)
+
+        function = None
+        class_name = None
+        frame = state.scope
+        while frame is not None:
+            if frame.kind is ScopeType.CLASS:
+                if class_name is None:
+                    class_name = frame.name
+            elif function is None:
+                function = frame.name
+            frame = frame.parent
+
+        in_comment = state.comment or in_line_comment
+        in_string = state.string is not None
+
+        return SyntaxInfo(
+            scope=state.scope.kind if state.scope else ScopeType.GLOBAL,
+            function=function,
+            class_name=class_name,
+            in_string=in_string,
+            in_comment=in_comment,
+            in_docstring=state.doc and (in_string or state.comment),
+            multiline=(in_string and start.string is not None)
+            or (state.comment and start.comment),
+            brackets=state.brackets,
+        )
@@ -0,0 +1,66 @@
+"""
+Run the completion hot-path benchmarks.
+
+    python -m benchmarks                         # run and print
+    python -m benchmarks -o results.json         # also save results
+    python -m benchmarks --compare               # fail on regressions
+    python -m benchmarks --save-baseline         # refresh the baseline
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks import runner
+from benchmarks.suite import cases
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("-k", "--filter", default="", help="only run matching cases")
+    parser.add_argument("--quick", action="store_true", help="skip the largest documents")
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    selected = [c for c in cases(quick=args.quick) if args.filter in c.key]
+
+    def report(result: runner.BenchmarkResult) -> None:
+        print(
+            f"{result.key:<50} {runner.format_time(result.median):>10}"
+            f"  (min {runner.format_time(result.minimum)}, n={result.iterations})"
+        )
+
+    results = runner.run(
+        selected, min_time=args.min_time, repeat=args.repeat, on_result=report
+    )
+
+    if args.output:
+        runner.save(results, args.output)
+    if args.save_baseline:
+        runner.save(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+
+    if not args.compare:
+        return 0
+
+    comparison = runner.compare(results, runner.load(args.baseline), args.threshold)
+    for delta in comparison.improvements:
+        print(f"faster     {delta.key}: x{delta.ratio:.2f}")
+    for delta in comparison.regressions:
+        print(f"REGRESSION {delta.key}: x{delta.ratio:.2f} (threshold x{args.threshold})")
+    for key in comparison.missing:
+        print(f"new        {key}: no baseline")
+
+    return 0 if comparison.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+In-process llama.cpp inference against the HTTP path, on the same model.
+
+Types a line into a synthetic document one keystroke at a time and asks
+each engine for a completion after every keystroke, one request at a
+time, so the numbers are per-request latency rather than throughput:
+
+    python -m benchmarks.inprocess --gguf ~/models/codellama-7b.Q4_K_M.gguf \\
+        --ollama-model codellama:7b-code-q4_K_M
+
+Point both at the same quantization for a fair comparison. The cache is
+off; the in-process engine still reuses llama.cpp's KV cache across
+keystrokes, which is part of what is being measured.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from lsprotocol import types
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from benchmarks.loadgen import percentile
+from benchmarks.synthetic import cursor_position, make_document
+
+DEFAULT_TYPED_TEXT = "result = self.client.get(key, timeout=attempt)"
+
+
+@dataclass
+class EngineReport:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    ttfts: list[float] = field(default_factory=list)
+    empty: int = 0
+    errors: int = 0
+
+    def summary(self) -> str:
+        def ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        return (
+            f"{self.name:<11} requests {len(self.latencies)}"
+            f"  latency p50 {ms(percentile(self.latencies, 50))}"
+            f" p95 {ms(percentile(self.latencies, 95))}"
+            f"  ttft p50 {ms(percentile(self.ttfts, 50))}"
+            f" p95 {ms(percentile(self.ttfts, 95))}"
+            f"  empty {self.empty}  errors {self.errors}"
+        )
+
+
+async def run_engine(
+    name: str,
+    engine: OllamaCompletionEngine,
+    text: str,
+    lines: int = 200,
+    warmup: int = 1,
+) -> EngineReport:
+    report = EngineReport(name)
+    document = make_document(lines)
+    position = cursor_position(lines)
+    doc_lines = document.text.split("\n")
+    line = doc_lines[position.line]
+    indent = line[: len(line) - len(line.lstrip())]
+    builder = CompletionContextBuilder()
+
+    for index in range(-warmup, len(text)):
+        typed = text[: max(0, index) + 1]
+        doc_lines[position.line] = indent + typed
+        document.text = "\n".join(doc_lines)
+        document.version += 1
+        cursor = types.Position(line=position.line, character=len(indent) + len(typed))
+        context = builder.build(document, cursor)
+
+        started = time.perf_counter()
+        try:
+            result = await engine.complete(context)
+        except Exception:
+            report.errors += 1
+            continue
+        if index < 0:
+            # Model load and first prompt evaluation are not measured.
+            continue
+        report.latencies.append(time.perf_counter() - started)
+        stages = engine.last_timings.stages if engine.last_timings else {}
+        if "ttft" in stages:
+            report.ttfts.append(stages["ttft"])
+        if not result:
+            report.empty += 1
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.inprocess")
+    parser.add_argument("--gguf", required=True, help="GGUF model file for llama.cpp")
+    parser.add_argument("--ollama-model", help="the same model as served by Ollama")
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--threads", type=int, help="llama.cpp CPU threads")
+    parser.add_argument("--context", type=int, default=4096)
+    parser.add_argument("--lines", type=int, default=200, help="synthetic document size")
+    parser.add_argument("--text", default=DEFAULT_TYPED_TEXT, help="text to type")
+    args = parser.parse_args(argv)
+
+    from ai_lsp.ai.llama_cpp_engine import LlamaCppCompletionEngine
+
+    engines: list[tuple[str, OllamaCompletionEngine]] = []
+    if args.ollama_model:
+        engines.append(
+            ("http", OllamaCompletionEngine(model=args.ollama_model, base_url=args.ollama_url))
+        )
+    in_process = LlamaCppCompletionEngine(
+        args.gguf, n_ctx=args.context, n_threads=args.threads
+    )
+    engines.append(("in-process", in_process))
+
+    try:
+        for name, engine in engines:
+            report = asyncio.run(run_engine(name, engine, args.text, args.lines))
+            print(report.summary(), flush=True)
+    finally:
+        in_process.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
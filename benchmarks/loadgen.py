@@ -0,0 +1,542 @@
+"""
+End-to-end load generator that replays typing sessions against real server
+processes, as an editor would.
+
+    python -m benchmarks.loadgen --instances 2 --sessions 4 --kps 12 --ttft 0.15
+
+Each server instance is started from `ai_lsp.main` over stdio and pointed at
+an in-process mock Ollama (see benchmarks/mock_ollama.py) unless
+--ollama-url is given. Sessions open a document, type into it with a
+didChange per keystroke, request completions and cancel the ones that are
+still pending, like editors do.
+
+A scripted session is a JSON file:
+
+    {"language": "python", "text": "...",
+     "steps": [{"type": "move", "line": 3, "character": 4},
+               {"type": "type", "text": "result = "},
+               {"type": "pause", "seconds": 0.5},
+               {"type": "complete"}]}
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from lsprotocol import types
+from pygls.exceptions import JsonRpcException
+from pygls.lsp.client import LanguageClient
+
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+from benchmarks.synthetic import make_lines
+
+DEFAULT_TYPED_TEXT = "        total = sum(item.price for item in self.items)"
+
+
+@dataclass
+class LoadConfig:
+    instances: int = 1
+    sessions: int = 1
+    keystrokes_per_second: float = 10.0
+    complete_every: int = 1
+    cancel_pending: bool = True
+    language: str = "python"
+    document_lines: int = 200
+    typed_text: str = DEFAULT_TYPED_TEXT
+    script: Optional[dict] = None
+    ollama_url: Optional[str] = None
+    mock: MockOllamaConfig = field(
+        default_factory=lambda: MockOllamaConfig(ttft=0.1, tokens_per_second=50)
+    )
+    sample_interval: float = 0.25
+    drain_timeout: float = 10.0
+
+
+@dataclass
+class RequestRecord:
+    session: int
+    sent: float
+    latency: Optional[float] = None
+    outcome: str = "pending"  # ok | empty | cancelled | error
+
+
+@dataclass
+class ProcessSample:
+    elapsed: float
+    pid: int
+    threads: int
+    sockets: int
+    fds: int
+
+
+@dataclass
+class LoadReport:
+    duration: float
+    keystrokes: int
+    requests: int
+    outcomes: dict[str, int]
+    latency_p50: Optional[float]
+    latency_p95: Optional[float]
+    latency_p99: Optional[float]
+    cancellation_rate: float
+    backend_calls: Optional[int]
+    backend_calls_per_keystroke: Optional[float]
+    samples: list[ProcessSample]
+    possible_leaks: list[str]
+    # Worst server-reported event loop lag, from the ai-lsp.metrics command.
+    loop_lag_p99: Optional[float] = None
+    loop_stalls: Optional[int] = None
+
+    def summary(self) -> str:
+        def ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 1000:.1f}ms"
+
+        lines = [
+            f"duration        {self.duration:.2f}s",
+            f"keystrokes      {self.keystrokes}",
+            f"requests        {self.requests} {self.outcomes}",
+            f"latency         p50 {ms(self.latency_p50)}  p95 {ms(self.latency_p95)}"
+            f"  p99 {ms(self.latency_p99)}",
+            f"cancellations   {self.cancellation_rate:.1%}",
+        ]
+        if self.backend_calls_per_keystroke is not None:
+            lines.append(
+                f"backend calls   {self.backend_calls}"
+                f" ({self.backend_calls_per_keystroke:.2f} per keystroke)"
+            )
+        if self.loop_lag_p99 is not None:
+            lines.append(
+                f"loop lag        p99 {ms(self.loop_lag_p99)}  stalls {self.loop_stalls or 0}"
+            )
+        if self.samples:
+            lines.append(
+                f"threads         max {max(s.threads for s in self.samples)}"
+                f"  sockets max {max(s.sockets for s in self.samples)}"
+            )
+        for leak in self.possible_leaks:
+            lines.append(f"possible leak   {leak}")
+        return "\n".join(lines)
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile, q in [0, 100].
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def sample_process(pid: int, elapsed: float) -> Optional[ProcessSample]:
+    """
+    Thread and socket counts of a process, read from /proc (Linux only).
+    """
+    try:
+        threads = len(os.listdir(f"/proc/{pid}/task"))
+        fd_dir = f"/proc/{pid}/fd"
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return None
+
+    sockets = 0
+    for fd in fds:
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"):
+                sockets += 1
+        except OSError:
+            continue
+
+    return ProcessSample(elapsed, pid, threads, sockets, len(fds))
+
+
+def detect_leaks(samples: list[ProcessSample], margin: int = 2) -> list[str]:
+    """
+    Flag processes whose thread or socket count ends well above where it
+    started.
+    """
+    leaks = []
+    by_pid: dict[int, list[ProcessSample]] = {}
+    for sample in samples:
+        by_pid.setdefault(sample.pid, []).append(sample)
+
+    for pid, series in by_pid.items():
+        if len(series) < 2:
+            continue
+        first, last = series[0], series[-1]
+        if last.threads > first.threads + margin:
+            leaks.append(f"pid {pid}: threads {first.threads} -> {last.threads}")
+        if last.sockets > first.sockets + margin:
+            leaks.append(f"pid {pid}: sockets {first.sockets} -> {last.sockets}")
+    return leaks
+
+
+class ServerInstance:
+    def __init__(self, env: dict[str, str]) -> None:
+        self.client = LanguageClient("ai-lsp-loadgen", "0.1.0")
+        self.env = env
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        process = self.client._server
+        return process.pid if process else None
+
+    async def start(self) -> None:
+        await self.client.start_io(sys.executable, "-m", "ai_lsp.main", env=self.env)
+        process = self.client._server
+        if process and process.stderr:
+            self._stderr_task = asyncio.create_task(_drain(process.stderr))
+
+        await self.client.initialize_async(
+            types.InitializeParams(
+                process_id=os.getpid(),
+                root_uri=None,
+                capabilities=types.ClientCapabilities(),
+            )
+        )
+        self.client.initialized(types.InitializedParams())
+
+    async def metrics(self) -> dict:
+        """
+        The server's metrics snapshot, or {} when it cannot be fetched.
+        """
+        try:
+            snapshot = await asyncio.wait_for(
+                self.client.workspace_execute_command_async(
+                    types.ExecuteCommandParams(command="ai-lsp.metrics")
+                ),
+                timeout=5,
+            )
+        except Exception:
+            return {}
+        return snapshot if isinstance(snapshot, dict) else {}
+
+    async def stop(self) -> None:
+        try:
+            await asyncio.wait_for(self.client.shutdown_async(None), timeout=5)
+            self.client.exit(None)
+        except Exception:
+            pass
+        await self.client.stop()
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
+
+async def _drain(stream: asyncio.StreamReader) -> None:
+    while await stream.read(65536):
+        pass
+
+
+class TypingSession:
+    def __init__(
+        self,
+        index: int,
+        server: ServerInstance,
+        config: LoadConfig,
+        records: list[RequestRecord],
+    ) -> None:
+        self.index = index
+        self.server = server
+        self.config = config
+        self.records = records
+        self.keystrokes = 0
+        self.version = 1
+        self.uri = f"file:///loadgen/session_{index}.py"
+        self.line = 0
+        self.character = 0
+        self._pending: list[tuple[str, asyncio.Future, RequestRecord]] = []
+        self._next_id = 0
+
+    async def run(self) -> None:
+        script = self.config.script
+        if script:
+            text = script.get("text", "")
+            language = script.get("language", self.config.language)
+        else:
+            lines = make_lines(self.config.document_lines, self.config.language)
+            self.line = len(lines) // 2
+            lines.insert(self.line, "")
+            text = "\n".join(lines)
+            language = self.config.language
+
+        self.server.client.text_document_did_open(
+            types.DidOpenTextDocumentParams(
+                text_document=types.TextDocumentItem(
+                    uri=self.uri, language_id=language, version=self.version, text=text
+                )
+            )
+        )
+
+        if script:
+            for step in script.get("steps", []):
+                await self._run_step(step)
+        else:
+            await self._type(self.config.typed_text)
+
+        await self._drain_pending()
+
+    async def _run_step(self, step: dict) -> None:
+        kind = step.get("type")
+        if kind == "move":
+            self.line = step["line"]
+            self.character = step["character"]
+        elif kind == "type":
+            await self._type(step["text"])
+        elif kind == "complete":
+            self._complete()
+        elif kind == "pause":
+            await asyncio.sleep(step["seconds"])
+        else:
+            raise ValueError(f"Unknown step type: {kind}")
+
+    async def _type(self, text: str) -> None:
+        interval = 1 / self.config.keystrokes_per_second
+        for ch in text:
+            self._insert(ch)
+            if self.keystrokes % self.config.complete_every == 0:
+                self._complete()
+            await asyncio.sleep(interval)
+
+    def _insert(self, ch: str) -> None:
+        self.version += 1
+        self.keystrokes += 1
+        position = types.Position(line=self.line, character=self.character)
+        self.server.client.text_document_did_change(
+            types.DidChangeTextDocumentParams(
+                text_document=types.VersionedTextDocumentIdentifier(
+                    uri=self.uri, version=self.version
+                ),
+                content_changes=[
+                    types.TextDocumentContentChangePartial(
+                        range=types.Range(start=position, end=position), text=ch
+                    )
+                ],
+            )
+        )
+        self.character += 1
+
+    def _complete(self) -> None:
+        client = self.server.client
+        if self.config.cancel_pending:
+            for msg_id, future, _ in self._pending:
+                if not future.done():
+                    client.cancel_request(types.CancelParams(id=msg_id))
+
+        self._next_id += 1
+        msg_id = f"s{self.index}-{self._next_id}"
+        record = RequestRecord(session=self.index, sent=time.perf_counter())
+        self.records.append(record)
+
+        future = client.protocol.send_request_async(
+            types.TEXT_DOCUMENT_COMPLETION,
+            types.CompletionParams(
+                text_document=types.TextDocumentIdentifier(uri=self.uri),
+                position=types.Position(line=self.line, character=self.character),
+            ),
+            msg_id=msg_id,
+        )
+        future.add_done_callback(lambda fut: _record_result(record, fut))
+        self._pending = [p for p in self._pending if not p[1].done()]
+        self._pending.append((msg_id, future, record))
+
+    async def _drain_pending(self) -> None:
+        futures = [future for _, future, _ in self._pending if not future.done()]
+        if futures:
+            await asyncio.wait(futures, timeout=self.config.drain_timeout)
+
+
+def _record_result(record: RequestRecord, future: asyncio.Future) -> None:
+    record.latency = time.perf_counter() - record.sent
+    if future.cancelled():
+        record.outcome = "cancelled"
+        return
+
+    error = future.exception()
+    if error is not None:
+        code = getattr(error, "code", None)
+        cancelled = code == types.LSPErrorCodes.RequestCancelled or (
+            isinstance(error, JsonRpcException) and "cancel" in str(error).lower()
+        )
+        record.outcome = "cancelled" if cancelled else "error"
+        return
+
+    result = future.result()
+    items = getattr(result, "items", result) or []
+    incomplete = getattr(result, "is_incomplete", False)
+    if items:
+        record.outcome = "ok"
+    elif incomplete:
+        # The server answers superseded requests with an empty incomplete
+        # list.
+        record.outcome = "cancelled"
+    else:
+        record.outcome = "empty"
+
+
+class _Sampler:
+    def __init__(self, pids: list[int], interval: float) -> None:
+        self.pids = pids
+        self.interval = interval
+        self.samples: list[ProcessSample] = []
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            elapsed = time.perf_counter() - self._started
+            for pid in self.pids:
+                sample = sample_process(pid, elapsed)
+                if sample:
+                    self.samples.append(sample)
+            if self._stop.wait(self.interval):
+                return
+
+
+async def run_load(config: LoadConfig) -> LoadReport:
+    mock: Optional[MockOllamaServer] = None
+    ollama_url = config.ollama_url
+    if ollama_url is None:
+        mock = MockOllamaServer(config.mock).start()
+        ollama_url = mock.base_url
+
+    env = dict(os.environ, AI_LSP_OLLAMA_URL=ollama_url)
+    # Replayed sessions would otherwise be answered from the completion cache.
+    env.setdefault("AI_LSP_CACHE", "0")
+    servers = [ServerInstance(env) for _ in range(config.instances)]
+    records: list[RequestRecord] = []
+    sampler: Optional[_Sampler] = None
+    snapshots: list[dict] = []
+
+    try:
+        await asyncio.gather(*(server.start() for server in servers))
+        sampler = _Sampler(
+            [s.pid for s in servers if s.pid is not None], config.sample_interval
+        )
+        sampler.start()
+
+        sessions = [
+            TypingSession(i, servers[i % len(servers)], config, records)
+            for i in range(config.sessions)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(session.run() for session in sessions))
+        duration = time.perf_counter() - started
+        snapshots = await asyncio.gather(*(server.metrics() for server in servers))
+    finally:
+        if sampler:
+            sampler.stop()
+        await asyncio.gather(*(server.stop() for server in servers), return_exceptions=True)
+        if mock:
+            mock.stop()
+
+    keystrokes = sum(session.keystrokes for session in sessions)
+    outcomes: dict[str, int] = {}
+    for record in records:
+        outcomes[record.outcome] = outcomes.get(record.outcome, 0) + 1
+
+    latencies = [r.latency for r in records if r.outcome == "ok" and r.latency is not None]
+    backend_calls = mock.stats.generate if mock else None
+    samples = sampler.samples if sampler else []
+    lags = [
+        entry["p99"]
+        for snapshot in snapshots
+        for entry in snapshot.get("ai_lsp_event_loop_lag_seconds", [])
+        if entry.get("p99") is not None
+    ]
+    stalls = [
+        entry["value"]
+        for snapshot in snapshots
+        for entry in snapshot.get("ai_lsp_event_loop_stalls_total", [])
+    ]
+
+    return LoadReport(
+        duration=duration,
+        keystrokes=keystrokes,
+        requests=len(records),
+        outcomes=outcomes,
+        latency_p50=percentile(latencies, 50),
+        latency_p95=percentile(latencies, 95),
+        latency_p99=percentile(latencies, 99),
+        cancellation_rate=outcomes.get("cancelled", 0) / len(records) if records else 0.0,
+        backend_calls=backend_calls,
+        backend_calls_per_keystroke=(
+            backend_calls / keystrokes if backend_calls is not None and keystrokes else None
+        ),
+        samples=samples,
+        possible_leaks=detect_leaks(samples),
+        loop_lag_p99=max(lags) if lags else None,
+        loop_stalls=sum(stalls) if stalls else None,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadgen")
+    parser.add_argument("--instances", type=int, default=1)
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--kps", type=float, default=10.0, help="keystrokes per second")
+    parser.add_argument("--complete-every", type=int, default=1)
+    parser.add_argument("--no-cancel", action="store_true")
+    parser.add_argument("--lines", type=int, default=200, help="synthetic document size")
+    parser.add_argument("--text", default=DEFAULT_TYPED_TEXT, help="text to type")
+    parser.add_argument("--script", help="JSON typing script")
+    parser.add_argument("--ollama-url", help="use a real backend instead of the mock")
+    parser.add_argument("--ttft", type=float, default=0.1)
+    parser.add_argument("--tps", type=float, default=50.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("-o", "--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    config = LoadConfig(
+        instances=args.instances,
+        sessions=args.sessions,
+        keystrokes_per_second=args.kps,
+        complete_every=args.complete_every,
+        cancel_pending=not args.no_cancel,
+        document_lines=args.lines,
+        typed_text=args.text,
+        script=script,
+        ollama_url=args.ollama_url,
+        mock=MockOllamaConfig(
+            ttft=args.ttft,
+            tokens_per_second=args.tps,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+        ),
+    )
+
+    report = asyncio.run(run_load(config))
+    print(report.summary())
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(asdict(report), f, indent=2)
+            f.write("\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
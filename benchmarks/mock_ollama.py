@@ -0,0 +1,481 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Streams NDJSON from /api/generate with configurable time-to-first-token,
+decode rate, jitter, failure injection and scripted outputs, so engine and
+server behaviour can be measured without a GPU or a real model. The same
+scripted outputs are served as server-sent events from the OpenAI-style
+/v1/completions endpoint of llama.cpp's server and vLLM.
+
+In-process:
+
+    with MockOllamaServer(MockOllamaConfig(ttft=0.2, tokens_per_second=40)) as mock:
+        engine = OllamaCompletionEngine(base_url=mock.base_url)
+        # or, through /v1/completions:
+        engine = OpenAICompletionEngine(base_url=f"{mock.base_url}/v1")
+
+As a subprocess:
+
+    python -m benchmarks.mock_ollama --port 11435 --ttft 0.2 --tps 40
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+_TOKEN_RE = re.compile(r"\s+|\w+|[^\w\s]")
+
+
+@dataclass
+class MockOllamaConfig:
+    # Seconds before the first token is sent.
+    ttft: float = 0.0
+    # Decode rate; 0 streams as fast as possible.
+    tokens_per_second: float = 0.0
+    # Uniform +/- jitter applied to every delay, as a fraction of it.
+    jitter: float = 0.0
+    # Extra first-token delay while the model is not loaded.
+    load_time: float = 0.0
+    # Probability that a request fails, and how: "status" answers with
+    # `failure_status`, "disconnect" drops the connection mid-stream.
+    failure_rate: float = 0.0
+    failure_mode: str = "status"
+    failure_status: int = 500
+    # Outputs replayed in order (cycling). Falls back to `default_output`.
+    outputs: list[str] = field(default_factory=list)
+    default_output: str = "completion()"
+    models: list[str] = field(default_factory=lambda: ["codellama:7b"])
+    embedding_size: int = 16
+    seed: int = 0
+
+
+@dataclass
+class MockOllamaStats:
+    requests: int = 0
+    generate: int = 0
+    embed: int = 0
+    tags: int = 0
+    failures: int = 0
+    disconnects: int = 0
+    completed: int = 0
+    active: int = 0
+    max_active: int = 0
+    tokens: int = 0
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def apply_stop(text: str, stop: list[str]) -> str:
+    """
+    Cut `text` at the earliest stop sequence, like Ollama does.
+    """
+    cut = len(text)
+    for sequence in stop:
+        if not sequence:
+            continue
+        index = text.find(sequence)
+        if 0 <= index < cut:
+            cut = index
+    return text[:cut]
+
+
+class MockOllamaServer:
+    def __init__(
+        self,
+        config: Optional[MockOllamaConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.config = config or MockOllamaConfig()
+        self.stats = MockOllamaStats()
+        self.prompts: list[str] = []
+        self.loaded: set[str] = set()
+
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._output_index = 0
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def __enter__(self) -> "MockOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Scripted behaviour
+    # ------------------------------------------------------------------
+    def next_output(self) -> str:
+        with self._lock:
+            if not self.config.outputs:
+                return self.config.default_output
+            output = self.config.outputs[self._output_index % len(self.config.outputs)]
+            self._output_index += 1
+            return output
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.config.failure_rate
+
+    def delay(self, seconds: float) -> float:
+        if seconds <= 0:
+            return 0.0
+        jitter = self.config.jitter
+        if jitter:
+            with self._lock:
+                seconds *= 1 + self._random.uniform(-jitter, jitter)
+        time.sleep(seconds)
+        return seconds
+
+    def count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+            self.stats.max_active = max(self.stats.max_active, self.stats.active)
+
+
+def _make_handler(mock: MockOllamaServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            return json.loads(body or b"{}")
+
+        def _send_json(self, payload: dict, status: int = 200) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            mock.count(requests=1)
+            if self.path == "/api/tags":
+                mock.count(tags=1)
+                self._send_json(
+                    {"models": [{"name": m, "model": m} for m in mock.config.models]}
+                )
+            elif self.path == "/v1/models":
+                self._send_json(
+                    {
+                        "object": "list",
+                        "data": [{"id": m, "object": "model"} for m in mock.config.models],
+                    }
+                )
+            elif self.path == "/api/ps":
+                self._send_json(
+                    {"models": [{"name": m, "model": m} for m in sorted(mock.loaded)]}
+                )
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self) -> None:
+            mock.count(requests=1)
+            payload = self._read_json()
+            if self.path == "/api/generate":
+                self._generate(payload)
+            elif self.path == "/v1/completions":
+                self._completions(payload)
+            elif self.path in ("/api/embed", "/api/embeddings"):
+                self._embed(payload)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def _embed(self, payload: dict) -> None:
+            mock.count(embed=1)
+            inputs = payload.get("input", payload.get("prompt", ""))
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            vectors = [_embedding(text, mock.config.embedding_size) for text in inputs]
+            if self.path == "/api/embeddings":
+                self._send_json({"embedding": vectors[0]})
+            else:
+                self._send_json({"model": payload.get("model"), "embeddings": vectors})
+
+        def _generate(self, payload: dict) -> None:
+            mock.count(generate=1)
+            model = payload.get("model", "")
+            prompt = payload.get("prompt", "")
+            options = payload.get("options") or {}
+            mock.prompts.append(prompt)
+
+            if mock.should_fail() and mock.config.failure_mode == "status":
+                mock.count(failures=1)
+                self._send_json({"error": "injected failure"}, mock.config.failure_status)
+                return
+
+            started = time.perf_counter_ns()
+            load = 0.0
+            if model not in mock.loaded:
+                load = mock.delay(mock.config.load_time)
+            if payload.get("keep_alive") in (0, "0", "0s"):
+                mock.loaded.discard(model)
+            else:
+                mock.loaded.add(model)
+
+            if not prompt:
+                # Load-only request, as used to preload a model.
+                self._send_json(
+                    {"model": model, "response": "", "done": True, "done_reason": "load"}
+                )
+                return
+
+            tokens, done_reason = self._tokens(
+                options.get("stop") or [], options.get("num_predict")
+            )
+
+            if not payload.get("stream", True):
+                mock.delay(mock.config.ttft)
+                self._send_json(
+                    {
+                        "model": model,
+                        "response": "".join(tokens),
+                        "done": True,
+                        "done_reason": done_reason,
+                        "eval_count": len(tokens),
+                    }
+                )
+                mock.count(completed=1, tokens=len(tokens))
+                return
+
+            def done(prompt_done: int) -> None:
+                finished = time.perf_counter_ns()
+                self._chunk(
+                    {
+                        "model": model,
+                        "response": "",
+                        "done": True,
+                        "done_reason": done_reason,
+                        "total_duration": finished - started,
+                        "load_duration": int(load * 1e9),
+                        "prompt_eval_count": len(tokenize(prompt)),
+                        "prompt_eval_duration": prompt_done - started,
+                        "eval_count": len(tokens),
+                        "eval_duration": finished - prompt_done,
+                    }
+                )
+
+            self._stream(
+                "application/x-ndjson",
+                tokens,
+                lambda token: self._chunk(
+                    {"model": model, "response": token, "done": False}
+                ),
+                done,
+            )
+
+        def _completions(self, payload: dict) -> None:
+            """
+            OpenAI-style /v1/completions, as served by llama.cpp and vLLM.
+            """
+            mock.count(generate=1)
+            model = payload.get("model", "")
+            prompt = payload.get("prompt", "")
+            if isinstance(prompt, list):
+                prompt = prompt[0] if prompt else ""
+            mock.prompts.append(prompt)
+
+            if mock.should_fail() and mock.config.failure_mode == "status":
+                mock.count(failures=1)
+                self._send_json(
+                    {"error": {"message": "injected failure", "type": "server_error"}},
+                    mock.config.failure_status,
+                )
+                return
+
+            stop = payload.get("stop") or []
+            if isinstance(stop, str):
+                stop = [stop]
+            tokens, finish_reason = self._tokens(stop, payload.get("max_tokens"))
+            usage = {
+                "prompt_tokens": len(tokenize(prompt)),
+                "completion_tokens": len(tokens),
+                "total_tokens": len(tokenize(prompt)) + len(tokens),
+            }
+
+            def event(text: str, finish: Optional[str]) -> dict:
+                return {
+                    "id": f"cmpl-{mock.stats.generate}",
+                    "object": "text_completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "text": text, "finish_reason": finish, "logprobs": None}
+                    ],
+                }
+
+            if not payload.get("stream"):
+                mock.delay(mock.config.ttft)
+                self._send_json(
+                    dict(event("".join(tokens), finish_reason), usage=usage)
+                )
+                mock.count(completed=1, tokens=len(tokens))
+                return
+
+            def done(prompt_done: int) -> None:
+                self._event(event("", finish_reason))
+                if (payload.get("stream_options") or {}).get("include_usage"):
+                    self._event(dict(event("", None), choices=[], usage=usage))
+                self._write(b"data: [DONE]\n\n")
+
+            self._stream(
+                "text/event-stream",
+                tokens,
+                lambda token: self._event(event(token, None)),
+                done,
+            )
+
+        def _tokens(
+            self, stop: list[str], limit: Optional[int]
+        ) -> tuple[list[str], str]:
+            """
+            The next scripted output as tokens, and why generation ended.
+            """
+            tokens = tokenize(apply_stop(mock.next_output(), stop))
+            if limit is not None and 0 <= limit < len(tokens):
+                return tokens[:limit], "length"
+            return tokens, "stop"
+
+        def _stream(
+            self,
+            content_type: str,
+            tokens: list[str],
+            send_token: Callable[[str], None],
+            send_done: Callable[[int], None],
+        ) -> None:
+            """
+            Stream `tokens` at the configured pace, injecting mid-stream
+            disconnects.
+            """
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            fail_after = None
+            if mock.config.failure_mode == "disconnect" and mock.should_fail():
+                fail_after = len(tokens) // 2
+
+            mock.count(active=1)
+            sent = 0
+            try:
+                mock.delay(mock.config.ttft)
+                prompt_done = time.perf_counter_ns()
+                interval = (
+                    1 / mock.config.tokens_per_second
+                    if mock.config.tokens_per_second
+                    else 0
+                )
+                for index, token in enumerate(tokens):
+                    if fail_after is not None and index >= fail_after:
+                        mock.count(failures=1)
+                        self.close_connection = True
+                        return
+                    if index:
+                        mock.delay(interval)
+                    send_token(token)
+                    sent += 1
+
+                send_done(prompt_done)
+                self.wfile.write(b"0\r\n\r\n")
+                mock.count(completed=1)
+            except (BrokenPipeError, ConnectionResetError):
+                mock.count(disconnects=1)
+                self.close_connection = True
+            finally:
+                mock.count(active=-1, tokens=sent)
+
+        def _chunk(self, message: dict) -> None:
+            self._write(json.dumps(message).encode() + b"\n")
+
+        def _event(self, message: dict) -> None:
+            self._write(b"data: " + json.dumps(message).encode() + b"\n\n")
+
+        def _write(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def _embedding(text: str, size: int) -> list[float]:
+    digest = hashlib.sha256(text.encode()).digest()
+    return [digest[i % len(digest)] / 255.0 for i in range(size)]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_ollama")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.0)
+    parser.add_argument("--tps", type=float, default=0.0, help="tokens per second")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--load-time", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-mode", choices=["status", "disconnect"], default="status")
+    parser.add_argument("--output", action="append", default=[], help="scripted output (repeatable)")
+    parser.add_argument("--model", action="append", default=[], help="advertised model (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = MockOllamaConfig(
+        ttft=args.ttft,
+        tokens_per_second=args.tps,
+        jitter=args.jitter,
+        load_time=args.load_time,
+        failure_rate=args.failure_rate,
+        failure_mode=args.failure_mode,
+        outputs=args.output,
+        seed=args.seed,
+    )
+    if args.model:
+        config.models = args.model
+
+    server = MockOllamaServer(config, host=args.host, port=args.port)
+    print(f"Mock Ollama listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
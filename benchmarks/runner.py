@@ -0,0 +1,164 @@
+import json
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Optional
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    params: dict
+    # Builds the measured callable; setup cost is not timed.
+    setup: Callable[[], Callable[[], object]]
+
+    @property
+    def key(self) -> str:
+        if not self.params:
+            return self.name
+        args = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.name}[{args}]"
+
+
+@dataclass
+class BenchmarkResult:
+    key: str
+    name: str
+    params: dict
+    iterations: int
+    median: float  # seconds per call
+    minimum: float  # seconds per call
+
+
+@dataclass
+class Regression:
+    key: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+@dataclass
+class Comparison:
+    threshold: float
+    regressions: list[Regression] = field(default_factory=list)
+    improvements: list[Regression] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.regressions
+
+
+def measure(
+    fn: Callable[[], object],
+    min_time: float = 0.05,
+    repeat: int = 5,
+) -> tuple[int, list[float]]:
+    """
+    Calibrate an iteration count that runs for at least `min_time`, then
+    time `repeat` rounds of it. Returns the count and per-call times.
+    """
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed) + 1)
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - started) / iterations)
+
+    return iterations, samples
+
+
+def run(
+    cases: Iterable[BenchmarkCase],
+    min_time: float = 0.05,
+    repeat: int = 5,
+    on_result: Optional[Callable[[BenchmarkResult], None]] = None,
+) -> list[BenchmarkResult]:
+    results = []
+    for case in cases:
+        fn = case.setup()
+        iterations, samples = measure(fn, min_time=min_time, repeat=repeat)
+        result = BenchmarkResult(
+            key=case.key,
+            name=case.name,
+            params=case.params,
+            iterations=iterations,
+            median=statistics.median(samples),
+            minimum=min(samples),
+        )
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+
+def to_json(results: list[BenchmarkResult]) -> dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {r.key: asdict(r) for r in results},
+    }
+
+
+def save(results: list[BenchmarkResult], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(to_json(results), f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: dict,
+    threshold: float = 1.25,
+) -> Comparison:
+    """
+    Compare medians against a stored baseline. A case regresses when it is
+    slower than `threshold` times its baseline median.
+    """
+    comparison = Comparison(threshold=threshold)
+    stored = baseline.get("results", {})
+
+    for result in results:
+        entry = stored.get(result.key)
+        if entry is None:
+            comparison.missing.append(result.key)
+            continue
+
+        delta = Regression(result.key, entry["median"], result.median)
+        if delta.ratio > threshold:
+            comparison.regressions.append(delta)
+        elif delta.ratio < 1 / threshold:
+            comparison.improvements.append(delta)
+
+    return comparison
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
@@ -0,0 +1,19 @@
+from typing import Iterator
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+
+
+class StubOllamaEngine(OllamaCompletionEngine):
+    """
+    OllamaCompletionEngine whose backend replays a fixed token list without
+    any network I/O.
+    """
+
+    def __init__(self, tokens: list[str], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.tokens = tokens
+
+    def _stream(self, prompt: str, options: dict) -> Iterator[dict]:
+        for token in self.tokens:
+            yield {"response": token, "done": False}
+        yield {"response": "", "done": True}
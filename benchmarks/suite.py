@@ -0,0 +1,240 @@
+import asyncio
+import copy
+import os
+import tempfile
+from typing import Iterator
+
+from ai_lsp.agents.range_alignment import RangeAlignmentAgent
+from ai_lsp.ai.cache import CompletionCache
+from ai_lsp.ai.constraints import merge_suffix_constraints
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.ai.sanitize import sanitize_completion
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from ai_lsp.syntax.tree import SyntaxTree
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+from benchmarks.runner import BenchmarkCase
+from benchmarks.stub_backend import StubOllamaEngine
+from benchmarks.synthetic import (
+    COMPLETION_SIZES,
+    DOCUMENT_SIZES,
+    cursor_position,
+    make_completion,
+    make_document,
+    make_lines,
+    make_tokens,
+)
+
+
+def _context_build(lines: int):
+    document = make_document(lines)
+    document.syntax = SyntaxTree.for_language(document.language_id, document.text)
+    position = cursor_position(lines)
+    builder = CompletionContextBuilder()
+    builder.build(document, position)  # warm the syntax states
+
+    return lambda: builder.build(document, position)
+
+
+def _syntax_after_edit(lines: int):
+    document = make_document(lines)
+    tree = SyntaxTree.for_language(document.language_id, document.text)
+    assert tree is not None
+    position = cursor_position(lines)
+    tree.info_at(position.line, position.character)
+
+    def run():
+        tree.update(document.text, position.line)
+        return tree.info_at(position.line, position.character)
+
+    return run
+
+
+def _agent_pipeline(lines: int):
+    document = make_document(lines)
+    document.syntax = SyntaxTree.for_language(document.language_id, document.text)
+    context = CompletionContextBuilder().build(document, cursor_position(lines))
+    pipeline = OllamaCompletionEngine().pipeline
+
+    return lambda: pipeline.prepare(copy.copy(context))
+
+
+def _range_alignment(completion_lines: int):
+    document = make_document(1_000)
+    context = CompletionContextBuilder().build(document, cursor_position(1_000))
+    completion = make_completion(completion_lines)
+    agent = RangeAlignmentAgent()
+
+    return lambda: agent.after_generation(context, completion)
+
+
+def _range_alignment_echo(context_lines: int):
+    # A large completion that echoes the whole context window before and
+    # after the new code, plus part of the suffix: every trimming step has
+    # real work to do.
+    lines = make_lines(context_lines * 2)
+    previous_lines, next_lines = lines[:context_lines], lines[context_lines:]
+    suffix = "; ".join(line.strip() for line in next_lines[:20])
+    context = CompletionContext(
+        language="python",
+        file_path="bench.py",
+        prefix="",
+        suffix=suffix,
+        completion_prefix="",
+        current_line=suffix,
+        previous_lines=previous_lines,
+        next_lines=next_lines,
+        indentation="",
+        line=context_lines,
+        character=0,
+    )
+    completion = "\n".join(
+        previous_lines
+        + [make_completion(500)]
+        + next_lines
+        + [suffix[: len(suffix) // 2]]
+    )
+    agent = RangeAlignmentAgent()
+
+    return lambda: agent.after_generation(context, completion)
+
+
+def _sanitize(completion_lines: int):
+    completion = "```python\n" + make_completion(completion_lines) + "\n```"
+    return lambda: sanitize_completion(completion)
+
+
+def _merge_constraints(count: int):
+    constraints = [
+        SuffixConstraints(
+            must_not_repeat=[")", ";"],
+            must_close=[")"],
+            stop_sequences=[")", ";", "\n"],
+            forbidden_newlines=bool(i % 2),
+            confidence=0.5 + (i % 5) / 10,
+        )
+        for i in range(count)
+    ]
+    return lambda: merge_suffix_constraints(constraints)
+
+
+def _metrics_observe():
+    histogram = MetricsRegistry().histogram("bench_seconds")
+    return lambda: histogram.observe(0.0123)
+
+
+def _cache_lookup(layer: str):
+    directory = tempfile.TemporaryDirectory()
+    cache = CompletionCache(
+        os.path.join(directory.name, "cache.sqlite3"),
+        memory_entries=512 if layer == "memory" else 1,
+        metrics=CompletionMetrics(MetricsRegistry()),
+    )
+    keys = [CompletionCache.key("m", {}, str(i)) for i in range(1_000)]
+    for key in keys:
+        cache.put(key, make_completion(1))
+    # Alternate keys so disk lookups never hit the one-entry memory layer.
+    probes = keys[-2:]
+    state = {"i": 0, "directory": directory}
+
+    def run():
+        state["i"] ^= 1
+        return cache.get(probes[state["i"]])
+
+    return run
+
+
+def _complete(lines: int, completion_lines: int):
+    document = make_document(lines)
+    document.syntax = SyntaxTree.for_language(document.language_id, document.text)
+    builder = CompletionContextBuilder()
+    position = cursor_position(lines)
+    engine = StubOllamaEngine(make_tokens(make_completion(completion_lines)))
+    loop = asyncio.new_event_loop()
+
+    def run():
+        context = builder.build(document, position)
+        return loop.run_until_complete(engine.complete(context))
+
+    return run
+
+
+def _complete_http(completion_lines: int):
+    document = make_document(1_000)
+    builder = CompletionContextBuilder()
+    position = cursor_position(1_000)
+    mock = MockOllamaServer(
+        MockOllamaConfig(default_output=make_completion(completion_lines))
+    ).start()
+    engine = OllamaCompletionEngine(base_url=mock.base_url)
+    loop = asyncio.new_event_loop()
+
+    def run():
+        context = builder.build(document, position)
+        return loop.run_until_complete(engine.complete(context))
+
+    return run
+
+
+def cases(quick: bool = False) -> Iterator[BenchmarkCase]:
+    document_sizes = DOCUMENT_SIZES[:-1] if quick else DOCUMENT_SIZES
+
+    for lines in document_sizes:
+        yield BenchmarkCase(
+            "context_build", {"lines": lines}, lambda lines=lines: _context_build(lines)
+        )
+        yield BenchmarkCase(
+            "syntax_after_edit",
+            {"lines": lines},
+            lambda lines=lines: _syntax_after_edit(lines),
+        )
+
+    yield BenchmarkCase("agent_pipeline", {"lines": 1_000}, lambda: _agent_pipeline(1_000))
+
+    for size in COMPLETION_SIZES:
+        yield BenchmarkCase(
+            "range_alignment",
+            {"completion_lines": size},
+            lambda size=size: _range_alignment(size),
+        )
+        yield BenchmarkCase(
+            "sanitize", {"completion_lines": size}, lambda size=size: _sanitize(size)
+        )
+
+    for lines in (100, 1_000):
+        yield BenchmarkCase(
+            "range_alignment_echo",
+            {"context_lines": lines},
+            lambda lines=lines: _range_alignment_echo(lines),
+        )
+
+    for count in (1, 10, 100):
+        yield BenchmarkCase(
+            "merge_constraints",
+            {"count": count},
+            lambda count=count: _merge_constraints(count),
+        )
+
+    yield BenchmarkCase("metrics_observe", {}, _metrics_observe)
+
+    for layer in ("memory", "disk"):
+        yield BenchmarkCase(
+            "cache_lookup", {"layer": layer}, lambda layer=layer: _cache_lookup(layer)
+        )
+
+    for lines in document_sizes:
+        for size in (1, 100):
+            yield BenchmarkCase(
+                "complete",
+                {"lines": lines, "completion_lines": size},
+                lambda lines=lines, size=size: _complete(lines, size),
+            )
+
+    for size in (1, 100):
+        yield BenchmarkCase(
+            "complete_http",
+            {"completion_lines": size},
+            lambda size=size: _complete_http(size),
+        )
@@ -0,0 +1,98 @@
+"""
+Synthetic documents and completions for benchmarks.
+
+Everything is generated from fixed templates, so the same parameters always
+produce the same text.
+"""
+
+from lsprotocol import types
+
+from ai_lsp.lsp.documents import Document
+
+_PYTHON_CLASS = [
+    "class Service{n}(BaseService):",
+    '    """Service number {n}."""',
+    "",
+    "    def __init__(self, client, retries=3):",
+    "        self.client = client",
+    "        self.retries = retries",
+    "",
+    "    def fetch(self, key: str) -> dict:",
+    "        for attempt in range(self.retries):",
+    "            result = self.client.get(key, timeout=attempt + 1)",
+    "            if result is not None:",
+    "                return {{\"key\": key, \"value\": result}}  # hit",
+    "        return {{}}",
+    "",
+]
+
+_PHP_CLASS = [
+    "class Service{n} extends BaseService {{",
+    "    /**",
+    "     * Service number {n}.",
+    "     */",
+    "    public function fetch($key) {{",
+    "        for ($i = 0; $i < $this->retries; $i++) {{",
+    "            $result = $this->client->get($key, ['timeout' => $i]);",
+    "            if ($result !== NULL) {{",
+    "                return ['key' => $key, 'value' => $result]; // hit",
+    "            }}",
+    "        }}",
+    "        return [];",
+    "    }}",
+    "}}",
+]
+
+TEMPLATES = {
+    "python": _PYTHON_CLASS,
+    "php": _PHP_CLASS,
+}
+
+DOCUMENT_SIZES = (100, 1_000, 10_000, 200_000)
+COMPLETION_SIZES = (1, 10, 100, 500)
+
+
+def make_lines(line_count: int, language: str = "python") -> list[str]:
+    template = TEMPLATES[language]
+    lines: list[str] = []
+    n = 0
+    while len(lines) < line_count:
+        lines.extend(t.format(n=n) for t in template)
+        n += 1
+    return lines[:line_count]
+
+
+def make_document(line_count: int, language: str = "python") -> Document:
+    text = "\n".join(make_lines(line_count, language))
+    uri = f"file:///bench/doc_{line_count}.{'py' if language == 'python' else 'php'}"
+    return Document(uri=uri, language_id=language, version=1, text=text)
+
+
+def cursor_position(line_count: int, language: str = "python") -> types.Position:
+    """
+    Cursor in the middle of the document, in the middle of a code line.
+    """
+    lines = make_lines(line_count, language)
+    line = line_count // 2
+    while not lines[line].strip():
+        line += 1
+    return types.Position(line=line, character=len(lines[line]) // 2)
+
+
+def make_completion(line_count: int) -> str:
+    """
+    A completion of `line_count` lines. A single line is a one-token
+    completion.
+    """
+    if line_count <= 1:
+        return "result"
+    return "\n".join(
+        f"        value_{i} = self.client.get(key_{i}, timeout={i % 7})"
+        for i in range(line_count)
+    )
+
+
+def make_tokens(completion: str, token_size: int = 4) -> list[str]:
+    return [
+        completion[i : i + token_size] for i in range(0, len(completion), token_size)
+    ]
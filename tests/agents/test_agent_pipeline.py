@@ -0,0 +1,128 @@
+from typing import Optional
+
+from ai_lsp.agents.base import AgentDecision, CompletionAgent
+from ai_lsp.agents.constraints import SuffixConstraintAgent
+from ai_lsp.agents.context import ContextPruningAgent
+from ai_lsp.agents.guard import OutputGuardAgent
+from ai_lsp.agents.intent import CursorWindowIntentAgent
+from ai_lsp.agents.pipeline import AgentPipeline, PipelineTimings
+from ai_lsp.agents.range_alignment import RangeAlignmentAgent
+from ai_lsp.agents.semantics import PrefixSemanticAgent
+from ai_lsp.ai.acceptance import AcceptancePredictor
+from ai_lsp.ai.orchestrator.default_orchestrator import DefaultCompletionOrchestrator
+from ai_lsp.domain.completion import CompletionContext
+
+
+def make_context(*, prefix: str = "foo(", suffix: str = ")") -> CompletionContext:
+    return CompletionContext(
+        language="php",
+        file_path="test.php",
+        prefix=prefix,
+        suffix=suffix,
+        completion_prefix="",
+        current_line=prefix + suffix,
+        previous_lines=[],
+        next_lines=[],
+        indentation="",
+        line=0,
+        character=len(prefix),
+    )
+
+
+class CountingAgent(CompletionAgent):
+    def __init__(self, allowed: bool = True):
+        self.allowed = allowed
+        self.calls = 0
+
+    def before_generation(self, context: CompletionContext) -> AgentDecision:
+        self.calls += 1
+        return AgentDecision(allowed=self.allowed, reason="counted")
+
+
+class CountingIntentAgent(CursorWindowIntentAgent):
+    calls = 0
+
+    def detect_intent(self, context):
+        self.calls += 1
+        return super().detect_intent(context)
+
+
+def test_only_overridden_hooks_are_dispatched():
+    guard = OutputGuardAgent()
+    pruning = ContextPruningAgent()
+    alignment = RangeAlignmentAgent()
+
+    pipeline = AgentPipeline([pruning, alignment, guard])
+
+    assert pipeline.before_hooks == [pruning.before_generation]
+    assert pipeline.token_hooks == []
+    assert pipeline.after_hooks == [alignment.after_generation]
+    assert pipeline.stop_sequences == ("```",)
+
+
+def test_each_hook_and_analysis_runs_once_per_request():
+    first, second = CountingAgent(), CountingAgent()
+    intent_agent = CountingIntentAgent()
+
+    pipeline = AgentPipeline(
+        [first, SuffixConstraintAgent(), second],
+        intent_agent=intent_agent,
+        semantic_agent=PrefixSemanticAgent(),
+    )
+    context = make_context()
+    timings = PipelineTimings()
+
+    preparation = pipeline.prepare(context, timings)
+
+    assert preparation.allowed
+    assert ")" in preparation.constraints.stop_sequences
+    assert first.calls == 1 and second.calls == 1
+    assert intent_agent.calls == 1
+    assert context.intent is not None and context.semantics is not None
+    assert set(timings.stages) == {
+        "analyze",
+        "intent",
+        "semantics",
+        "before_generation",
+    }
+
+
+def test_blocking_agent_short_circuits():
+    blocker, after = CountingAgent(allowed=False), CountingAgent()
+
+    preparation = AgentPipeline([blocker, after]).prepare(make_context())
+
+    assert not preparation.allowed
+    assert preparation.reason == "counted"
+    assert after.calls == 0
+
+
+class StopAgent(CompletionAgent):
+    def on_token(self, token: str) -> Optional[AgentDecision]:
+        if token == "stop":
+            return AgentDecision(stop_generation=True)
+        return None
+
+
+def test_on_token_stops_generation():
+    pipeline = AgentPipeline([StopAgent()])
+
+    assert pipeline.on_token("foo") is False
+    assert pipeline.on_token("stop") is True
+
+
+def test_orchestrator_can_skip_generation():
+    predictor = AcceptancePredictor(bias=-10.0)
+    agent = CountingAgent()
+    pipeline = AgentPipeline(
+        [agent],
+        intent_agent=CursorWindowIntentAgent(),
+        semantic_agent=PrefixSemanticAgent(),
+        orchestrator=DefaultCompletionOrchestrator(predictor),
+    )
+
+    preparation = pipeline.prepare(make_context())
+
+    assert not preparation.allowed
+    assert preparation.reason == "Predicted acceptance too low"
+    assert agent.calls == 0
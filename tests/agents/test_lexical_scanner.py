@@ -0,0 +1,87 @@
+import random
+import re
+
+from ai_lsp.agents.lexical import lexical_features, scan
+from ai_lsp.domain.completion import CompletionContext
+
+_VAR_PATTERNS = {
+    "php": re.compile(r"\$[a-zA-Z_][a-zA-Z0-9_]*"),
+    "python": re.compile(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b"),
+}
+
+ALPHABET = ["a", "b_", "1", "é", "$", "(", ")", "[", "]", "{", "}", ";", ",", '"', "'",
+            "\\", ".", "->", "::", "/", "*", " ", "\n"]
+
+
+def make_context(*, prefix="", suffix="", language="python"):
+    return CompletionContext(
+        language=language,
+        file_path="test.py",
+        prefix=prefix,
+        suffix=suffix,
+        completion_prefix="",
+        current_line=prefix + suffix,
+        previous_lines=[],
+        next_lines=[],
+        indentation="",
+        line=0,
+        character=len(prefix),
+    )
+
+
+def _leading(suffix: str) -> list[str]:
+    tokens = []
+    for ch in suffix:
+        if ch not in {")", "]", "}", ";", ","}:
+            break
+        tokens.append(ch)
+    return tokens
+
+
+def test_matches_the_individual_scans():
+    rng = random.Random(7)
+    for _ in range(3_000):
+        prefix = "".join(rng.choices(ALPHABET, k=rng.randint(0, 20)))
+        suffix = "".join(rng.choices(ALPHABET, k=rng.randint(0, 10)))
+        for language in ("python", "php"):
+            features = scan(prefix, suffix, language)
+
+            assert features.paren_open == (prefix.rfind("(") > prefix.rfind(")"))
+            assert features.docstring_quotes == prefix.count('"""')
+            assert features.doc_comment_open == ("/**" in prefix)
+            assert features.trigger == next(
+                (t for t in ("->", "::", ".", "$") if prefix.rstrip().endswith(t)), None
+            )
+            assert features.identifiers == tuple(
+                dict.fromkeys(_VAR_PATTERNS[language].findall(prefix))
+            )
+            assert list(features.closers) == [c for c in suffix if c in ")]}"]
+            assert list(features.leading) == _leading(suffix)
+            assert features.suffix_blank == (not suffix.strip())
+            assert features.suffix_paren == (")" in suffix)
+            assert features.suffix_docstring == ('"""' in suffix)
+            assert features.suffix_doc_comment_end == ("*/" in suffix)
+
+
+def test_bracket_depth_and_quote_state():
+    features = scan('foo(bar[1], "a(b', ")")
+
+    assert features.depth == 2
+    assert features.quote == '"'
+
+
+def test_escaped_and_closed_quotes():
+    assert scan(r'x = "a\"b', "").quote == '"'
+    assert scan(r'x = "a\\"', "").quote is None
+    assert scan("x = '''doc", "").quote == "'"
+    assert scan("x = \"it's", "").quote == '"'
+    assert scan('x = "a"\ny = ', "").quote is None
+
+
+def test_features_are_scanned_once_per_context():
+    ctx = make_context(prefix="foo(", suffix=")")
+
+    first = lexical_features(ctx)
+
+    assert lexical_features(ctx) is first
+    assert ctx.lexical is first
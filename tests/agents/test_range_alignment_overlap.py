@@ -0,0 +1,39 @@
+import random
+
+from ai_lsp.agents.range_alignment import _overlap_length, _trim_suffix_overlap
+
+
+def _quadratic_trim(completion: str, suffix: str) -> str:
+    # The original implementation, kept as the reference.
+    if not suffix or not completion:
+        return completion
+    for i in range(min(len(completion), len(suffix)), 0, -1):
+        if completion.endswith(suffix[:i]):
+            return completion[:-i]
+    return completion
+
+
+def test_matches_quadratic_trim():
+    rng = random.Random(3)
+    for _ in range(5_000):
+        completion = "".join(rng.choices("ab)", k=rng.randint(0, 12)))
+        suffix = "".join(rng.choices("ab)", k=rng.randint(0, 12)))
+
+        assert _trim_suffix_overlap(completion, suffix) == _quadratic_trim(
+            completion, suffix
+        )
+
+
+def test_overlap_length():
+    assert _overlap_length("foo(bar", "bar)") == 3
+    assert _overlap_length("aaaa", "aaab") == 3
+    assert _overlap_length("abcabc", "abcabc") == 6
+    assert _overlap_length("x", "y") == 0
+    assert _overlap_length("", "y") == 0
+
+
+def test_long_repetitive_suffix():
+    suffix = "a" * 20_000 + "b"
+    completion = "c" + "a" * 20_000
+
+    assert _trim_suffix_overlap(completion, suffix) == "c"
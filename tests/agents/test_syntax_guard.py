@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from lsprotocol import types
+
+from ai_lsp.agents.constraints import SuffixConstraintAgent
+from ai_lsp.agents.guard import SyntaxGuardAgent
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.lsp.documents import Document
+from ai_lsp.syntax.tree import SyntaxTree
+
+SOURCE = '''def run():
+    """Run it.
+    """
+    query = """
+        SELECT *
+    """
+    value = compute(
+        first,
+    )  # done
+'''
+
+
+def make_context(line: int, character: int) -> CompletionContext:
+    document = Document(
+        uri="file:///test.py",
+        language_id="python",
+        version=1,
+        text=SOURCE,
+        syntax=SyntaxTree.for_language("python", SOURCE),
+    )
+    return CompletionContextBuilder().build(
+        document, types.Position(line=line, character=character)
+    )
+
+
+def test_vetoes_multiline_string():
+    decision = SyntaxGuardAgent().before_generation(make_context(4, 10))
+
+    assert not decision.allowed
+    assert decision.reason == "Cursor inside a multi-line string"
+
+
+def test_allows_docstrings_and_code():
+    agent = SyntaxGuardAgent()
+
+    assert agent.before_generation(make_context(2, 4)).allowed
+    assert agent.before_generation(make_context(7, 8)).allowed
+
+
+def test_constraints_carry_open_brackets_and_line_comments():
+    agent = SuffixConstraintAgent()
+
+    inside = agent.analyze(make_context(7, 8))
+    comment = agent.analyze(make_context(8, 10))
+
+    assert inside.open_brackets == "("
+    assert not inside.forbidden_newlines
+    assert comment.forbidden_newlines
+    assert "\n" in comment.stop_sequences
+
+
+@patch("ai_lsp.ai.ollama_client.requests.post")
+def test_engine_skips_backend_in_multiline_string(mock_post: MagicMock) -> None:
+    engine = OllamaCompletionEngine()
+
+    result = asyncio.run(engine.complete(make_context(4, 10)))
+
+    assert result is None
+    mock_post.assert_not_called()
+
+
+@patch("ai_lsp.ai.ollama_client.requests.post")
+def test_default_engine_sees_brackets_opened_on_earlier_lines(mock_post: MagicMock) -> None:
+    mock_post.return_value.iter_lines.return_value = [b'{"response": "second", "done": true}']
+    context = make_context(7, 8)
+
+    asyncio.run(OllamaCompletionEngine().complete(context))
+
+    assert context.usage is not None and context.usage.decision_input is not None
+    assert context.usage.decision_input.constraints.open_brackets == "("
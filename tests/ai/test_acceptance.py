@@ -0,0 +1,149 @@
+import json
+import random
+import time
+
+from lsprotocol import types
+
+from ai_lsp.agents.intent_types import EditIntent, EditIntentType
+from ai_lsp.ai.acceptance import (
+    AcceptancePredictor,
+    acceptance_features,
+    evaluate,
+    main,
+    train,
+)
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.ai.orchestrator.decision_input import CompletionDecisionInput
+from ai_lsp.ai.orchestrator.default_orchestrator import DefaultCompletionOrchestrator
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from ai_lsp.domain.semantics import PrefixSemantics, ScopeType
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.lsp.documents import Document
+from ai_lsp.syntax.tree import SyntaxTree
+
+
+def make_input(*, prefix: str = "foo(", typing_interval: float | None = None):
+    return CompletionDecisionInput(
+        context=CompletionContext(
+            language="python",
+            file_path="example.py",
+            prefix=prefix,
+            suffix="",
+            completion_prefix="",
+            current_line=prefix,
+            previous_lines=[],
+            next_lines=[],
+            indentation="",
+            line=0,
+            character=len(prefix),
+            typing_interval=typing_interval,
+        ),
+        intent=EditIntent(EditIntentType.INLINE_COMPLETION, 0.9, "test"),
+        semantics=PrefixSemantics([], None, ScopeType.FUNCTION, "python"),
+        constraints=SuffixConstraints(confidence=0.9),
+    )
+
+
+def make_samples(count: int) -> list[tuple[dict[str, float], bool]]:
+    # Completions offered while typing fast are ignored.
+    rng = random.Random(1)
+    samples = []
+    for _ in range(count):
+        interval = rng.uniform(0.02, 1.5)
+        features = acceptance_features(make_input(typing_interval=interval))
+        samples.append((features, interval > 0.4 or rng.random() < 0.05))
+    return samples
+
+
+def test_training_learns_typing_cadence():
+    samples = make_samples(400)
+
+    predictor = train(samples, epochs=100)
+
+    slow = acceptance_features(make_input(typing_interval=1.2))
+    fast = acceptance_features(make_input(typing_interval=0.05))
+    assert predictor.predict(slow) > 0.8
+    assert predictor.predict(fast) < 0.2
+    assert evaluate(predictor, samples, threshold=0.5)["accuracy"] > 0.85
+
+
+def test_save_and_load(tmp_path):
+    predictor = AcceptancePredictor(weights={"typing_interval": 2.0}, bias=-1.0)
+    path = tmp_path / "model.json"
+
+    predictor.save(str(path))
+
+    assert AcceptancePredictor.load(str(path)) == predictor
+
+
+def test_inference_is_fast():
+    predictor = train(make_samples(50), epochs=5)
+    input = make_input(typing_interval=0.3)
+
+    started = time.perf_counter()
+    for _ in range(1_000):
+        predictor.predict(acceptance_features(input))
+    per_call = (time.perf_counter() - started) / 1_000
+
+    assert per_call < 100e-6
+
+
+def test_orchestrator_skips_below_threshold():
+    predictor = AcceptancePredictor(weights={"typing_interval": 10.0}, bias=-5.0)
+    orchestrator = DefaultCompletionOrchestrator(predictor, acceptance_threshold=0.5)
+
+    skipped = orchestrator.decide(make_input(typing_interval=0.1))
+    kept = orchestrator.decide(make_input(typing_interval=1.0))
+
+    assert not skipped.should_complete
+    assert skipped.explanation == "Predicted acceptance too low"
+    assert skipped.acceptance is not None and skipped.acceptance < 0.5
+    assert kept.should_complete
+    assert kept.acceptance is not None and kept.acceptance > 0.5
+
+
+def test_train_cli(tmp_path, capsys):
+    log = tmp_path / "acceptance.jsonl"
+    with open(log, "w") as f:
+        for features, accepted in make_samples(60):
+            outcome = "accepted" if accepted else "ignored"
+            f.write(json.dumps({"features": features, "outcome": outcome}) + "\n")
+        f.write("{truncated\n")
+    output = tmp_path / "model.json"
+
+    assert main([str(log), "-o", str(output), "--epochs", "20"]) == 0
+
+    assert AcceptancePredictor.load(str(output)).weights
+    assert "held-out samples" in capsys.readouterr().out
+
+
+def test_document_typing_interval():
+    document = Document(uri="file:///a.py", language_id="python", version=1, text="")
+
+    for now in (0.0, 0.1, 0.2, 10.0, 10.1):
+        document.touch(now)
+
+    assert document.last_change == 10.1
+    assert abs(document.typing_interval - 0.1) < 1e-9
+
+
+def test_default_pipeline_feeds_varying_suffix_features():
+    source = "def run(items):\n    total = compute(\n        items, )\n    label = \n"
+    document = Document(
+        "file:///example.py", "python", 1, source, SyntaxTree.for_language("python", source)
+    )
+    pipeline = OllamaCompletionEngine().pipeline
+    builder = CompletionContextBuilder()
+
+    def features(line: int, character: int) -> dict[str, float]:
+        context = builder.build(document, types.Position(line=line, character=character))
+        decision_input = pipeline.prepare(context).input
+        assert decision_input is not None
+        return acceptance_features(decision_input)
+
+    inside_call = features(2, 14)
+    open_line = features(3, 12)
+
+    for name in ("suffix_confidence", "forbidden_newlines", "must_close", "open_brackets"):
+        assert inside_call[name] != open_line[name], name
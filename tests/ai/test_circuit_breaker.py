@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from ai_lsp.ai.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.status import BackendStatusNotifier
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock, **kwargs) -> CircuitBreaker:
+    return CircuitBreaker(
+        min_requests=4,
+        cooldown=5,
+        clock=clock,
+        metrics=CompletionMetrics(MetricsRegistry()),
+        **kwargs,
+    )
+
+
+def test_opens_at_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for outcome in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record_success() if outcome else breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow()
+
+    clock.now = 5
+    assert breaker.allow()
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+
+    clock.now = 5
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.cooldown == 10
+    clock.now = 14
+    assert not breaker.allow()
+
+
+def test_released_probe_does_not_close_the_circuit():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 5
+
+    assert breaker.allow()
+    breaker.release()
+
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_engine_fails_fast_while_open():
+    engine = OllamaCompletionEngine(
+        base_url="http://127.0.0.1:9",
+        metrics=CompletionMetrics(MetricsRegistry()),
+    )
+    engine.breaker.min_requests = 2
+
+    for _ in range(2):
+        with pytest.raises(requests.RequestException):
+            asyncio.run(engine.complete(make_context()))
+    assert engine.breaker.state is CircuitState.OPEN
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        engine.breaker.check()
+    assert time.perf_counter() - started < 0.001
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(engine.complete(make_context()))
+
+
+class RecordingServer:
+    def __init__(self) -> None:
+        self.logs: list[str] = []
+        self.shown: list[str] = []
+
+    def window_log_message(self, params) -> None:
+        self.logs.append(params.message)
+
+    def window_show_message(self, params) -> None:
+        self.shown.append(params.message)
+
+
+def test_status_notifier_rate_limits_errors_and_reports_transitions():
+    clock = FakeClock()
+    notifier = BackendStatusNotifier(min_interval=30, clock=clock)
+    server = RecordingServer()
+
+    for _ in range(5):
+        notifier.error(server, RuntimeError("refused"))  # type: ignore[arg-type]
+    clock.now = 31
+    notifier.error(server, RuntimeError("refused"))  # type: ignore[arg-type]
+
+    assert len(server.logs) == 2
+    assert "4 similar errors suppressed" in server.logs[1]
+
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    notifier.update(server, breaker)  # type: ignore[arg-type]
+    notifier.update(server, breaker)  # type: ignore[arg-type]
+    clock.now = 40
+    breaker.allow()
+    breaker.record_success()
+    notifier.update(server, breaker)  # type: ignore[arg-type]
+
+    assert len(server.shown) == 2
+    assert "unavailable" in server.shown[0]
+    assert "available again" in server.shown[1]
+
+
+def test_probe_cancelled_before_its_thread_starts_is_given_back():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+    clock.now = 5
+    engine = OllamaCompletionEngine(
+        breaker=breaker, metrics=CompletionMetrics(MetricsRegistry())
+    )
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        # One busy worker, so the completion waits in the executor queue.
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        gate = threading.Event()
+        busy = loop.run_in_executor(None, gate.wait)
+
+        probe = asyncio.create_task(engine.complete(make_context()))
+        await asyncio.sleep(0.05)
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert not breaker.allow()
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        gate.set()
+        await busy
+
+    asyncio.run(main())
+
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import time
+
+from ai_lsp.ai.cache import CompletionCache
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from benchmarks.stub_backend import StubOllamaEngine
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def make_cache(path, **kwargs) -> CompletionCache:
+    return CompletionCache(
+        str(path), metrics=CompletionMetrics(MetricsRegistry()), **kwargs
+    )
+
+
+class CountingEngine(StubOllamaEngine):
+    calls = 0
+
+    def _stream(self, prompt, options):
+        self.calls += 1
+        yield from super()._stream(prompt, options)
+
+
+def test_engine_reuses_cached_generation_across_instances(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    first = CountingEngine(["compute", "()"], cache=make_cache(path))
+    second = CountingEngine(["other", "()"], cache=make_cache(path))
+
+    assert asyncio.run(first.complete(make_context())) == "compute()"
+    assert asyncio.run(first.complete(make_context())) == "compute()"
+    assert asyncio.run(second.complete(make_context())) == "compute()"
+
+    assert first.calls == 1
+    assert second.calls == 0
+
+
+def test_key_depends_on_model_options_and_prompt():
+    key = CompletionCache.key("m", {"stop": [")"]}, "prompt")
+
+    assert key == CompletionCache.key("m", {"stop": [")"]}, "prompt")
+    assert key != CompletionCache.key("m2", {"stop": [")"]}, "prompt")
+    assert key != CompletionCache.key("m", {"stop": [";"]}, "prompt")
+    assert key != CompletionCache.key("m", {"stop": [")"]}, "prompt2")
+
+
+def test_eviction_keeps_most_recently_used(tmp_path):
+    cache = make_cache(tmp_path / "c.sqlite3", max_entries=3, memory_entries=1, evict_every=1)
+
+    for index in range(3):
+        cache.put(f"k{index}", f"v{index}")
+        time.sleep(0.001)
+    assert cache.get("k0") == "v0"  # disk hit, stamped on the next write
+    cache.put("k3", "v3")
+
+    assert len(cache) == 3
+    fresh = make_cache(tmp_path / "c.sqlite3")
+    assert fresh.get("k0") == "v0"
+    assert fresh.get("k1") is None
+
+
+def _writer(path: str, worker: int) -> None:
+    cache = CompletionCache(path, metrics=CompletionMetrics(MetricsRegistry()))
+    for index in range(50):
+        cache.put(f"{worker}-{index}", "x" * 100)
+        cache.get(f"{(worker + 1) % 4}-{index}")
+
+
+def test_concurrent_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    make_cache(path)
+
+    processes = [
+        multiprocessing.get_context("spawn").Process(target=_writer, args=(path, worker))
+        for worker in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    assert len(make_cache(path)) == 200
+
+
+def test_lookups_are_sub_millisecond(tmp_path):
+    cache = make_cache(tmp_path / "c.sqlite3", memory_entries=1)
+    for index in range(1_000):
+        cache.put(f"k{index}", "value" * 20)
+
+    started = time.perf_counter()
+    for index in range(200):
+        cache.get(f"k{index}")
+    per_lookup = (time.perf_counter() - started) / 200
+
+    assert per_lookup < 0.001
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Any, Dict
 from unittest.mock import patch, MagicMock
@@ -46,3 +47,28 @@ def test_engine_passes_stop_sequences_to_ollama(mock_post: MagicMock) -> None:
             assert "options" in payload
             assert "stop" in payload["options"]
             assert ")" in payload["options"]["stop"]
+
+
+@patch("ai_lsp.ai.ollama_client.requests.post")
+def test_default_engine_stops_at_a_suffix_closer(mock_post: MagicMock) -> None:
+    streamed: list[str] = []
+
+    def lines():
+        # A backend that ignores the stop option.
+        for token in ["do_something(", "$a", ")", "; more();"]:
+            streamed.append(token)
+            yield json.dumps({"response": token}).encode()
+        yield json.dumps({"response": "", "done": True}).encode()
+
+    mock_post.return_value.iter_lines.return_value = lines()
+    engine = OllamaCompletionEngine()
+    ctx = make_context(suffix=")")
+    ctx.prefix = ctx.current_line = "$x = "
+    ctx.character = len(ctx.prefix)
+
+    result = asyncio.run(engine.complete(ctx))
+
+    _, kwargs = mock_post.call_args
+    assert ")" in kwargs["json"]["options"]["stop"]
+    assert result == "do_something($a"
+    assert streamed == ["do_something(", "$a", ")"]
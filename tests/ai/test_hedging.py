@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+from ai_lsp.ai.circuit_breaker import CircuitState
+from ai_lsp.ai.latency import AdaptiveTimeouts, LatencyTracker
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def seed(tracker: LatencyTracker, ttft: float, interval: float = 0.001) -> None:
+    for _ in range(tracker.min_samples):
+        tracker.observe(ttft, 11, interval * 10)
+
+
+def test_adaptive_timeouts_fall_back_to_ceiling_until_warm():
+    tracker = LatencyTracker(window=5, min_samples=5)
+    timeouts = AdaptiveTimeouts(tracker, ceiling=10, floor=0.5, factor=3)
+
+    assert timeouts.first_token() == 10
+    assert timeouts.hedge_delay() is None
+    assert timeouts.deadline(128) is None
+
+    for ttft in (0.1, 0.2, 0.3, 0.4, 1.0):
+        tracker.observe(ttft, 11, 0.1)
+
+    assert timeouts.first_token() == 3.0
+    assert timeouts.hedge_delay() == 1.0
+    assert abs(timeouts.deadline(100) - (3.0 + 100 * 0.01 * 3)) < 1e-9
+
+    seed(tracker, 0.01)
+    assert timeouts.first_token() == 0.5
+
+
+def test_cold_model_waits_up_to_the_ceiling():
+    tracker = LatencyTracker(window=5, min_samples=5)
+    timeouts = AdaptiveTimeouts(tracker, ceiling=10, cold_after=60)
+    # Warm samples from before a restart.
+    tracker.restore({"ttft": [0.01] * 5, "interval": [0.001] * 5})
+    assert timeouts.cold() and timeouts.first_token() == 10
+    assert timeouts.hedge_delay() is None
+
+    # The load is observed but kept out of the warm window.
+    tracker.observe(4.0, 11, 0.1, cold=True)
+    assert tracker.samples()["ttft"] == [0.01] * 5
+    assert timeouts.first_token() == 0.5
+
+    tracker.last_observed = time.monotonic() - 61
+    assert timeouts.first_token() == 10
+
+
+def test_cold_load_after_restart_is_not_a_backend_failure():
+    config = MockOllamaConfig(ttft=0.01, load_time=1.0)
+    with MockOllamaServer(config) as mock:
+        engine = OllamaCompletionEngine(
+            base_url=mock.base_url, timeout=10, metrics=CompletionMetrics(MetricsRegistry())
+        )
+        engine.latency.restore({"ttft": [0.01] * 20, "interval": [0.001] * 20})
+
+        assert asyncio.run(engine.complete(make_context())) == "completion()"
+
+    assert engine.breaker.state is CircuitState.CLOSED
+    assert engine.timeouts.first_token() == 0.5
+
+
+def test_cold_pool_loads_the_model_on_one_node_only():
+    loading = MockOllamaServer(MockOllamaConfig(load_time=1.5)).start()
+    spare = MockOllamaServer().start()
+    metrics = CompletionMetrics(MetricsRegistry())
+    try:
+        engine = OllamaCompletionEngine(
+            base_urls=[loading.base_url, spare.base_url], timeout=2, metrics=metrics
+        )
+        engine.latency.restore({"ttft": [0.01] * 20, "interval": [0.001] * 20})
+        assert engine.timeouts.cold()
+
+        messages = list(engine._messages("value = ", {"num_predict": 8}))
+
+        assert messages[-1]["done"]
+        assert loading.stats.generate == 1
+        assert spare.stats.requests == 0
+        assert metrics.hedges.value == 0
+    finally:
+        loading.stop()
+        spare.stop()
+
+
+def test_slow_node_is_hedged_and_loser_cancelled():
+    slow = MockOllamaServer(MockOllamaConfig(ttft=2.0, default_output="slow()")).start()
+    fast = MockOllamaServer(MockOllamaConfig(default_output="fast()")).start()
+    metrics = CompletionMetrics(MetricsRegistry())
+    try:
+        engine = OllamaCompletionEngine(
+            base_urls=[slow.base_url, fast.base_url], metrics=metrics
+        )
+        seed(engine.latency, 0.02)
+
+        started = time.perf_counter()
+        result = asyncio.run(engine.complete(make_context()))
+        elapsed = time.perf_counter() - started
+
+        assert result == "fast()"
+        assert elapsed < 1.5
+        assert metrics.hedges.value == 1
+        assert fast.stats.completed == 1
+    finally:
+        slow.stop()
+        fast.stop()
+
+
+def test_failed_node_fails_over_without_waiting():
+    broken = MockOllamaServer(MockOllamaConfig(failure_rate=1.0)).start()
+    healthy = MockOllamaServer(MockOllamaConfig(default_output="ok()")).start()
+    try:
+        engine = OllamaCompletionEngine(
+            base_urls=[broken.base_url, healthy.base_url],
+            metrics=CompletionMetrics(MetricsRegistry()),
+        )
+
+        assert asyncio.run(engine.complete(make_context())) == "ok()"
+        assert broken.stats.failures == 1
+    finally:
+        broken.stop()
+        healthy.stop()
+
+
+def test_generation_is_cut_at_the_adaptive_deadline():
+    config = MockOllamaConfig(tokens_per_second=20, default_output="a b c d e f g h i j k")
+    metrics = CompletionMetrics(MetricsRegistry())
+    with MockOllamaServer(config) as mock:
+        engine = OllamaCompletionEngine(base_url=mock.base_url, metrics=metrics)
+        seed(engine.latency, 0.01, interval=0.0001)
+
+        result = asyncio.run(engine.complete(make_context()))
+
+    assert metrics.deadlines.value == 1
+    assert result is not None and len(result) < len("a b c d e f g h i j k")
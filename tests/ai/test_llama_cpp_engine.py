@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ai_lsp.ai.llama_cpp_engine import LlamaCppCompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+
+
+class FakeLlama:
+    """
+    Stands in for llama_cpp.Llama: streams `tokens` with a delay each.
+    """
+
+    instances: list["FakeLlama"] = []
+    tokens = ["compute", "(", "a", ")"]
+    delay = 0.0
+
+    def __init__(self, model_path: str, **kwargs) -> None:
+        self.model_path = model_path
+        self.calls: list[dict] = []
+        self.closed = 0
+        FakeLlama.instances.append(self)
+
+    def create_completion(self, prompt: str, **kwargs):
+        self.calls.append(dict(kwargs, thread=threading.current_thread().name))
+
+        def chunks():
+            try:
+                for token in self.tokens:
+                    time.sleep(self.delay)
+                    yield {"choices": [{"text": token, "finish_reason": None}]}
+            finally:
+                self.closed += 1
+
+        return chunks()
+
+
+@pytest.fixture(autouse=True)
+def llama_cpp(monkeypatch):
+    FakeLlama.instances = []
+    monkeypatch.setitem(sys.modules, "llama_cpp", SimpleNamespace(Llama=FakeLlama))
+    yield
+
+
+def make_engine(**kwargs) -> LlamaCppCompletionEngine:
+    return LlamaCppCompletionEngine(
+        "/models/code.gguf", metrics=CompletionMetrics(MetricsRegistry()), **kwargs
+    )
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_model_stays_resident_on_the_inference_thread():
+    engine = make_engine()
+    try:
+        engine.load().result()
+        assert asyncio.run(engine.complete(make_context())) == "compute(a)"
+        assert asyncio.run(engine.complete(make_context())) == "compute(a)"
+    finally:
+        engine.close()
+
+    [llama] = FakeLlama.instances
+    assert engine.model == "code.gguf"
+    assert [call["thread"].startswith("ai-lsp-inference") for call in llama.calls] == [
+        True,
+        True,
+    ]
+    assert llama.calls[0]["temperature"] == 0
+
+
+def test_tokens_reach_the_agent_hooks_and_the_stream_is_closed_at_a_stop():
+    engine = make_engine()
+    seen: list[str] = []
+    engine.pipeline.token_hooks.append(lambda token: seen.append(token))
+    try:
+        result = engine._blocking_complete(
+            make_context(), SuffixConstraints(stop_sequences=[")"])
+        )
+    finally:
+        engine.close()
+
+    [llama] = FakeLlama.instances
+    assert result == "compute(a"
+    assert seen == ["compute", "(", "a", ")"]
+    assert llama.calls[0]["stop"] == [")"]
+    assert llama.closed == 1
+
+
+def test_newer_request_supersedes_the_running_one():
+    FakeLlama.delay = 0.05
+    engine = make_engine()
+
+    async def main():
+        first = asyncio.create_task(engine.complete(make_context()))
+        await asyncio.sleep(0.08)
+        second = asyncio.create_task(engine.complete(make_context()))
+        third = asyncio.create_task(engine.complete(make_context()))
+        return await asyncio.gather(first, second, third)
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        FakeLlama.delay = 0.0
+        engine.close()
+
+    # The first stops mid-stream, the second never starts.
+    assert results == [None, None, "compute(a)"]
+    assert len(FakeLlama.instances[0].calls) == 2
+    snapshot = engine.metrics.registry.snapshot()
+    assert snapshot["ai_lsp_inference_superseded_total"][0]["value"] == 2
+
+
+def test_cancelled_queued_request_does_not_block_later_ones():
+    FakeLlama.delay = 0.05
+    engine = make_engine()
+
+    async def main():
+        first = asyncio.create_task(engine.complete(make_context()))
+        await asyncio.sleep(0.08)
+        queued = asyncio.create_task(engine.complete(make_context()))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(first, queued, return_exceptions=True)
+        FakeLlama.delay = 0.0
+        return await engine.complete(make_context())
+
+    try:
+        result = asyncio.run(main())
+    finally:
+        FakeLlama.delay = 0.0
+        engine.close()
+
+    assert result == "compute(a)"
+    assert engine._queued == 0
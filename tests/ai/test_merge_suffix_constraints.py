@@ -24,3 +24,11 @@ def test_merge_suffix_constraints_deduplicates_and_preserves_order() -> None:
     assert merged.stop_sequences == [")", "\n", ";"]
     assert merged.forbidden_newlines is True
     assert merged.confidence == 0.9
+
+
+def test_merge_keeps_open_brackets() -> None:
+    merged = merge_suffix_constraints(
+        [SuffixConstraints(), SuffixConstraints(open_brackets="({")]
+    )
+
+    assert merged.open_brackets == "({"
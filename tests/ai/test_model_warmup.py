@@ -0,0 +1,62 @@
+import time
+
+from ai_lsp.ai.warmup import ModelWarmup
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+
+def make_warmup(base_url: str, **kwargs) -> tuple[ModelWarmup, MetricsRegistry]:
+    registry = MetricsRegistry()
+    warmup = ModelWarmup(
+        ["codellama:7b"],
+        base_url=base_url,
+        metrics=CompletionMetrics(registry),
+        **kwargs,
+    )
+    return warmup, registry
+
+
+def test_start_preloads_model_and_reports_warm():
+    with MockOllamaServer() as mock:
+        warmup, registry = make_warmup(mock.base_url, ping_interval=10)
+        warmup.start()
+        deadline = time.monotonic() + 5
+        while not warmup.is_warm("codellama:7b") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        warmup.stop()
+
+        assert "codellama:7b" in mock.loaded
+        assert mock.stats.generate == 1
+        assert registry.gauge("ai_lsp_model_warm", model="codellama:7b").value == 1.0
+
+
+def test_pings_only_while_active_and_goes_cold_when_idle():
+    with MockOllamaServer() as mock:
+        warmup, registry = make_warmup(mock.base_url, ping_interval=0, idle_timeout=0.2)
+
+        warmup.tick()
+        warmup.tick()
+        assert mock.stats.generate == 2
+        assert warmup.keep_alive == "1s"
+
+        warmup.last_activity -= 1
+        warmup.last_ping["codellama:7b"] -= 1
+        warmup.tick()
+
+        assert mock.stats.generate == 2
+        assert not warmup.is_warm("codellama:7b")
+        assert registry.gauge("ai_lsp_model_warm", model="codellama:7b").value == 0.0
+
+
+def test_failed_warmup_backs_off():
+    config = MockOllamaConfig(failure_rate=1.0)
+    with MockOllamaServer(config) as mock:
+        warmup, registry = make_warmup(mock.base_url, ping_interval=60)
+
+        warmup.tick()
+        warmup.touch()
+        warmup.tick()
+
+        assert mock.stats.generate == 1
+        assert registry.counter("ai_lsp_model_warmup_failures_total").value == 1
+        assert not warmup.is_warm("codellama:7b")
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+
+from ai_lsp.ai.openai_client import OpenAICompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer, tokenize
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_mock_streams_openai_server_sent_events():
+    config = MockOllamaConfig(outputs=["foo(bar); baz()"])
+
+    with MockOllamaServer(config) as mock:
+        response = requests.post(
+            f"{mock.base_url}/v1/completions",
+            json={
+                "model": "m",
+                "prompt": "x",
+                "stream": True,
+                "stop": [";"],
+                "max_tokens": 3,
+                "stream_options": {"include_usage": True},
+            },
+            stream=True,
+        )
+        lines = [line for line in response.iter_lines() if line]
+
+    assert response.headers["Content-Type"] == "text/event-stream"
+    assert lines[-1] == b"data: [DONE]"
+    *chunks, finish, usage = [json.loads(line[len(b"data: ") :]) for line in lines[:-1]]
+    assert "".join(c["choices"][0]["text"] for c in chunks) == "foo(bar"
+    assert finish["choices"][0]["finish_reason"] == "length"
+    assert usage["choices"] == []
+    assert usage["usage"]["completion_tokens"] == 3
+
+
+def test_engine_completes_through_v1_completions():
+    config = MockOllamaConfig(outputs=["compute(a, b)", "second()"])
+
+    with MockOllamaServer(config) as mock:
+        engine = OpenAICompletionEngine(base_url=f"{mock.base_url}/v1")
+        context = make_context()
+
+        assert asyncio.run(engine.complete(context)) == "compute(a, b)"
+        assert asyncio.run(engine.complete(make_context())) == "second()"
+        assert mock.stats.generate == 2
+        assert mock.stats.completed == 2
+
+    assert context.usage is not None
+    assert context.usage.prompt_tokens == len(tokenize(mock.prompts[0]))
+    assert context.usage.generated_tokens == len(tokenize("compute(a, b)"))
+
+
+def test_stop_sequences_beyond_the_api_limit_are_cut_on_the_stream():
+    # The server only receives the first four stop sequences; the fifth
+    # is enforced while streaming, and the stream is closed right there.
+    config = MockOllamaConfig(outputs=["alpha beta gamma delta epsilon"], tokens_per_second=50)
+    constraints = SuffixConstraints(stop_sequences=["1", "2", "3", "4", " gamma"])
+
+    with MockOllamaServer(config) as mock:
+        engine = OpenAICompletionEngine(base_url=f"{mock.base_url}/v1")
+        result = engine._blocking_complete(make_context(), constraints)
+
+        deadline = time.monotonic() + 2
+        while mock.stats.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert result == "alpha beta"
+        assert mock.stats.disconnects == 1
+        assert mock.stats.completed == 0
+
+
+def test_failures_surface_as_http_errors():
+    config = MockOllamaConfig(failure_rate=1.0)
+
+    with MockOllamaServer(config) as mock:
+        engine = OpenAICompletionEngine(base_url=f"{mock.base_url}/v1")
+        with pytest.raises(requests.HTTPError):
+            engine._blocking_complete(make_context(), SuffixConstraints())
+        assert mock.stats.failures == 1
+
+
+def test_hedges_across_openai_nodes():
+    slow = MockOllamaServer(MockOllamaConfig(ttft=1.0, outputs=["slow()"]))
+    fast = MockOllamaServer(MockOllamaConfig(outputs=["fast()"]))
+
+    with slow, fast:
+        engine = OpenAICompletionEngine(
+            base_urls=[f"{slow.base_url}/v1", f"{fast.base_url}/v1"], timeout=5
+        )
+        engine._rotation = iter([0])  # type: ignore[assignment]
+        engine.timeouts.hedge_delay = lambda: 0.05  # type: ignore[method-assign]
+
+        assert engine._blocking_complete(make_context(), SuffixConstraints()) == "fast()"
+        assert fast.stats.completed == 1
@@ -0,0 +1,87 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.ai.stop_matcher import compile_stop_sequences
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="php",
+        file_path="test.php",
+        prefix="$a = ",
+        suffix="",
+        completion_prefix="",
+        current_line="$a = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="",
+        line=0,
+        character=5,
+    )
+
+
+def feed_all(patterns: list[str], tokens: list[str]):
+    matcher = compile_stop_sequences(patterns).matcher()
+    for token in tokens:
+        cut = matcher.feed(token)
+        if cut is not None:
+            return cut
+    return None
+
+
+def test_match_inside_single_token():
+    assert feed_all(["```"], ["foo```bar"]) == 3
+
+
+def test_match_split_across_tokens():
+    assert feed_all(["```"], ["foo`", "`", "`bar"]) == 3
+
+
+def test_no_match():
+    assert feed_all(["```", ";"], ["foo", "``", "bar"]) is None
+
+
+def test_earliest_completed_pattern_wins():
+    assert feed_all(["abcd", "bc"], ["ab", "cd"]) == 1
+    assert feed_all(["abc", "c"], ["ab", "c"]) == 0
+
+
+def test_overlapping_prefixes_use_failure_links():
+    assert feed_all(["aab"], ["a", "a", "a", "b"]) == 1
+
+
+def test_empty_pattern_set_never_matches():
+    assert feed_all([], ["```"]) is None
+
+
+def stream(tokens: list[str]) -> MagicMock:
+    response = MagicMock()
+    response.iter_lines.return_value = [
+        json.dumps({"response": token}).encode() for token in tokens
+    ]
+    return response
+
+
+@patch("ai_lsp.ai.ollama_client.requests.post")
+def test_engine_cuts_split_fence(mock_post: MagicMock) -> None:
+    mock_post.return_value = stream(["foo", "(", ");", "\n`", "``", "php"])
+
+    result = OllamaCompletionEngine()._blocking_complete(
+        make_context(), SuffixConstraints()
+    )
+
+    assert result == "foo();"
+
+
+@patch("ai_lsp.ai.ollama_client.requests.post")
+def test_engine_enforces_suffix_stop_sequences(mock_post: MagicMock) -> None:
+    mock_post.return_value = stream(["foo", "(1", ")", " + 2"])
+
+    result = OllamaCompletionEngine()._blocking_complete(
+        make_context(), SuffixConstraints(stop_sequences=[")"])
+    )
+
+    assert result == "foo(1"
@@ -0,0 +1,41 @@
+from benchmarks.runner import BenchmarkCase, BenchmarkResult, compare, run, to_json
+
+
+def make_result(key: str, median: float) -> BenchmarkResult:
+    return BenchmarkResult(
+        key=key, name=key, params={}, iterations=1, median=median, minimum=median
+    )
+
+
+def test_case_key_includes_params():
+    case = BenchmarkCase("complete", {"lines": 100, "completion_lines": 1}, lambda: lambda: None)
+
+    assert case.key == "complete[lines=100,completion_lines=1]"
+
+
+def test_run_times_each_case():
+    calls = []
+    case = BenchmarkCase("noop", {}, lambda: lambda: calls.append(1))
+
+    [result] = run([case], min_time=0.001, repeat=2)
+
+    assert result.key == "noop"
+    assert result.iterations >= 1
+    assert len(calls) >= 2 * result.iterations
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = to_json([make_result("a", 1.0), make_result("b", 1.0), make_result("c", 1.0)])
+    current = [
+        make_result("a", 1.1),
+        make_result("b", 1.5),
+        make_result("c", 0.5),
+        make_result("d", 1.0),
+    ]
+
+    comparison = compare(current, baseline, threshold=1.25)
+
+    assert not comparison.ok
+    assert [r.key for r in comparison.regressions] == ["b"]
+    assert [r.key for r in comparison.improvements] == ["c"]
+    assert comparison.missing == ["d"]
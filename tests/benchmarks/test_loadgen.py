@@ -0,0 +1,49 @@
+import asyncio
+
+from benchmarks.loadgen import (
+    LoadConfig,
+    ProcessSample,
+    detect_leaks,
+    percentile,
+    run_load,
+)
+from benchmarks.mock_ollama import MockOllamaConfig
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+def test_detect_leaks_compares_first_and_last_sample():
+    samples = [
+        ProcessSample(0.0, 1, threads=3, sockets=2, fds=10),
+        ProcessSample(1.0, 1, threads=9, sockets=2, fds=10),
+        ProcessSample(0.0, 2, threads=3, sockets=2, fds=10),
+        ProcessSample(1.0, 2, threads=4, sockets=2, fds=10),
+    ]
+
+    assert detect_leaks(samples) == ["pid 1: threads 3 -> 9"]
+
+
+def test_typing_session_against_real_server():
+    config = LoadConfig(
+        keystrokes_per_second=50,
+        typed_text="        x = ",
+        document_lines=50,
+        mock=MockOllamaConfig(outputs=["compute()"]),
+        sample_interval=0.05,
+    )
+
+    report = asyncio.run(run_load(config))
+
+    assert report.keystrokes == len(config.typed_text)
+    assert report.requests == report.keystrokes
+    assert report.outcomes.get("error", 0) == 0
+    assert report.outcomes.get("ok", 0) >= 1
+    assert report.backend_calls is not None and report.backend_calls >= 1
+    assert report.samples
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.domain.constraints import SuffixConstraints
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_engine_streams_scripted_output():
+    config = MockOllamaConfig(outputs=["compute(a, b)", "second()"])
+
+    with MockOllamaServer(config) as mock:
+        engine = OllamaCompletionEngine(base_url=mock.base_url)
+
+        assert asyncio.run(engine.complete(make_context())) == "compute(a, b)"
+        assert asyncio.run(engine.complete(make_context())) == "second()"
+        assert mock.stats.generate == 2
+        assert mock.stats.completed == 2
+
+
+def test_stop_and_num_predict_are_honoured():
+    config = MockOllamaConfig(outputs=["foo(bar); baz()"])
+
+    with MockOllamaServer(config) as mock:
+        response = requests.post(
+            f"{mock.base_url}/api/generate",
+            json={"model": "m", "prompt": "x", "options": {"stop": [";"], "num_predict": 3}},
+            stream=True,
+        )
+        lines = [line for line in response.iter_lines() if line]
+
+    *tokens, final = [json.loads(line) for line in lines]
+    assert "".join(t["response"] for t in tokens) == "foo(bar"
+    assert final["done"] is True
+    assert final["done_reason"] == "length"
+    assert final["eval_count"] == 3
+
+
+def test_failure_injection_surfaces_as_error():
+    config = MockOllamaConfig(failure_rate=1.0)
+
+    with MockOllamaServer(config) as mock:
+        engine = OllamaCompletionEngine(base_url=mock.base_url)
+        with pytest.raises(requests.HTTPError):
+            engine._blocking_complete(make_context(), SuffixConstraints())
+        assert mock.stats.failures == 1
+
+
+def test_tags_and_model_loading():
+    config = MockOllamaConfig(models=["a:1", "b:2"])
+
+    with MockOllamaServer(config) as mock:
+        tags = requests.get(f"{mock.base_url}/api/tags").json()
+        requests.post(f"{mock.base_url}/api/generate", json={"model": "a:1"})
+
+        assert [m["name"] for m in tags["models"]] == ["a:1", "b:2"]
+        assert mock.loaded == {"a:1"}
+
+        requests.post(f"{mock.base_url}/api/generate", json={"model": "a:1", "keep_alive": 0})
+        assert mock.loaded == set()
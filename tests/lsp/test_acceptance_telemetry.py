@@ -0,0 +1,171 @@
+import asyncio
+
+from ai_lsp.ai.acceptance import load_samples
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.documents import Document
+from ai_lsp.lsp.telemetry import AcceptanceTracker
+from ai_lsp.observability.acceptance_report import summarize
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from ai_lsp.observability.trace_view import load_traces
+from ai_lsp.observability.tracing import JsonlTraceExporter
+from benchmarks.stub_backend import StubOllamaEngine
+
+URI = "file:///example.py"
+PREFIX = "    total = compute"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_context(line: int = 1) -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="example.py",
+        prefix=PREFIX,
+        suffix="",
+        completion_prefix="compute",
+        current_line=PREFIX,
+        previous_lines=["def run(values):"],
+        next_lines=[],
+        indentation="    ",
+        line=line,
+        character=len(PREFIX),
+    )
+
+
+def make_document(line: str = PREFIX) -> Document:
+    return Document(URI, "python", 1, f"def run(values):\n{line}\n")
+
+
+def make_tracker(tmp_path, **kwargs):
+    metrics = CompletionMetrics(MetricsRegistry())
+    path = tmp_path / "acceptance.jsonl"
+    tracker = AcceptanceTracker(
+        JsonlTraceExporter(str(path)), metrics=metrics, clock=Clock(), **kwargs
+    )
+    return tracker, path, metrics
+
+
+def offer(tracker: AcceptanceTracker, document: Document, text: str) -> None:
+    context = make_context()
+    start = context.character - len(context.completion_prefix)
+    tracker.offer(document, context, text, start, latency=0.2)
+
+
+def test_applied_edit_is_accepted_with_usage_and_features(tmp_path):
+    tracker, path, metrics = make_tracker(tmp_path)
+    engine = StubOllamaEngine(
+        ["compute", "(", "values", ")"], metrics=CompletionMetrics(MetricsRegistry())
+    )
+    context = make_context()
+    completion = asyncio.run(engine.complete(context))
+    assert completion
+
+    document = make_document()
+    start = context.character - len(context.completion_prefix)
+    tracker.offer(document, context, completion, start, latency=0.2)
+    document.text = f"def run(values):\n    total = {completion}\n"
+    tracker.changed(document)
+
+    [record] = list(load_traces([str(path)]))
+    assert record["outcome"] == "accepted"
+    assert record["model"] == engine.model
+    assert record["strategy"] == context.usage.strategy
+    assert record["generated_tokens"] == 4
+    assert record["latency_ms"] == 200.0
+    assert record["accepted_chars"] == len(completion) - len("compute")
+
+    [(features, accepted)] = list(load_samples([str(path)]))
+    assert accepted and "intent_confidence" in features
+
+    snapshot = metrics.registry.snapshot()["ai_lsp_completion_outcomes_total"]
+    assert {s["labels"]["outcome"]: s["value"] for s in snapshot}["accepted"] == 1
+
+
+def test_typing_through_then_diverging_is_partial(tmp_path):
+    tracker, path, _ = make_tracker(tmp_path)
+    document = make_document()
+    offer(tracker, document, "compute_total(values)")
+
+    document.text = "def run(values):\n    total = compute_to\n"
+    tracker.changed(document)
+    document.text = "def run(values):\n    total = compute_t\n"
+    tracker.changed(document)
+
+    [record] = list(load_traces([str(path)]))
+    assert record["outcome"] == "partial"
+    assert record["accepted_chars"] == 3
+
+
+def test_superseded_and_expired_offers_are_ignored(tmp_path):
+    tracker, path, _ = make_tracker(tmp_path, timeout=30.0)
+    document = make_document()
+    offer(tracker, document, "compute_total(values)")
+    document.text = "def run(values):\n    total = computed\n"
+    tracker.changed(document)
+    offer(tracker, document, "computed_total")
+
+    tracker.clock.now = 31.0
+    tracker.expire()
+
+    records = list(load_traces([str(path)]))
+    assert [r["outcome"] for r in records] == ["ignored", "ignored"]
+    assert records[1]["resolved_ms"] == 31000
+
+
+def test_multiline_completion_is_matched_across_crlf(tmp_path):
+    tracker, path, _ = make_tracker(tmp_path)
+    document = Document(URI, "python", 1, "x = 1\r\n    total = compute\r\n")
+    offer(tracker, document, "compute(a,\nb)")
+    document.text = "x = 1\r\n    total = compute(a,\r\nb)\r\n"
+    tracker.changed(document)
+
+    [record] = list(load_traces([str(path)]))
+    assert record["outcome"] == "accepted"
+
+
+def test_edits_above_the_offer_line_move_it(tmp_path):
+    tracker, path, _ = make_tracker(tmp_path)
+    document = make_document()
+    offer(tracker, document, "compute_total(values)")
+
+    # Typing on the offer line reuses its start offset.
+    document.text = "def run(values):\n    total = compute_tot\n"
+    tracker.changed(document, first_line=1)
+    assert tracker._pending[URI].matched == len("compute_tot")
+
+    # A line inserted above shifts the offer line; the old offset would
+    # now point into the signature.
+    document.text = "import os\ndef run(values):\n    total = compute_tot\n"
+    tracker.changed(document, first_line=0)
+
+    [record] = list(load_traces([str(path)]))
+    assert record["outcome"] == "partial"
+    assert record["accepted_chars"] == 4
+
+
+def test_report_groups_outcomes():
+    records = [
+        {"intent": "inline", "model": "a", "outcome": "accepted", "latency_ms": 100,
+         "completion_chars": 10, "accepted_chars": 10, "generated_tokens": 4},
+        {"intent": "inline", "model": "b", "outcome": "ignored", "latency_ms": 300,
+         "completion_chars": 10, "accepted_chars": 0, "generated_tokens": 6},
+        {"intent": "block", "model": "a", "outcome": "partial", "latency_ms": 200,
+         "completion_chars": 20, "accepted_chars": 5},
+        {"intent": "block", "model": "a"},
+    ]
+
+    inline, block = summarize(records, ("intent",))
+
+    assert inline["intent"] == "inline" and inline["count"] == 2
+    assert inline["accepted"] == 0.5 and inline["ignored"] == 0.5
+    assert inline["kept_chars"] == 0.5
+    assert inline["latency_p50_ms"] == 300
+    assert inline["mean_tokens"] == 5
+    assert block["count"] == 1 and block["partial"] == 1.0
+    assert block["mean_tokens"] is None
@@ -0,0 +1,213 @@
+import asyncio
+import time
+
+from lsprotocol import types
+
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.lsp.documents import Document
+from ai_lsp.lsp.offload import (
+    AnalysisPool,
+    ContextJob,
+    DocumentSnapshots,
+    SnapshotRef,
+    StaleSnapshot,
+    build_context_job,
+    read_snapshot,
+)
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from ai_lsp.syntax.tree import SyntaxTree
+
+URI = "file:///big.py"
+
+
+def make_document(text: str, version: int = 1) -> Document:
+    return Document(URI, "python", version, text, SyntaxTree.for_language("python", text))
+
+
+def big_text(functions: int = 300) -> str:
+    return "".join(
+        f'def f{i}(a, b):\n    """doc"""\n    return a + b\n\n' for i in range(functions)
+    )
+
+
+def counters(metrics: CompletionMetrics, name: str) -> dict:
+    return {
+        tuple(sorted(s["labels"].items())): s["value"]
+        for s in metrics.registry.snapshot().get(name, [])
+    }
+
+
+def test_worker_builds_the_same_context_incrementally():
+    metrics = CompletionMetrics(MetricsRegistry())
+    pool = AnalysisPool(workers=1, min_chars=0, budgets={"context_build": 30}, metrics=metrics)
+    builder = CompletionContextBuilder()
+    text = big_text()
+    document = make_document(text)
+    position = types.Position(line=601, character=8)
+
+    async def build(document):
+        return await pool.build_context(builder, document, position)
+
+    try:
+        offloaded = asyncio.run(build(document))
+        assert offloaded == builder.build(document, position)
+        assert offloaded.syntax.function == "f150"
+
+        # An edit above the cursor: the worker updates its tree from the
+        # first changed line.
+        lines = text.splitlines(keepends=True)
+        lines[600] = "def renamed(a, b):\n"
+        document.text = "".join(lines)
+        document.version = 2
+        document.changed_from = 600
+        document.syntax.update(document.text, 600)
+
+        offloaded = asyncio.run(build(document))
+        assert offloaded == builder.build(document, position)
+        assert offloaded.syntax.function == "renamed"
+    finally:
+        pool.shutdown()
+
+    assert counters(metrics, "ai_lsp_analysis_offloaded_total") == {
+        (("stage", "context_build"),): 2
+    }
+
+
+def test_small_documents_and_disabled_pool_run_inline():
+    builder = CompletionContextBuilder()
+    document = make_document("x = 1\n")
+    position = types.Position(line=0, character=5)
+
+    for pool in (AnalysisPool(workers=0), AnalysisPool(workers=1, min_chars=1000)):
+        context = asyncio.run(pool.build_context(builder, document, position))
+        assert context == builder.build(document, position)
+        assert pool._executors == [None] * pool.workers
+
+
+def test_over_budget_stage_falls_back_inline():
+    metrics = CompletionMetrics(MetricsRegistry())
+    pool = AnalysisPool(workers=1, min_chars=0, budgets={"context_build": 0.0}, metrics=metrics)
+    builder = CompletionContextBuilder()
+    document = make_document(big_text(10))
+    position = types.Position(line=1, character=4)
+
+    try:
+        context = asyncio.run(pool.build_context(builder, document, position))
+    finally:
+        pool.shutdown()
+
+    assert context == builder.build(document, position)
+    assert counters(metrics, "ai_lsp_analysis_over_budget_total") == {
+        (("stage", "context_build"),): 1
+    }
+
+
+def test_job_after_an_overrun_one_meets_its_budget():
+    metrics = CompletionMetrics(MetricsRegistry())
+    budget = 0.5
+    pool = AnalysisPool(
+        workers=1, min_chars=0, budgets={"context_build": budget}, metrics=metrics
+    )
+    builder = CompletionContextBuilder()
+    document = make_document(big_text())
+    position = types.Position(line=601, character=8)
+
+    async def main():
+        # A job that keeps the worker busy long after its budget.
+        stuck = await pool._run(
+            "context_build", 0, time.sleep, 5.0, lambda: "inline"  # type: ignore[arg-type]
+        )
+        started = time.perf_counter()
+        context = await pool.build_context(builder, document, position)
+        return stuck, context, time.perf_counter() - started
+
+    try:
+        # Spawn the worker outside the budgets.
+        pool._executor(0).submit(time.sleep, 0).result()
+        stuck, context, elapsed = asyncio.run(main())
+    finally:
+        pool.shutdown()
+
+    assert stuck == "inline"
+    assert context == builder.build(document, position)
+    assert elapsed < budget
+    assert counters(metrics, "ai_lsp_analysis_fallbacks_total") == {
+        (("reason", "busy"), ("stage", "context_build")): 1
+    }
+
+
+def test_snapshot_failures_fall_back_inline():
+    metrics = CompletionMetrics(MetricsRegistry())
+    pool = AnalysisPool(workers=1, min_chars=0, metrics=metrics)
+    builder = CompletionContextBuilder()
+    document = make_document(big_text(10))
+    position = types.Position(line=1, character=4)
+
+    def unavailable(document, key=None):
+        raise OSError("no /dev/shm")
+
+    pool.snapshots.publish = unavailable  # type: ignore[method-assign]
+    context = asyncio.run(pool.build_context(builder, document, position))
+
+    assert context == builder.build(document, position)
+    assert counters(metrics, "ai_lsp_analysis_fallbacks_total") == {
+        (("reason", "snapshot"), ("stage", "context_build")): 1
+    }
+
+
+def test_snapshots_reuse_segments_and_detect_rewrites():
+    snapshots = DocumentSnapshots()
+    document = make_document("a = 1\n")
+    try:
+        first = snapshots.publish(document)
+        assert read_snapshot(URI, first) == "a = 1\n"
+        assert snapshots.publish(document) == SnapshotRef(
+            first.segment, first.serial, 1, 1, 0
+        )
+
+        document.text, document.version, document.changed_from = "a = 2\n", 2, 0
+        second = snapshots.publish(document)
+        assert second.segment == first.segment
+        assert (second.base_version, second.first_line) == (1, 0)
+        assert read_snapshot(URI, second) == "a = 2\n"
+
+        try:
+            read_snapshot(URI, first)
+        except StaleSnapshot:
+            pass
+        else:
+            raise AssertionError("stale snapshot was read")
+
+        document.text, document.version = "b" * 100_000, 3
+        third = snapshots.publish(document)
+        assert third.segment != first.segment
+        assert len(read_snapshot(URI, third)) == 100_000
+    finally:
+        snapshots.close()
+
+
+def test_reopened_document_rebuilds_the_worker_tree():
+    snapshots = DocumentSnapshots()
+    job_args = dict(
+        key=URI,
+        uri=URI,
+        language_id="python",
+        line=1,
+        character=4,
+        max_lines=10,
+        typing_interval=None,
+        typing_pause=None,
+    )
+
+    try:
+        document = make_document("class A:\n    x\n")
+        context = build_context_job(ContextJob(snapshots.publish(document), **job_args))
+        assert context.syntax.class_name == "A"
+
+        snapshots.release(URI)
+        document = make_document("def g():\n    x\n")
+        context = build_context_job(ContextJob(snapshots.publish(document), **job_args))
+        assert context.syntax.class_name is None
+        assert context.syntax.function == "g"
+    finally:
+        snapshots.close()
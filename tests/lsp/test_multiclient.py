@@ -0,0 +1,125 @@
+import asyncio
+
+from lsprotocol import types
+from pygls.lsp.client import LanguageClient
+
+from ai_lsp.config import Settings
+from ai_lsp.lsp.capabilities import SharedServices
+from ai_lsp.lsp.multiclient import MultiClientServer
+from ai_lsp.observability.profiling import PROFILER
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+URI = "file:///shared/app.py"
+
+
+async def connect(port: int) -> LanguageClient:
+    client = LanguageClient("test", "0.1.0")
+    await client.start_tcp("127.0.0.1", port)
+    await client.initialize_async(
+        types.InitializeParams(process_id=None, capabilities=types.ClientCapabilities())
+    )
+    client.initialized(types.InitializedParams())
+    return client
+
+
+async def complete(client: LanguageClient, text: str) -> list[str]:
+    client.text_document_did_open(
+        types.DidOpenTextDocumentParams(
+            text_document=types.TextDocumentItem(
+                uri=URI, language_id="python", version=1, text=text
+            )
+        )
+    )
+    result = await client.text_document_completion_async(
+        types.CompletionParams(
+            text_document=types.TextDocumentIdentifier(uri=URI),
+            position=types.Position(line=0, character=len(text)),
+        )
+    )
+    assert isinstance(result, types.CompletionList)
+    return [item.text_edit.new_text for item in result.items]  # type: ignore[union-attr]
+
+
+def profiled_stores() -> list[str]:
+    return sorted(name for name in PROFILER.tracked if name.startswith("documents:"))
+
+
+def make_server(mock: MockOllamaServer) -> MultiClientServer:
+    settings = Settings(
+        ollama_url=mock.base_url,
+        warmup=False,
+        cache=False,
+        loop_monitor=False,
+        state=False,
+    )
+    return MultiClientServer(SharedServices(settings))
+
+
+def test_clients_share_the_engine_but_not_their_documents():
+    config = MockOllamaConfig(outputs=["first()", "second()"])
+
+    async def main(mock: MockOllamaServer):
+        shared = make_server(mock)
+        server = await shared.serve_tcp("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            one = await connect(port)
+            two = await connect(port)
+            assert shared.connections == 2
+            assert profiled_stores() == ["documents:client-1", "documents:client-2"]
+
+            # Same URI, different text in each client.
+            assert await complete(one, "value = alpha_") == ["first()"]
+            assert await complete(two, "value = beta_") == ["second()"]
+
+            for client in (one, two):
+                await client.shutdown_async(None)
+                client.exit(None)
+                await client.stop()
+        finally:
+            server.close()
+            shared.services.stop()
+        return shared
+
+    with MockOllamaServer(config) as mock:
+        shared = asyncio.run(main(mock))
+
+    assert "alpha_" in mock.prompts[0] and "beta_" not in mock.prompts[0]
+    assert "beta_" in mock.prompts[1] and "alpha_" not in mock.prompts[1]
+    assert shared.connections == 0
+    assert profiled_stores() == []
+
+
+def test_exit_from_one_client_leaves_the_others_connected():
+    config = MockOllamaConfig(outputs=["done()"])
+
+    async def main(mock: MockOllamaServer):
+        shared = make_server(mock)
+        server = await shared.serve_tcp("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            leaving = await connect(port)
+            staying = await connect(port)
+            engine = await shared.services.engine.aget()
+
+            await leaving.shutdown_async(None)
+            leaving.exit(None)
+            for _ in range(100):
+                if shared.connections == 1:
+                    break
+                await asyncio.sleep(0.01)
+            assert shared.connections == 1
+
+            assert await complete(staying, "value = still_") == ["done()"]
+            assert shared.services.engine.value is engine
+
+            await staying.shutdown_async(None)
+            staying.exit(None)
+            for client in (leaving, staying):
+                await client.stop()
+        finally:
+            server.close()
+            shared.services.stop()
+
+    with MockOllamaServer(config) as mock:
+        asyncio.run(main(mock))
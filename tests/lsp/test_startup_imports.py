@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+# Wall-clock budget, in milliseconds, for everything the server imports on
+# top of pygls/lsprotocol before it can answer `initialize`.
+IMPORT_BUDGET_MS = float(os.getenv("AI_LSP_IMPORT_BUDGET_MS", "120"))
+
+# Loaded lazily, after the handshake or on the first completion.
+DEFERRED = (
+    "requests",
+    "ai_lsp.ai.ollama_client",
+    "ai_lsp.agents.pipeline",
+    "ai_lsp.agents.range_alignment",
+    "http.server",
+    "cProfile",
+    "tracemalloc",
+    "multiprocessing.shared_memory",
+    "concurrent.futures.process",
+)
+
+STARTUP = """
+import pygls.lsp.server
+print("--- server ---", file=__import__("sys").stderr, flush=True)
+from ai_lsp.lsp.server import create_server
+create_server()
+"""
+
+
+def import_times() -> dict[str, int]:
+    """
+    Self time in microseconds of every module imported by server startup
+    after pygls itself, parsed from `-X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    _, _, after = result.stderr.partition("--- server ---")
+
+    times = {}
+    for line in after.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = int(self_us)
+    return times
+
+
+def test_startup_defers_engine_and_backend_imports():
+    times = import_times()
+
+    assert "ai_lsp.lsp.capabilities" in times
+    assert not [name for name in DEFERRED if name in times]
+
+
+def test_startup_import_budget():
+    times = import_times()
+
+    total_ms = sum(times.values()) / 1000
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:5]
+    assert total_ms < IMPORT_BUDGET_MS, f"{total_ms:.1f}ms, slowest: {slowest}"
@@ -0,0 +1,93 @@
+import json
+import time
+
+from ai_lsp.ai.cache import CompletionCache
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.ai.warmup import ModelWarmup
+from ai_lsp.lsp.warm_state import STATE_VERSION, WarmState
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from benchmarks.mock_ollama import MockOllamaServer
+
+MODEL = "codellama:7b"
+
+
+def metrics() -> CompletionMetrics:
+    return CompletionMetrics(MetricsRegistry())
+
+
+def make_engine(tmp_path, model: str = MODEL) -> OllamaCompletionEngine:
+    cache = CompletionCache(str(tmp_path / "cache.sqlite3"), metrics=metrics())
+    return OllamaCompletionEngine(model=model, cache=cache, metrics=metrics())
+
+
+def make_warmup(base_url: str, **kwargs) -> ModelWarmup:
+    return ModelWarmup([MODEL], base_url=base_url, metrics=metrics(), **kwargs)
+
+
+def test_restart_restores_latency_hot_cache_keys_and_warm_models(tmp_path):
+    path = str(tmp_path / "state.json")
+    engine = make_engine(tmp_path)
+    for _ in range(25):
+        engine.latency.observe(0.2, tokens=11, decode_seconds=0.5)
+    engine.cache.put("a", "first()", MODEL)  # type: ignore[union-attr]
+    engine.cache.put("b", "second()", MODEL)  # type: ignore[union-attr]
+
+    with MockOllamaServer() as mock:
+        warmup = make_warmup(mock.base_url)
+        warmup.tick()
+        assert WarmState(path, metrics=metrics()).save(engine, warmup)
+        assert mock.stats.generate == 1
+
+        registry = MetricsRegistry()
+        state = WarmState(path, metrics=CompletionMetrics(registry))
+        restarted = make_engine(tmp_path)
+        state.restore_engine(restarted)
+        rewarmed = make_warmup(mock.base_url)
+        state.restore_warmup(rewarmed)
+        rewarmed.tick()
+
+        # Ollama still holds the model, so it is not preloaded again.
+        assert rewarmed.is_warm(MODEL)
+        assert mock.stats.generate == 1
+
+    assert restarted.latency.samples() == engine.latency.samples()
+    assert restarted.latency.ttft_quantile(0.95) == 0.2
+    # The model may have been unloaded since; the first request waits for it.
+    assert restarted.timeouts.first_token() == restarted.timeouts.ceiling
+    assert restarted.cache.hot_keys() == ["a", "b"]  # type: ignore[union-attr]
+    restored = registry.snapshot()["ai_lsp_warm_state_restored_total"]
+    assert sorted(sample["labels"]["part"] for sample in restored if sample["value"]) == [
+        "cache",
+        "latency",
+        "warmup",
+    ]
+
+
+def test_incompatible_or_stale_state_is_not_restored(tmp_path):
+    path = tmp_path / "state.json"
+    engine = make_engine(tmp_path)
+    engine.latency.observe(0.2, tokens=2, decode_seconds=0.1)
+    warmup = make_warmup("http://localhost:1", idle_timeout=60)
+    warmup.last_ping[MODEL] = time.monotonic()
+    warmup._set_warm(MODEL, True)
+    WarmState(str(path), metrics=metrics()).save(engine, warmup)
+
+    # Another model: cached keys include the model, latency does not carry over.
+    other = make_engine(tmp_path, model="starcoder2:3b")
+    WarmState(str(path), metrics=metrics()).restore_engine(other)
+    assert other.latency.samples() == {"ttft": [], "interval": []}
+
+    # The keep-alive sent before the snapshot has run out since.
+    snapshot = json.loads(path.read_text())
+    snapshot["saved_at"] -= 120
+    path.write_text(json.dumps(snapshot))
+    cold = make_warmup("http://localhost:1", idle_timeout=60)
+    WarmState(str(path), metrics=metrics()).restore_warmup(cold)
+    assert not cold.is_warm(MODEL)
+
+    snapshot["version"] = STATE_VERSION + 1
+    path.write_text(json.dumps(snapshot))
+    assert WarmState(str(path), metrics=metrics()).saved == {}
+
+    path.write_text("{not json")
+    assert WarmState(str(path), metrics=metrics()).saved == {}
@@ -0,0 +1,145 @@
+import asyncio
+import gc
+import time
+import weakref
+
+from lsprotocol import types
+from pygls.lsp.server import LanguageServer
+
+from ai_lsp.observability.loop_monitor import LoopMonitor
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+
+
+def make_monitor(**kwargs) -> tuple[LoopMonitor, list[str]]:
+    reports: list[str] = []
+    monitor = LoopMonitor(
+        metrics=CompletionMetrics(MetricsRegistry()), on_stall=reports.append, **kwargs
+    )
+    return monitor, reports
+
+
+def handler_counts(monitor: LoopMonitor) -> dict[str, int]:
+    snapshot = monitor.metrics.registry.snapshot()
+    return {
+        entry["labels"]["handler"]: entry["count"]
+        for entry in snapshot.get("ai_lsp_handler_seconds", [])
+    }
+
+
+def test_wrapped_handlers_keep_their_kind_and_are_timed():
+    monitor, _ = make_monitor()
+
+    def sync_handler(params):
+        return params + 1
+
+    async def async_handler(params):
+        await asyncio.sleep(0)
+        return params * 2
+
+    wrapped_sync = monitor.wrap("sync", sync_handler)
+    wrapped_async = monitor.wrap("async", async_handler)
+
+    assert not asyncio.iscoroutinefunction(wrapped_sync)
+    assert asyncio.iscoroutinefunction(wrapped_async)
+    assert wrapped_sync(1) == 2
+    assert asyncio.run(wrapped_async(2)) == 4
+    assert handler_counts(monitor) == {"sync": 1, "async": 1}
+
+
+def test_instrument_wraps_registered_features_and_commands():
+    server = LanguageServer("test", "0.0.1")
+
+    @server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
+    def did_change(ls, params):
+        pass
+
+    @server.command("test.command")
+    async def command(ls, *args):
+        return "ok"
+
+    features = server.protocol.fm.features
+    original = features[types.TEXT_DOCUMENT_DID_CHANGE]
+    monitor, _ = make_monitor()
+    monitor.instrument(server)
+
+    assert features[types.TEXT_DOCUMENT_DID_CHANGE] is not original
+    assert asyncio.iscoroutinefunction(server.protocol.fm.commands["test.command"])
+    features[types.TEXT_DOCUMENT_DID_CHANGE](None)
+    assert handler_counts(monitor)[types.TEXT_DOCUMENT_DID_CHANGE] == 1
+
+
+def test_instrumenting_many_connections_keeps_no_handlers_alive():
+    monitor, _ = make_monitor()
+
+    def connect() -> LanguageServer:
+        server = LanguageServer("test", "0.0.1")
+
+        @server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
+        def did_change(ls, params):
+            pass
+
+        monitor.instrument(server)
+        return server
+
+    first = connect()
+    handler = weakref.ref(first.protocol.fm.features[types.TEXT_DOCUMENT_DID_CHANGE])
+    names = dict(monitor._names)
+    connect()
+    del first
+    gc.collect()
+
+    assert monitor._names == names
+    assert handler() is None
+
+
+def test_blocking_handler_is_reported_with_its_stack():
+    monitor, reports = make_monitor(interval=0.01, threshold=0.05)
+
+    def parse_everything(params):
+        time.sleep(0.3)
+
+    blocking = monitor.wrap("textDocument/didChange", parse_everything)
+
+    async def main():
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            blocking(None)
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.stop()
+
+    asyncio.run(main())
+
+    [report] = reports
+    assert "in textDocument/didChange" in report
+    assert "parse_everything" in report
+
+    snapshot = monitor.metrics.registry.snapshot()
+    assert snapshot["ai_lsp_event_loop_stalls_total"][0]["value"] == 1
+    assert snapshot["ai_lsp_slow_handlers_total"][0]["labels"] == {
+        "handler": "textDocument/didChange"
+    }
+    lag = snapshot["ai_lsp_event_loop_lag_seconds"][0]
+    assert lag["count"] > 1 and lag["p99"] >= 0.2
+
+
+def test_awaiting_handlers_do_not_count_as_stalls():
+    monitor, reports = make_monitor(interval=0.01, threshold=0.05)
+
+    async def waits(params):
+        await asyncio.sleep(0.2)
+
+    handler = monitor.wrap("textDocument/completion", waits)
+
+    async def main():
+        monitor.start()
+        try:
+            await handler(None)
+        finally:
+            monitor.stop()
+
+    asyncio.run(main())
+
+    assert reports == []
+    assert handler_counts(monitor) == {"textDocument/completion": 1}
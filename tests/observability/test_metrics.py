@@ -0,0 +1,120 @@
+import asyncio
+import json
+import socket
+import threading
+
+from ai_lsp.ai.ollama_client import OllamaCompletionEngine
+from ai_lsp.config import Settings
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.capabilities import start_metrics_exporters
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from benchmarks.mock_ollama import MockOllamaConfig, MockOllamaServer
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = MetricsRegistry().histogram("h", buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+
+    assert histogram.count == 5
+    assert histogram.quantile(0.2) == 1.0
+    assert histogram.quantile(0.6) == 2.0
+    assert histogram.quantile(0.8) == 4.0
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_snapshot_is_strict_json_past_the_last_bucket():
+    registry = MetricsRegistry()
+    registry.histogram("h", buckets=(1.0,)).observe(10.0)
+
+    [entry] = json.loads(json.dumps(registry.snapshot(), allow_nan=False))["h"]
+    assert entry["p99"] is None and entry["count"] == 1
+
+
+def test_metrics_port_in_use_does_not_stop_the_server(caplog):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        start_metrics_exporters(
+            CompletionMetrics(MetricsRegistry()), Settings(metrics_port=port)
+        )
+
+    assert f"Not serving metrics on port {port}" in caplog.text
+
+
+def test_labelled_metrics_are_cached():
+    registry = MetricsRegistry()
+
+    assert registry.counter("c", stage="a") is registry.counter("c", stage="a")
+    assert registry.counter("c", stage="a") is not registry.counter("c", stage="b")
+
+
+def test_reading_while_other_threads_register():
+    registry = MetricsRegistry()
+    done = threading.Event()
+
+    def register(worker: int) -> None:
+        for i in range(2000):
+            registry.counter("ai_lsp_test_total", "Registered concurrently", n=f"{worker}-{i}")
+        done.set()
+
+    threads = [threading.Thread(target=register, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    while not done.is_set():
+        registry.snapshot()
+        registry.render_prometheus()
+    for thread in threads:
+        thread.join()
+
+    assert len(registry.snapshot()["ai_lsp_test_total"]) == 8000
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(3)
+    registry.histogram("latency_seconds", buckets=(0.1, 1.0), stage="x").observe(0.5)
+
+    text = registry.render_prometheus()
+
+    assert "# HELP requests_total Requests" in text
+    assert "# TYPE requests_total counter" in text
+    assert "requests_total 3" in text
+    assert 'latency_seconds_bucket{stage="x",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{stage="x",le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{stage="x",le="+Inf"} 1' in text
+    assert 'latency_seconds_count{stage="x"} 1' in text
+
+
+def test_engine_records_stages_and_backend_counters():
+    metrics = CompletionMetrics(MetricsRegistry())
+
+    with MockOllamaServer(MockOllamaConfig(outputs=["compute(a, b)"])) as mock:
+        engine = OllamaCompletionEngine(base_url=mock.base_url, metrics=metrics)
+        assert asyncio.run(engine.complete(make_context())) == "compute(a, b)"
+
+    for stage in ("analyze", "before_generation", "ttft", "decode", "after_generation"):
+        assert metrics.stage(stage).count == 1, stage
+    assert metrics.generated_tokens.value == 7
+    assert metrics.prompt_tokens.value > 0
+    assert metrics.eval.count == 1
+
+    snapshot = metrics.registry.snapshot()
+    assert snapshot["ai_lsp_backend_generated_tokens_total"][0]["value"] == 7
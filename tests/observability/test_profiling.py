@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from pygls.lsp.server import LanguageServer
+
+from ai_lsp.ai.cache import CompletionCache
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.lsp.capabilities import register_profiling
+from ai_lsp.lsp.documents import DocumentStore
+from ai_lsp.lsp.lazy import LazyService
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from ai_lsp.observability.profiling import Profiler, deep_sizeof, parse_profile_spec
+from benchmarks.stub_backend import StubOllamaEngine
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_cprofile_session_stops_after_n_completions(tmp_path):
+    profiler = Profiler(directory=str(tmp_path))
+    documents = {"file:///a.py": "x" * 1000}
+    profiler.track("documents", lambda: documents)
+    engine = StubOllamaEngine(
+        ["compute", "()"],
+        metrics=CompletionMetrics(MetricsRegistry()),
+        profiler=profiler,
+    )
+
+    profiler.start(completions=2)
+    assert profiler.status()["remaining"] == 2
+
+    artifacts = None
+    for _ in range(2):
+        asyncio.run(engine.complete(make_context()))
+        artifacts = profiler.completion_finished()
+
+    assert artifacts is not None
+    assert not profiler.active
+    for key in ("cpu_profile", "cpu_summary", "memory_snapshot", "memory_diff"):
+        assert os.path.exists(artifacts[key])
+    assert "_blocking_complete" in open(artifacts["cpu_summary"]).read()
+
+    tracked = json.load(open(artifacts["memory_tracked"]))
+    assert tracked["documents"]["after"] >= 1000
+    assert os.path.exists(os.path.join(artifacts["directory"], "session.json"))
+
+
+def test_completion_cache_is_tracked_once_the_engine_exists(tmp_path):
+    profiler = Profiler(directory=str(tmp_path / "profiles"))
+    metrics = CompletionMetrics(MetricsRegistry())
+    cache = CompletionCache(str(tmp_path / "cache.sqlite3"), metrics=metrics)
+    engine = LazyService(
+        lambda: StubOllamaEngine(["x"], metrics=metrics, profiler=profiler, cache=cache)
+    )
+    register_profiling(
+        LanguageServer("test", "0.0.1"), profiler, DocumentStore(), engine=engine
+    )
+    assert profiler._tracked_sizes()["cache"] < 100
+
+    engine.get()
+    cache.put("key", "x" * 10_000)
+    assert profiler._tracked_sizes()["cache"] >= 10_000
+
+
+def test_sampling_session_writes_collapsed_stacks(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), sample_interval=0.001)
+
+    profiler.start(completions=1, mode="sampling", memory=False)
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    artifacts = profiler.completion_finished()
+
+    assert artifacts["samples"] > 0
+    assert "test_sampling_session_writes_collapsed_stacks" in open(artifacts["cpu_samples"]).read()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Profiler().start(mode="perf")
+
+
+def test_profile_spec_parsing_and_sizes():
+    assert parse_profile_spec("20") == ("cprofile", 20)
+    assert parse_profile_spec("sampling:5") == ("sampling", 5)
+    assert deep_sizeof(["a" * 100, "b" * 100]) > 200
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from ai_lsp.domain.completion import CompletionContext
+from ai_lsp.observability.metrics import CompletionMetrics, MetricsRegistry
+from ai_lsp.observability.trace_view import load_traces, render_waterfall, slowest
+from ai_lsp.observability.tracing import (
+    NULL_TRACE,
+    JsonlTraceExporter,
+    Tracer,
+    reset_current_trace,
+    set_current_trace,
+)
+from benchmarks.stub_backend import StubOllamaEngine
+
+
+def make_context() -> CompletionContext:
+    return CompletionContext(
+        language="python",
+        file_path="test.py",
+        prefix="    value = ",
+        suffix="",
+        completion_prefix="",
+        current_line="    value = ",
+        previous_lines=[],
+        next_lines=[],
+        indentation="    ",
+        line=0,
+        character=12,
+    )
+
+
+def test_disabled_tracer_returns_falsy_null_trace():
+    tracer = Tracer()
+
+    trace = tracer.start("completion", uri="file:///a.py")
+
+    assert trace is NULL_TRACE
+    assert not trace
+    with trace.span("anything"):
+        pass
+    trace.finish()
+
+
+def test_sampling_rate_zero_disables_tracing(tmp_path):
+    tracer = Tracer(JsonlTraceExporter(str(tmp_path / "t.jsonl")), sample_rate=0)
+
+    assert tracer.start("completion") is NULL_TRACE
+
+
+def test_engine_spans_are_exported(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(JsonlTraceExporter(str(path)))
+    engine = StubOllamaEngine(
+        ["compute", "(", "a", ")"], metrics=CompletionMetrics(MetricsRegistry())
+    )
+
+    trace = tracer.start("completion", uri="file:///test.py")
+    token = set_current_trace(trace)
+    try:
+        assert asyncio.run(engine.complete(make_context())) == "compute(a)"
+    finally:
+        reset_current_trace(token)
+    trace.finish()
+
+    [record] = [json.loads(line) for line in path.read_text().splitlines()]
+    names = {span["name"] for span in record["spans"]}
+
+    assert {"analyze", "intent", "semantics", "decide", "queue_wait", "ttft", "decode", "finalize"} <= names
+    assert "after_generation:RangeAlignmentAgent" in names
+    assert record["attributes"]["uri"] == "file:///test.py"
+    assert record["attributes"]["intent"] is not None
+    assert record["attributes"]["streamed_tokens"] == 4
+    assert all(span["parent"] == 0 for span in record["spans"])
+
+
+def test_exporter_rotates_files(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(JsonlTraceExporter(str(path), max_bytes=300, backups=2))
+
+    for _ in range(10):
+        trace = tracer.start("completion", uri="file:///a.py")
+        with trace.span("stage"):
+            pass
+        trace.finish()
+
+    assert path.exists()
+    assert (tmp_path / "traces.jsonl.1").exists()
+    assert (tmp_path / "traces.jsonl.2").exists()
+    assert not (tmp_path / "traces.jsonl.3").exists()
+
+
+def test_waterfall_renders_slowest_first(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    records = [
+        {
+            "trace_id": str(index),
+            "name": "completion",
+            "duration_ms": duration,
+            "attributes": {"uri": "file:///a.py", "outcome": "completion"},
+            "spans": [
+                {"id": 1, "name": "context_build", "parent": 0, "offset_ms": 0.0, "duration_ms": 5.0, "attributes": {}},
+                {"id": 2, "name": "decode", "parent": 0, "offset_ms": 5.0, "duration_ms": duration - 5, "attributes": {}},
+            ],
+        }
+        for index, duration in enumerate((10.0, 50.0, 20.0))
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n{truncated")
+
+    top = slowest(load_traces([str(path)]), 2)
+    text = render_waterfall(top[0], width=10)
+
+    assert [t["trace_id"] for t in top] == ["1", "2"]
+    assert "outcome=completion" in text
+    assert "|#         |" in text
+    assert "| #########|" in text
@@ -0,0 +1,143 @@
+from lsprotocol import types
+
+from ai_lsp.domain.semantics import ScopeType
+from ai_lsp.lsp.context_builder import CompletionContextBuilder
+from ai_lsp.lsp.documents import Document
+from ai_lsp.syntax.tree import SyntaxTree
+
+
+PYTHON_SOURCE = '''"""Module docstring."""
+
+class Foo:
+    """Class docstring."""
+
+    def bar(self, x="a"):
+        y = 1  # note
+        return y
+
+
+def top():
+    s = """not a
+    docstring"""
+'''
+
+PHP_SOURCE = """<?php
+class A {
+    /**
+     * Docblock.
+     */
+    public function foo($x) {
+        $s = "{";
+        return 1;
+    }
+}
+$x = 1;
+"""
+
+
+def make_tree(language: str, text: str) -> SyntaxTree:
+    tree = SyntaxTree.for_language(language, text)
+    assert tree is not None
+    return tree
+
+
+def test_unknown_language_has_no_tree():
+    assert SyntaxTree.for_language("plaintext", "hello") is None
+
+
+def test_python_method_scope():
+    info = make_tree("python", PYTHON_SOURCE).info_at(6, 8)
+
+    assert info.scope is ScopeType.METHOD
+    assert info.function == "bar"
+    assert info.class_name == "Foo"
+
+
+def test_python_dedent_leaves_scope():
+    tree = make_tree("python", PYTHON_SOURCE)
+
+    assert tree.info_at(10, 4).scope is ScopeType.FUNCTION
+    assert tree.info_at(10, 4).class_name is None
+    assert tree.info_at(1, 0).scope is ScopeType.GLOBAL
+
+
+def test_python_docstrings():
+    tree = make_tree("python", PYTHON_SOURCE)
+
+    assert tree.info_at(0, 5).in_docstring
+    assert tree.info_at(3, 10).in_docstring
+    # A plain multi-line string is a string, not a docstring.
+    assert tree.info_at(12, 6).in_string
+    assert not tree.info_at(12, 6).in_docstring
+
+
+def test_python_comment():
+    tree = make_tree("python", PYTHON_SOURCE)
+
+    assert tree.info_at(6, 20).in_comment
+    assert not tree.info_at(6, 10).in_comment
+
+
+def test_php_braces_and_docblock():
+    tree = make_tree("php", PHP_SOURCE)
+
+    assert tree.info_at(3, 8).in_docstring
+    assert tree.info_at(7, 8).scope is ScopeType.METHOD
+    # The brace inside the string does not open a block.
+    assert tree.info_at(9, 1).scope is ScopeType.GLOBAL
+    assert tree.info_at(10, 3).scope is ScopeType.GLOBAL
+
+
+def test_update_only_invalidates_from_edited_line():
+    tree = make_tree("python", PYTHON_SOURCE)
+    tree.info_at(12, 0)
+    assert tree.valid_lines == 13
+
+    text = PYTHON_SOURCE.replace("        return y", "        return (y")
+    tree.update(text, first_line=7)
+
+    assert tree.valid_lines == 8
+    info = tree.info_at(10, 4)
+    assert info.scope is ScopeType.METHOD  # still inside the open bracket
+
+
+def test_open_brackets_span_lines():
+    tree = make_tree("python", "x = foo(a, [\n    1,\n    2")
+
+    info = tree.info_at(2, 4)
+
+    assert info.brackets == "(["
+    assert tree.state_at(2).depth == 2
+
+
+def test_php_brackets_at_cursor():
+    tree = make_tree("php", PHP_SOURCE)
+
+    assert tree.info_at(6, 8).brackets == "{{"
+    assert tree.info_at(5, 24).brackets == "{("
+
+
+def test_multiline_strings_and_comments():
+    py = make_tree("python", PYTHON_SOURCE)
+    php = make_tree("php", "<?php\n/* block\n   comment */\n$s = 'a';\n")
+
+    assert py.info_at(12, 4).multiline
+    assert not py.info_at(11, 12).multiline
+    assert py.info_at(11, 12).in_string
+    assert php.info_at(2, 3).multiline
+    assert not php.info_at(3, 7).multiline
+
+
+def test_positions_past_astral_characters_are_utf16_offsets():
+    text = 's = "\U0001F60B" + y\n'
+    document = Document("file:///a.py", "python", 1, text, make_tree("python", text))
+    builder = CompletionContextBuilder()
+
+    # The emoji is two UTF-16 code units: offset 7 is before the closing quote.
+    context = builder.build(document, types.Position(line=0, character=7))
+    assert context.prefix == 's = "\U0001F60B'
+    assert context.syntax is not None and context.syntax.in_string
+
+    context = builder.build(document, types.Position(line=0, character=11))
+    assert context.prefix == 's = "\U0001F60B" + '
+    assert not context.syntax.in_string